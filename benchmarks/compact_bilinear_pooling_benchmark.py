@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark comparing the original algorithm of CompactBilinearPooling (count sketches computed with dense projection \
+matrices, followed by complex FFTs of sketches with zero imaginary parts) with the current one \
+(count sketches computed with index_add_, followed by real FFTs).
+
+The removed complex-as-last-dim torch.fft/torch.ifft calls are mapped onto torch.fft.fft/ifft.
+
+Usage:
+    python benchmarks/compact_bilinear_pooling_benchmark.py [--batch_size B] [--repeat R]
+"""
+
+__author__ = "Tomasz Kornuta"
+
+import os
+import sys
+import argparse
+import timeit
+
+import torch
+
+# Make the ptp package importable when the script is run from the repository (without installing it).
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from ptp.components.models.multi_modal_reasoning.compact_bilinear_pooling import CompactBilinearPooling
+from ptp.configuration.config_interface import ConfigInterface
+from ptp.data_types.data_streams import DataStreams
+from ptp.utils.app_state import AppState
+
+
+def create_model(args):
+    """
+    Creates the model with not trainable projections (i.e. using index_add_).
+
+    :param args: Parsed command line arguments.
+    """
+    app_state = AppState()
+    app_state.__setitem__("image_encoding_size", args.image_size, override=True)
+    app_state.__setitem__("question_encoding_size", args.question_size, override=True)
+    app_state.__setitem__("output_size", args.output_size, override=True)
+
+    config = ConfigInterface()
+    config.add_config_params({"cbp": {"trainable_projections": False}})
+    return CompactBilinearPooling("cbp", config["cbp"])
+
+
+def dense_complex_forward(image_matrix, question_matrix, enc_img, enc_q):
+    """
+    Computes outputs the original way: dense projections followed by complex FFTs.
+
+    :param image_matrix: Dense projection matrix of images [IMAGE_SIZE x OUTPUT_SIZE].
+
+    :param question_matrix: Dense projection matrix of questions [QUESTION_SIZE x OUTPUT_SIZE].
+
+    :param enc_img: Tensor of image encodings [BATCH_SIZE x IMAGE_SIZE].
+
+    :param enc_q: Tensor of question encodings [BATCH_SIZE x QUESTION_SIZE].
+
+    :return: Tensor of outputs [BATCH_SIZE x OUTPUT_SIZE].
+    """
+    sketch_img = enc_img.mm(image_matrix)
+    sketch_q = enc_q.mm(question_matrix)
+    # Add imaginary parts (with zeros).
+    sketch_img_reim = torch.stack([sketch_img, torch.zeros(sketch_img.shape)], dim=2)
+    sketch_q_reim = torch.stack([sketch_q, torch.zeros(sketch_q.shape)], dim=2)
+    # Perform FFT.
+    fft_img = torch.view_as_real(torch.fft.fft(torch.view_as_complex(sketch_img_reim), dim=1))
+    fft_q = torch.view_as_real(torch.fft.fft(torch.view_as_complex(sketch_q_reim), dim=1))
+    # Calculate product.
+    real1, imag1 = fft_img[:, :, 0], fft_img[:, :, 1]
+    real2, imag2 = fft_q[:, :, 0], fft_q[:, :, 1]
+    fft_product = torch.stack([real1 * real2 - imag1 * imag2, real1 * imag2 + imag1 * real2], dim=-1)
+    # Inverse FFT.
+    return torch.fft.ifft(torch.view_as_complex(fft_product), dim=1).real
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch_size', type=int, default=64, help='Batch size')
+    parser.add_argument('--image_size', type=int, default=2048, help='Size of image encodings')
+    parser.add_argument('--question_size', type=int, default=1024, help='Size of question encodings')
+    parser.add_argument('--output_size', type=int, default=16000, help='Size of the output')
+    parser.add_argument('--repeat', type=int, default=10, help='Number of repetitions')
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    model = create_model(args)
+    enc_img = torch.randn(args.batch_size, args.image_size)
+    enc_q = torch.randn(args.batch_size, args.question_size)
+
+    # Dense matrices equivalent to the count sketches of the model.
+    image_matrix = model.generate_count_sketch_projection_matrix(model.image_sketch_indices, model.image_sketch_signs, args.output_size)
+    question_matrix = model.generate_count_sketch_projection_matrix(model.question_sketch_indices, model.question_sketch_signs, args.output_size)
+
+    def dense_complex():
+        return dense_complex_forward(image_matrix, question_matrix, enc_img, enc_q)
+
+    def index_add_rfft():
+        data_streams = DataStreams({"image_encodings": enc_img, "question_encodings": enc_q})
+        model(data_streams)
+        return data_streams["outputs"]
+
+    # Make sure that both algorithms compute the same outputs.
+    with torch.no_grad():
+        max_diff = (dense_complex() - index_add_rfft()).abs().max().item()
+
+    print("Batch {}, image encodings {}, question encodings {}, output {}".format(
+        args.batch_size, args.image_size, args.question_size, args.output_size))
+    print("Max abs difference of outputs: {:.2e}".format(max_diff))
+    print('{:<26} {:>14} {:>14}'.format("Algorithm", "Storage [MB]", "Forward [ms]"))
+    storages = [
+        ("dense mm + complex FFT", dense_complex, [image_matrix, question_matrix]),
+        ("index_add_ + rfft", index_add_rfft, list(model.buffers())),
+        ]
+    for name, func, tensors in storages:
+        storage = sum(tensor.numel() * tensor.element_size() for tensor in tensors) / 2**20
+        with torch.no_grad():
+            # Warm up.
+            func()
+            time = 1e3 * min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print('{:<26} {:>14.3f} {:>14.1f}'.format(name, storage, time))
+
+
+if __name__ == '__main__':
+    main()
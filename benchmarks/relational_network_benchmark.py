@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark comparing computation of relations in RelationalNetwork: the original double loop over pairs \
+of "objects" vs. the vectorized pairs (relations_from_pairs) vs. the pairwise projections (relations_from_projections).
+
+Usage:
+    python benchmarks/relational_network_benchmark.py [--batch_size B] [--repeat R]
+"""
+
+__author__ = "Tomasz Kornuta"
+
+import os
+import sys
+import argparse
+import timeit
+
+import torch
+
+# Make the ptp package importable when the script is run from the repository (without installing it).
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from ptp.components.models.multi_modal_reasoning.relational_network import RelationalNetwork
+from ptp.configuration.config_interface import ConfigInterface
+from ptp.utils.app_state import AppState
+
+
+def create_model(args):
+    """
+    Creates the model (both modes share the same g_theta, so a single model is used).
+
+    :param args: Parsed command line arguments.
+    """
+    app_state = AppState()
+    app_state.__setitem__("feature_maps_height", args.height, override=True)
+    app_state.__setitem__("feature_maps_width", args.width, override=True)
+    app_state.__setitem__("feature_maps_depth", args.depth, override=True)
+    app_state.__setitem__("question_encoding_size", args.question_size, override=True)
+
+    config = ConfigInterface()
+    config.add_config_params({"rn": {"g_theta_sizes": args.g_theta_sizes, "pairwise_projections": False}})
+    return RelationalNetwork("rn", config["rn"])
+
+
+def relations_from_loop(model, objects, enc_q):
+    """
+    Computes relations the original way: inputs of pairs of "objects" are concatenated in a double Python loop \
+    and stacked, then passed through g_theta.
+
+    :param model: RelationalNetwork.
+
+    :param objects: Tensor of objects [BATCH SIZE x NUM_OBJECTS x FEAT_DEPTH].
+
+    :param enc_q: Tensor of encoded questions [BATCH SIZE x QUESTION_SIZE].
+
+    :return: Tensor of relations [BATCH SIZE x NUM_RELATIONS x OUTPUT_SIZE].
+    """
+    relational_inputs = []
+    for i in range(model.num_objects):
+        for j in range(model.num_objects):
+            relational_inputs.append(torch.cat([objects[:, i], objects[:, j], enc_q], dim=1))
+    stacked_inputs = torch.stack(relational_inputs, dim=1)
+    shape = stacked_inputs.shape
+    stacked_relations = model.g_theta(stacked_inputs.view(-1, shape[-1]))
+    return stacked_relations.view(*shape[0:-1], model.output_size)
+
+
+def measure(func, backward, repeat):
+    """
+    Measures the time of a single call.
+
+    :param func: Function returning relations.
+
+    :param backward: Flag indicating whether to measure backward pass as well.
+
+    :param repeat: Number of repetitions.
+
+    :return: Best time (in milliseconds).
+    """
+    def step():
+        if backward:
+            func().sum().backward()
+        else:
+            with torch.no_grad():
+                func()
+    # Warm up.
+    step()
+    return 1e3 * min(timeit.repeat(step, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch_size', type=int, default=16, help='Batch size')
+    parser.add_argument('--height', type=int, default=7, help='Height of feature maps')
+    parser.add_argument('--width', type=int, default=7, help='Width of feature maps')
+    parser.add_argument('--depth', type=int, default=64, help='Depth of feature maps')
+    parser.add_argument('--question_size', type=int, default=128, help='Size of question encodings')
+    parser.add_argument('--g_theta_sizes', type=int, nargs='+', default=[256, 256, 256], help='Sizes of g_theta layers')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of repetitions')
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    model = create_model(args)
+    feat_m = torch.randn(args.batch_size, args.depth, args.height, args.width)
+    enc_q = torch.randn(args.batch_size, args.question_size)
+    objects = feat_m.reshape(-1, args.depth, model.num_objects).transpose(1, 2)
+
+    modes = [
+        ("loop", lambda: relations_from_loop(model, objects, enc_q)),
+        ("relations_from_pairs", lambda: model.relations_from_pairs(objects, enc_q)),
+        ("relations_from_projections", lambda: model.relations_from_projections(objects, enc_q)),
+        ]
+
+    # Make sure that all modes compute the same relations.
+    with torch.no_grad():
+        reference = modes[0][1]()
+        for name, func in modes[1:]:
+            if not torch.allclose(reference, func(), atol=1e-4):
+                raise RuntimeError("Relations computed by '{}' differ from the loop".format(name))
+
+    print("Batch {}, feature maps {}x{}x{}, question {}, g_theta {}".format(
+        args.batch_size, args.height, args.width, args.depth, args.question_size, args.g_theta_sizes))
+    print('{:<28} {:>14} {:>20}'.format("Mode", "Forward [ms]", "Forward+backward [ms]"))
+    for name, func in modes:
+        print('{:<28} {:>14.1f} {:>20.1f}'.format(name, measure(func, False, args.repeat), measure(func, True, args.repeat)))
+
+
+if __name__ == '__main__':
+    main()
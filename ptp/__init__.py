@@ -14,6 +14,7 @@ from .components.masking import *
 from .components.models import *
 
 from .components.tasks.task import Task
+from .components.tasks.feature_store_task import FeatureStoreTask
 from .components.tasks.image_text_to_class import *
 from .components.tasks.image_to_class import *
 from .components.tasks.text_to_class import *
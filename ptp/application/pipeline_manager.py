@@ -19,8 +19,9 @@ __author__ = "Tomasz Kornuta"
 
 import os
 import torch
+from functools import partial
 from datetime import datetime
-from numpy import inf,average
+from numpy import inf
 
 import ptp.components
 
@@ -29,6 +30,7 @@ from ptp.utils.app_state import AppState
 from ptp.configuration.configuration_error import ConfigurationError
 from ptp.application.component_factory import ComponentFactory
 from ptp.utils.data_streams_parallel import DataStreamsParallel
+from ptp.utils.pipeline_profiler import PipelineProfiler
 
 
 components_to_skip_in_data_parallel = ["SentenceEmbeddings", "IndexEmbeddings"]
@@ -61,6 +63,8 @@ class PipelineManager(object):
         self.models = []
         # Empty list of all losses - it will contain only "references" to objects stored in the components list.
         self.losses = []
+        # Empty list of components executed by the data loader - it will contain only "references" to objects stored in the components list.
+        self.loader_side = []
 
         # Initialization of best loss - as INF.
         self.best_loss = inf
@@ -69,6 +73,15 @@ class PipelineManager(object):
         # 0 means currntly, 1 means during previous validation etc.
         self.validation_loss_down_counter = 0
 
+        # Profiler - inactive by default.
+        self.profiler = None
+
+        # Execution plan - compiled after handshake.
+        self.__plan = None
+
+        # Use asynchronous copies of streams to device (effective only when data loader pins memory).
+        self.non_blocking_transfer = False
+
 
     def build(self, use_logger=True):
         """
@@ -86,7 +99,7 @@ class PipelineManager(object):
         self.__priorities = []
 
         # Special section names to "skip".
-        sections_to_skip = "name load freeze disable".split()
+        sections_to_skip = "name load freeze disable profiling".split()
         disabled_components = ''
         # Add components to disable by the ones from configuration file.
         if "disable" in self.config:
@@ -167,6 +180,15 @@ class PipelineManager(object):
                     raise ConfigurationError("Object '{}' cannot be instantiated as part of pipeline, \
                         as its class type '{}' is derived from Task class!".format(c_key, class_obj.__name__))
 
+                # Check if component should be executed by the data loader (i.e. in collate_fn of the task).
+                if "loader_side" in c_config and bool(c_config["loader_side"]):
+                    # Only non-trainable (preprocessing) components can be moved there.
+                    for base_class in [ptp.Model, ptp.Loss]:
+                        if ComponentFactory.check_inheritance(class_obj, base_class.__name__):
+                            raise ConfigurationError("Object '{}' cannot be executed on the loader side, as its class type '{}' is derived from {} class!".format(
+                                c_key, class_obj.__name__, base_class.__name__))
+                    self.loader_side.append(component)
+
                 # Add it to dict.
                 self.__components[c_priority] = component
 
@@ -399,6 +421,15 @@ class PipelineManager(object):
                 model.freeze()
         
 
+    def loader_side_components(self):
+        """
+        Returns components that will be executed by the data loader, sorted by their priorities.
+
+        :return: List of components.
+        """
+        return [self.__components[prio] for prio in self.__priorities if self.__components[prio] in self.loader_side]
+
+
     def __getitem__(self, number):
         """
         Returns the component, using the enumeration resulting from priorities.
@@ -452,6 +483,8 @@ class PipelineManager(object):
             comp = self.__components[prio]
             if type(comp) == str:
                 summary_str += '  + {} (None: not created) [{}]\n'.format(comp, prio)
+            elif comp in self.loader_side:
+                summary_str += comp.summarize_io("{}, loader-side".format(prio))
             else:
                 summary_str += comp.summarize_io(prio)
         summary_str += '=' * 80 + '\n'
@@ -485,6 +518,33 @@ class PipelineManager(object):
         return summary_str
 
 
+    def initialize_profiling(self, log_dir, filename):
+        """
+        Activates profiling of the components of the pipeline and creates the csv file for measurements.
+
+        :param log_dir: Path to file.
+        :type log_dir: str
+
+        :param filename: Filename to be created.
+        :type filename: str
+
+        :return: File stream opened for writing.
+        """
+        self.logger.info("Profiling of the pipeline components activated")
+        self.profiler = PipelineProfiler()
+        return self.profiler.initialize_csv_file(log_dir, filename)
+
+
+    def finalize_profiling(self):
+        """
+        Finalizes profiling: exports the remaining measurements and logs the summary table.
+        """
+        if self.profiler is None:
+            return
+        self.profiler.finalize()
+        self.logger.info(self.profiler.export_to_string())
+
+
     def handshake(self, data_streams, log=True):
         """
         Performs handshaking of inputs and outputs definitions of all components in the pipeline.
@@ -496,10 +556,20 @@ class PipelineManager(object):
         :return: Number of detected errors.
         """
         errors = 0
+        # Streams available in the data loader, i.e. returned by the task and produced by the loader-side components.
+        loader_side_keys = set(data_streams.keys())
 
         for prio in self.__priorities:
             # Get component
             comp = self.__components[prio]
+            # Loader-side components cannot use the outputs of components executed later, in the main process.
+            if comp in self.loader_side:
+                for key in comp.input_data_definitions().keys():
+                    if key not in loader_side_keys:
+                        if log:
+                            self.logger.error("Loader-side component '{}' requires stream '{}' that is not produced by the task nor by other loader-side components".format(comp.name, key))
+                        errors += 1
+                loader_side_keys.update(comp.output_data_definitions().keys())
             # Handshake inputs and outputs.
             errors += comp.handshake_input_definitions(data_streams, log)
             errors += comp.export_output_definitions(data_streams, log)
@@ -514,33 +584,84 @@ class PipelineManager(object):
             def_str += '='*80 + '\n'
             self.logger.info(def_str)
 
+        # Compile the execution plan.
+        if errors == 0:
+            self.compile_execution_plan()
+
         return errors
 
 
-    def forward(self, data_streams):
+    def compile_execution_plan(self):
         """
-        Method responsible for processing the data dict, using all components in the components queue.
+        Compiles the execution plan of the pipeline, i.e. a flat list of steps, each consisting of:
+            - priority and component (for profiling),
+            - callable processing the data dict (with DataStreamsParallel unwrapping decided in advance),
+            - keys of the streams that must be moved to device before the call (None when no transfer is required).
 
-        :param data_streams: :py:class:`ptp.utils.DataStreams` object containing both input data to be processed and that will be extended by the results.
+        Loader-side components are skipped, as they are executed by the data loader.
 
-        """
-        if self.app_state.args.use_gpu:
-            data_streams.to(device = self.app_state.device)
+        .. note::
+
+            Must be recompiled every time the components are changed (e.g. wrapped by :py:func:`cuda`).
 
+        """
+        self.__plan = []
         for prio in self.__priorities:
             # Get component
             comp = self.__components[prio]
+            if comp in self.loader_side:
+                continue
             if (type(comp).__name__ == "DataStreamsParallel"):
-                # Forward of wrapper returns outputs in separate DataStreams.
-                outputs = comp(data_streams)
-                # Postprocessing: copy only the outputs of the wrapped model.
-                for key in comp.module.output_data_definitions().keys():
-                    data_streams.publish({key: outputs[key]})
-            else: 
+                # Wrapper returns outputs in separate DataStreams.
+                step = partial(self.__forward_data_parallel, comp, list(comp.module.output_data_definitions().keys()))
+                input_keys = comp.module.input_data_definitions().keys()
+            else:
                 # "Normal" forward step.
-                comp(data_streams)
-                # Move data to device.
-                data_streams.to(device = self.app_state.device)
+                step = comp
+                input_keys = comp.input_data_definitions().keys()
+            # Move only the streams that are inputs of the component - and only when working on GPU.
+            keys_to_move = list(input_keys) if self.app_state.use_gpu else None
+            self.__plan.append((prio, comp, step, keys_to_move))
+
+
+    def __forward_data_parallel(self, comp, output_keys, data_streams):
+        """
+        Processes the data dict by a model wrapped in DataStreamsParallel.
+
+        :param comp: DataStreamsParallel wrapper.
+
+        :param output_keys: Keys of streams produced by the wrapped model.
+
+        :param data_streams: :py:class:`ptp.utils.DataStreams` object containing both input data to be processed and that will be extended by the results.
+
+        """
+        # Forward of wrapper returns outputs in separate DataStreams.
+        outputs = comp(data_streams)
+        # Postprocessing: copy only the outputs of the wrapped model.
+        for key in output_keys:
+            data_streams.publish({key: outputs[key]})
+
+
+    def forward(self, data_streams):
+        """
+        Method responsible for processing the data dict, using all components in the components queue.
+
+        :param data_streams: :py:class:`ptp.utils.DataStreams` object containing both input data to be processed and that will be extended by the results.
+
+        """
+        # Compile the plan if it wasn't done yet.
+        if self.__plan is None:
+            self.compile_execution_plan()
+
+        for (prio, comp, step, keys_to_move) in self.__plan:
+            # Move inputs of the component to device.
+            if keys_to_move is not None:
+                data_streams.to(device = self.app_state.device, keys_to_move = keys_to_move, non_blocking = self.non_blocking_transfer)
+            if self.profiler is None:
+                step(data_streams)
+            else:
+                with self.profiler.measure("forward", prio, comp, data_streams):
+                    step(data_streams)
 
 
     def eval(self):
@@ -586,6 +707,9 @@ class PipelineManager(object):
                 # "Overwrite" model on the component list.
                 self.__components[key] = model
 
+        # Recompile the execution plan, as components have changed.
+        self.compile_execution_plan()
+
     def zero_grad(self):
         """ 
         Resets gradients in all trainable components of the pipeline.
@@ -612,12 +736,27 @@ class PipelineManager(object):
         for loss in self.losses:
             for key in loss.loss_keys():
                 pass_counter += 1
-                if pass_counter == total_passes:
-                    # Last pass.
-                    data_streams[key].backward()
+                # All but the last pass must retain the graph.
+                retain_graph = (pass_counter != total_passes)
+                if self.profiler is None:
+                    data_streams[key].backward(retain_graph=retain_graph)
                 else:
-                    # "Other pass."
-                    data_streams[key].backward(retain_graph=True)
+                    with self.profiler.measure("backward", self.__priority_of(loss), loss):
+                        data_streams[key].backward(retain_graph=retain_graph)
+
+
+    def __priority_of(self, component):
+        """
+        Returns the priority of a given component.
+
+        :param component: Component of the pipeline.
+
+        :return: Priority (float) or None if component was not found.
+        """
+        for prio in self.__priorities:
+            if self.__components[prio] is component:
+                return prio
+        return None
 
 
     def return_loss_on_batch(self, stat_col):
@@ -694,11 +833,14 @@ class PipelineManager(object):
         # Additional "total loss" (for single- and multi-loss pipelines).
         # Collect it always, but show it only for multi-loss pipelines.
         if self.show_total_loss:
-            stat_col.add_statistics("total_loss", '{:12.10f}')
+            stat_col.add_statistics("total_loss", '{:12.10f}', weights="total_loss_support")
         else:
-            stat_col.add_statistics("total_loss", None)
+            stat_col.add_statistics("total_loss", None, weights="total_loss_support")
         stat_col.add_statistics("total_loss_support", None)
 
+        # Bytes transferred to device - show them only when using GPU.
+        stat_col.add_statistics("transferred_bytes", '{:d}' if self.app_state.use_gpu else None)
+
 
     def collect_statistics(self, stat_col, data_streams):
         """
@@ -712,7 +854,11 @@ class PipelineManager(object):
         """
         for prio in self.__priorities:
             comp = self.__components[prio]
-            comp.collect_statistics(stat_col, data_streams)
+            if self.profiler is None:
+                comp.collect_statistics(stat_col, data_streams)
+            else:
+                with self.profiler.measure("statistics", prio, comp):
+                    comp.collect_statistics(stat_col, data_streams)
 
         # Additional "total loss" (for single- and multi-loss pipelines).
         loss_sum = 0
@@ -721,6 +867,7 @@ class PipelineManager(object):
                 loss_sum += data_streams[key].cpu().item()
         stat_col["total_loss"] = loss_sum
         stat_col["total_loss_support"] = len(data_streams["indices"]) # batch size
+        stat_col["transferred_bytes"] = data_streams.transferred_bytes
 
 
     def add_aggregators(self, stat_agg):
@@ -741,6 +888,9 @@ class PipelineManager(object):
         else:
             stat_agg.add_aggregator("total_loss", None)  
 
+        # Total number of bytes transferred to device.
+        stat_agg.add_aggregator("transferred_bytes", '{:d}' if self.app_state.use_gpu else None)
+
 
     def aggregate_statistics(self, stat_col, stat_agg):
         """
@@ -756,12 +906,11 @@ class PipelineManager(object):
             comp.aggregate_statistics(stat_col, stat_agg)
 
         # Additional "total loss" (for single- and multi-loss pipelines).
-        total_losses = stat_col["total_loss"]
-        supports = stat_col["total_loss_support"]
-
         # Special case - no samples!
-        if sum(supports) == 0:
+        if stat_col.sum("total_loss_support") == 0:
             stat_agg.aggregators["total_loss"] = 0
         else: 
-            # Calculate default aggregate - weighted mean.
-            stat_agg.aggregators["total_loss"] = average(total_losses, weights=supports)
+            # Get default aggregate - weighted mean.
+            stat_agg.aggregators["total_loss"] = stat_col.mean("total_loss")
+
+        stat_agg.aggregators["transferred_bytes"] = stat_col.sum("transferred_bytes")
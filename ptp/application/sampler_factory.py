@@ -34,7 +34,7 @@ class SamplerFactory(object):
     """
 
     @staticmethod
-    def build(task, config, task_subset_name):
+    def build(task, config, task_subset_name, batch_size = None, drop_last = False, max_tokens = None):
         """
         Static method returning particular sampler, depending on the name \
         provided in the list of parameters & the specified task class.
@@ -47,6 +47,12 @@ class SamplerFactory(object):
 
         :param task_subset_name: Name of task subset (and associated TaskManager object)
 
+        :param batch_size: Size of batch - used by batch samplers (DEFAULT: None)
+
+        :param drop_last: Flag indicating whether the last incomplete batch will be dropped - used by batch samplers (DEFAULT: False)
+
+        :param max_tokens: Budget of tokens in a single batch - used by batch samplers (DEFAULT: None)
+
         ..note::
 
             ``config`` should contains the exact (case-sensitive) class name of the sampler to instantiate.
@@ -78,6 +84,13 @@ class SamplerFactory(object):
 
             ``torch.utils.data.sampler.WeightedRandomSampler`` expercse additional parameter 'weights'.
 
+        .. note::
+
+            :py:class:`ptp.utils.samplers.BucketBatchSampler` groups samples of similar lengths (returned by task's \
+            ``get_sample_lengths()``) into batches. It accepts additional parameter 'buckets' (number of buckets, DEFAULT: 10) \
+            and optionally 'folds' and 'epochs_per_fold' - then the samples will be drawn by ``kFoldRandomSampler``. \
+            It is the only sampler supporting batches formed by the budget of tokens (``max_tokens``).
+
         :return: Instance of a given sampler or ``None`` if the section not present or couldn't build the sampler.
 
         """
@@ -93,6 +106,10 @@ class SamplerFactory(object):
             typename = config['type']
             logger.info('Trying to instantiate the {} sampler object'.format(typename))
 
+            if max_tokens is not None and typename != 'BucketBatchSampler':
+                raise ConfigurationError("Batches formed by the budget of tokens ('max_tokens') require the BucketBatchSampler sampler "
+                    "(currently '{}')".format(typename))
+
             ###########################################################################
             # Handle first special case: SubsetRandomSampler.
             if typename == 'SubsetRandomSampler':
@@ -204,6 +221,34 @@ class SamplerFactory(object):
                 # Create the sampler object.
                 sampler = ptp_samplers.kFoldWeightedRandomSampler(weights, len(task), folds, epochs_per_fold, task_subset_name == 'training')
 
+            ###########################################################################
+            # Handle fifth special case: BucketBatchSampler.
+            elif typename == 'BucketBatchSampler':
+
+                # Get lengths of samples.
+                lengths = task.get_sample_lengths()
+                if lengths is None:
+                    raise ConfigurationError("BucketBatchSampler requires task '{}' to return lengths of samples".format(type(task).__name__))
+                if len(lengths) != len(task):
+                    raise ConfigurationError("BucketBatchSampler received {} lengths of samples, whereas there are {} samples in the task".format(
+                        len(lengths), len(task)))
+
+                # Create the base sampler.
+                if 'folds' in config:
+                    folds = config["folds"]
+                    if folds < 2:
+                        raise ConfigurationError("BucketBatchSampler requires  at least two 'folds'")
+                    # Get epochs per fold (default: 1).
+                    epochs_per_fold = config.get("epochs_per_fold", 1)
+                    base_sampler = ptp_samplers.kFoldRandomSampler(len(task), folds, epochs_per_fold, task_subset_name == 'training')
+                else:
+                    base_sampler = pt_samplers.RandomSampler(task)
+
+                # Create the sampler object.
+                if max_tokens is not None and drop_last:
+                    raise ConfigurationError("BucketBatchSampler cannot drop the last batch when batches are formed by the budget of tokens ('max_tokens')")
+                sampler = ptp_samplers.BucketBatchSampler(base_sampler, lengths, batch_size, config.get("buckets", 10), drop_last, max_tokens)
+
             elif typename in ['BatchSampler', 'DistributedSampler']:
                 # Sorry, don't support those. Yet;)
                 raise ConfigurationError("Sampler Factory currently does not support the '{}' sampler. Please pick one of the others "
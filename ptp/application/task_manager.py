@@ -16,11 +16,14 @@
 
 __author__ = "Tomasz Kornuta"
 
+import time
 import signal
 import logging
 import numpy as np
+import torch
 
 from torch.utils.data import DataLoader
+from torch.utils.data.sampler import BatchSampler
 
 import ptp
 
@@ -31,6 +34,56 @@ from ptp.application.component_factory import ComponentFactory
 from ptp.application.sampler_factory import SamplerFactory
 
 
+class LoaderSideCollate(object):
+    """
+    Collate function executing the loader-side components of the pipeline on batches collated by the task, \
+    so they are processed in the data loader worker processes, in parallel to the main process.
+    """
+
+    def __init__(self, collate_fn, components):
+        """
+        Initializes the collate function.
+
+        :param collate_fn: Collate function of the task.
+
+        :param components: List of components (sorted by priorities).
+        """
+        self.collate_fn = collate_fn
+        self.components = components
+
+
+    def __call__(self, batch):
+        """
+        Collates the batch and processes it by the components.
+
+        :param batch: List of samples.
+
+        :return: Collated batch (DataStreams) extended by the outputs of components.
+        """
+        data_streams = self.collate_fn(batch)
+        for component in self.components:
+            component(data_streams)
+        return data_streams
+
+
+def get_process_memory(pid):
+    """
+    Returns memory used by a given process, read from /proc (i.e. available on Linux only).
+
+    :param pid: Id of the process.
+
+    :return: Tuple (RSS, USS) in bytes, or None if not available. Resident set size (RSS) includes pages shared \
+        with other processes, whereas unique set size (USS) counts only private pages of the process.
+    """
+    try:
+        with open("/proc/{}/smaps_rollup".format(pid), 'r') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line and not line.startswith(' '))
+    except (OSError, ValueError):
+        return None
+    size = lambda key: int(fields.get(key, '0 kB').split()[0]) * 1024
+    return size('Rss'), size('Private_Clean') + size('Private_Dirty')
+
+
 class TaskManager(object):
     """
     Class that instantiates and manages task and associated entities (dataloader, sampler etc.).
@@ -57,6 +110,12 @@ class TaskManager(object):
 
         # Single batch that will be used for validation (for validation task manager).
         self.batch = None
+        # Long-lived iterator returning batches used for partial validation.
+        self.batch_iterator = None
+
+        # Loader-side components of the pipeline, processing batches returned by the data loader.
+        self.loader_side_components = []
+        self.loader_side = False
 
 
     def worker_init_fn(self, worker_id):
@@ -77,6 +136,11 @@ class TaskManager(object):
         # Set random seed of a worker.
         np.random.seed(seed=np.random.get_state()[1][0] + worker_id)
 
+        # Loader-side components must produce tensors on CPU - batches are moved to GPU by the main process.
+        if self.loader_side:
+            self.app_state.set_cpu_types()
+            self.app_state.device = torch.device('cpu')
+
         # Ignores SIGINT signal - what enables "nice" termination of dataloader worker threads.
         # https://discuss.pytorch.org/t/dataloader-multiple-workers-and-keyboardinterrupt/9740/2
         signal.signal(signal.SIGINT, signal.SIG_IGN)
@@ -101,6 +165,12 @@ class TaskManager(object):
             # Set task.
             self.task = component
 
+            # Get the budget of tokens in a single batch - when set, batches will be formed by the budget (instead of batch size).
+            max_tokens = self.config['task']['max_tokens'] if 'max_tokens' in self.config['task'] else None
+            if max_tokens is not None and "sampler" not in self.config:
+                self.logger.info("Forming batches by the budget of {} tokens, using BucketBatchSampler".format(max_tokens))
+                self.config.add_config_params({'sampler': {'type': 'BucketBatchSampler'}})
+
             # Try to build the sampler.
             # Check if sampler is required, i.e. 'sampler' section is empty.
             if "sampler" not in self.config:
@@ -108,27 +178,22 @@ class TaskManager(object):
                 # Set sampler to none.
                 self.sampler = None
             else:
-                self.sampler = SamplerFactory.build(self.task, self.config["sampler"], self.name)
+                self.sampler = SamplerFactory.build(self.task, self.config["sampler"], self.name,
+                    self.config['task']['batch_size'], self.config['dataloader']['drop_last'], max_tokens)
                 # Set shuffle to False - REQUIRED as those two are exclusive.
                 self.config['dataloader'].add_config_params({'shuffle': False})
 
-            # build the DataLoader on top of the validation task
-            self.dataloader = DataLoader(dataset=self.task,
-                    batch_size=self.config['task']['batch_size'],
-                    shuffle=self.config['dataloader']['shuffle'],
-                    sampler=self.sampler,
-                    batch_sampler= None,
-                    num_workers=self.config['dataloader']['num_workers'],
-                    collate_fn=self.task.collate_fn,
-                    pin_memory=self.config['dataloader']['pin_memory'],
-                    drop_last=self.config['dataloader']['drop_last'],
-                    timeout=self.config['dataloader']['timeout'],
-                    worker_init_fn=self.worker_init_fn)
+            # Create the data loader.
+            self.create_dataloader(self.task.get_collate_fn())
 
             # Display sizes.
             if log:
                 self.logger.info("Task for '{}' loaded (size: {})".format(self.name, len(self.task)))
-                if (self.sampler is not None):
+                if self.task.has_batch_access():
+                    self.logger.info("Task for '{}' will return whole batches (batch-level access)".format(self.name))
+                if isinstance(self.sampler, BatchSampler):
+                    self.logger.info("Batch sampler for '{}' created (number of batches: {})".format(self.name, len(self.sampler)))
+                elif (self.sampler is not None):
                     self.logger.info("Sampler for '{}' created (size: {})".format(self.name, len(self.sampler)))
 
             # Ok, success.
@@ -146,21 +211,118 @@ class TaskManager(object):
             return 1
 
 
+    def create_dataloader(self, collate_fn):
+        """
+        Creates the data loader on top of the task, using the current sampler.
+
+        :param collate_fn: Collate function used by the data loader.
+        """
+        # Options of worker processes - valid only when data is loaded by separate processes.
+        worker_options = {}
+        if self.config['dataloader']['num_workers'] > 0:
+            # Keep workers alive between epochs (instead of starting them on every iteration over the data loader).
+            if 'persistent_workers' in self.config['dataloader']:
+                worker_options['persistent_workers'] = self.config['dataloader']['persistent_workers']
+            # Number of batches loaded in advance by every worker.
+            if 'prefetch_factor' in self.config['dataloader']:
+                worker_options['prefetch_factor'] = self.config['dataloader']['prefetch_factor']
+
+        if isinstance(self.sampler, BatchSampler):
+            # Batch sampler is exclusive with batch size, shuffle, sampler and drop last.
+            self.dataloader = DataLoader(dataset=self.task,
+                    batch_sampler=self.sampler,
+                    num_workers=self.config['dataloader']['num_workers'],
+                    collate_fn=collate_fn,
+                    pin_memory=self.config['dataloader']['pin_memory'],
+                    timeout=self.config['dataloader']['timeout'],
+                    worker_init_fn=self.worker_init_fn,
+                    **worker_options)
+        else:
+            # build the DataLoader on top of the validation task
+            self.dataloader = DataLoader(dataset=self.task,
+                    batch_size=self.config['task']['batch_size'],
+                    shuffle=self.config['dataloader']['shuffle'],
+                    sampler=self.sampler,
+                    batch_sampler= None,
+                    num_workers=self.config['dataloader']['num_workers'],
+                    collate_fn=collate_fn,
+                    pin_memory=self.config['dataloader']['pin_memory'],
+                    drop_last=self.config['dataloader']['drop_last'],
+                    timeout=self.config['dataloader']['timeout'],
+                    worker_init_fn=self.worker_init_fn,
+                    **worker_options)
+
+        # Batches for partial validation will be returned by a new iterator.
+        self.batch_iterator = None
+
+
+    def set_sampler(self, sampler):
+        """
+        Replaces the sampler and recreates the data loader (keeping its collate function, \
+        e.g. the one executing the loader-side components).
+
+        :param sampler: New sampler, e.g. a list of indices of samples (in the order they will be returned).
+        """
+        self.sampler = sampler
+        # Set shuffle to False - REQUIRED as sampler and shuffle are exclusive.
+        self.config['dataloader'].add_config_params({'shuffle': False})
+        self.create_dataloader(self.dataloader.collate_fn)
+
+
+    def set_loader_side_components(self, components):
+        """
+        Sets components of the pipeline that will be executed by the data loader, on batches collated by the task.
+
+        :param components: List of components (sorted by priorities), e.g. returned by \
+            :py:func:`ptp.application.PipelineManager.loader_side_components`.
+        """
+        if len(components) == 0:
+            return
+        self.loader_side_components = components
+        self.loader_side = True
+        self.dataloader.collate_fn = LoaderSideCollate(self.task.get_collate_fn(), components)
+        self.logger.info("Components {} will be executed by the data loader ({} workers)".format(
+            [component.name for component in components], self.dataloader.num_workers))
+
+
+    def output_data_definitions(self):
+        """
+        Returns definitions of streams in batches returned by the data loader, i.e. produced by the task \
+        and by the loader-side components.
+
+        :return: dictionary containing output data definitions (each of type :py:class:`ptp.utils.DataDefinition`).
+        """
+        definitions = self.task.output_data_definitions()
+        for component in self.loader_side_components:
+            definitions.update(component.output_data_definitions())
+        return definitions
+
+
     def __len__(self):
         """
         Returns total number of samples, calculated depending on the settings (batch size, dataloader, drop last etc.).
         """
-        if self.dataloader.drop_last:
+        if self.config['dataloader']['drop_last']:
             # if we are supposed to drop the last (incomplete) batch.
-            total_num_samples = len(self.dataloader) * self.dataloader.batch_size
-        elif self.sampler is not None:
-            total_num_samples = len(self.sampler)
+            total_num_samples = len(self.dataloader) * self.config['task']['batch_size']
         else:
-            total_num_samples = len(self.task)
+            total_num_samples = self.get_sampler_size()
 
         return total_num_samples
 
 
+    def get_sampler_size(self):
+        """
+        Returns number of samples drawn in a single epoch - by the sampler (or the base sampler of batch sampler) or the task.
+        """
+        if isinstance(self.sampler, BatchSampler):
+            return len(self.sampler.sampler)
+        elif self.sampler is not None:
+            return len(self.sampler)
+        else:
+            return len(self.task)
+
+
     def get_epoch_size(self):
         """
         Compute the number of iterations ('episodes') to run given the size of the dataset and the batch size to cover
@@ -179,17 +341,19 @@ class TaskManager(object):
         :return: Number of iterations to perform to go though the entire dataset once.
 
         """
+        # Batch sampler knows the number of batches (which might vary when batches are formed by the budget of tokens).
+        if isinstance(self.sampler, BatchSampler):
+            return len(self.sampler)
+
         # "Estimate" dataset size.
-        if (self.sampler is not None):
-            task_size = len(self.sampler)
-        else:
-            task_size = len(self.task)
+        task_size = self.get_sampler_size()
+        batch_size = self.config['task']['batch_size']
 
         # If task_size is a multiciplity of batch_size OR drop last is set.
-        if (task_size % self.dataloader.batch_size) == 0 or self.dataloader.drop_last:
-            return task_size // self.dataloader.batch_size
+        if (task_size % batch_size) == 0 or self.config['dataloader']['drop_last']:
+            return task_size // batch_size
         else:
-            return (task_size // self.dataloader.batch_size) + 1
+            return (task_size // batch_size) + 1
 
     def initialize_epoch(self):
         """
@@ -201,13 +365,80 @@ class TaskManager(object):
 
         # Generate a single batch used for partial validation.
         if self.name == 'validation':
-            if self.batch is None or (self.sampler is not None and "kFold" in type(self.sampler).__name__):
-                self.batch = next(iter(self.dataloader))
+            # Base sampler of batch sampler might be also a k-fold one.
+            sampler = self.sampler.sampler if isinstance(self.sampler, BatchSampler) else self.sampler
+            if self.batch is None or (sampler is not None and "kFold" in type(sampler).__name__):
+                self.batch = self.next_batch()
         # TODO refine partial validation section.
         # partial_validation:
         #   interval: 100 # How often to test.
         #   resample_at_epoch: True # at the beginning of new epoch.
 
+    def iterate(self):
+        """
+        Iterates over batches returned by the data loader, logging the time of loading the first batch \
+        (what includes the startup of worker processes, unless they are persistent and already running).
+
+        .. note::
+
+            With persistent workers the data loader reuses a single, long-lived iterator (and its worker processes), \
+            so consecutive iterations (epochs, batches used for partial validation) do not fork the workers again.
+
+        :return: Generator of batches.
+        """
+        start = time.time()
+        if self.dataloader.persistent_workers:
+            # The persistent iterator will be reset, so batches for partial validation will need a new pass.
+            self.batch_iterator = None
+        iterator = iter(self.dataloader)
+        for i, batch in enumerate(iterator):
+            if i == 0:
+                self.logger.info("First batch of '{}' loaded in {:.3f}s ({} workers{})".format(
+                    self.name, time.time() - start, self.dataloader.num_workers, ", persistent" if self.dataloader.persistent_workers else ""))
+            if i == len(iterator) - 1:
+                # Non-persistent workers are shut down when the iteration ends, so check their memory before.
+                self.log_worker_memory(iterator)
+            yield batch
+
+
+    def next_batch(self):
+        """
+        Returns the next batch from a dedicated, long-lived iterator (restarted when exhausted), \
+        so getting a batch for partial validation does not start new worker processes every time.
+
+        .. note::
+
+            With persistent workers the data loader keeps a single iterator, that is reset by every iteration \
+            (e.g. by the full validation, see :py:func:`iterate`). In that case the iterator is re-created \
+            (i.e. a new pass is started by the already running workers) only after such a reset.
+
+        :return: Batch returned by the data loader.
+        """
+        if self.batch_iterator is not None:
+            try:
+                return next(self.batch_iterator)
+            except StopIteration:
+                pass
+        self.batch_iterator = iter(self.dataloader)
+        return next(self.batch_iterator)
+
+
+    def log_worker_memory(self, iterator):
+        """
+        Logs memory used by the worker processes of the data loader.
+
+        Unique set size (USS) shows how much memory a worker does not share with the main process, \
+        e.g. whether it has created its private (copy-on-write) copy of the dataset.
+
+        :param iterator: Iterator of the data loader.
+        """
+        memory = [get_process_memory(worker.pid) for worker in getattr(iterator, '_workers', [])]
+        if len(memory) == 0 or None in memory:
+            return
+        self.logger.info("Memory of '{}' workers (RSS / USS): {}".format(self.name, ", ".join(
+            "#{}: {:.1f} / {:.1f} MB".format(i, rss / 2**20, uss / 2**20) for i, (rss, uss) in enumerate(memory))))
+
+
     def finalize_epoch(self):
         """
         Function called at the end of an epoch to finalize it.
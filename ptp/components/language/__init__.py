@@ -3,6 +3,7 @@ from .label_indexer import LabelIndexer
 from .sentence_indexer import SentenceIndexer
 from .sentence_one_hot_encoder import SentenceOneHotEncoder
 from .sentence_tokenizer import SentenceTokenizer
+from .tokenize_index import TokenizeIndex
 from .word_decoder import WordDecoder
 
 __all__ = [
@@ -11,5 +12,6 @@ __all__ = [
     'SentenceIndexer',
     'SentenceOneHotEncoder',
     'SentenceTokenizer',
+    'TokenizeIndex',
     'WordDecoder'
     ]
@@ -0,0 +1,186 @@
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+
+import re
+import string
+import functools
+import itertools
+import numpy as np
+import torch
+
+from ptp.components.component import Component
+from ptp.data_types.data_definition import DataDefinition
+from ptp.components.mixins.word_mappings import WordMappings, pad_trunc_list
+from ptp.configuration.config_parsing import get_value_list_from_dictionary
+
+
+class TokenizeIndex(Component, WordMappings):
+    """
+    Class fusing the ``SentenceTokenizer`` and ``SentenceIndexer`` components: changes batch of sentences \
+    (strings) directly into a single tensor with indices of words, padded with the index of <PAD>.
+
+    In comparison to the chain of those components, preprocessing is done with a single translation table, \
+    tokenization with a precompiled regular expression (equivalent to NLTK's WhitespaceTokenizer), \
+    indices of the already seen sentences are retrieved from a LRU cache and the batch is written \
+    into a single preallocated array.
+    """
+    def __init__(self, name, config):
+        """
+        Initializes the component.
+
+        :param name: Component name (read from configuration file).
+        :type name: str
+
+        :param config: Dictionary of parameters (read from the configuration ``.yaml`` file).
+        :type config: :py:class:`ptp.configuration.ConfigInterface`
+
+        """
+        # Call constructor(s) of parent class(es) - in the right order!
+        Component.__init__(self, name, TokenizeIndex, config)
+        WordMappings.__init__(self)
+
+        # Set key mappings.
+        self.key_inputs = self.stream_keys["inputs"]
+        self.key_outputs = self.stream_keys["outputs"]
+
+        # Get preprocessing.
+        self.preprocessing = get_value_list_from_dictionary(
+            "preprocessing", self.config,
+            'none | lowercase | remove_punctuation | all'.split(" | ")
+            )
+        if 'none' in self.preprocessing:
+            self.preprocessing = []
+        if 'all' in self.preprocessing:
+            self.preprocessing = 'lowercase | remove_punctuation'.split(" | ")
+        self.logger.info("Applied preprocessing: {}".format(self.preprocessing))
+        self.lowercase = 'lowercase' in self.preprocessing
+
+        remove_characters = get_value_list_from_dictionary("remove_characters", self.config)
+        self.logger.info("Additional characters that will be removed during preprocessing: {}".format(remove_characters))
+
+        # Build the translation table.
+        self.translator = {}
+        if 'remove_punctuation' in self.preprocessing:
+            self.translator.update(str.maketrans('', '', string.punctuation))
+        if all(len(chars) == 1 for chars in remove_characters):
+            # Single characters are replaced by spaces BEFORE punctuation is removed, so they override it.
+            self.translator.update({ord(char): ' ' for char in remove_characters})
+            self.remove_strings = []
+        else:
+            # Strings must be replaced one by one (as in SentenceTokenizer).
+            self.remove_strings = remove_characters
+
+        # Tokenizer - splits text on whitespaces.
+        self.tokenizer = re.compile(r'\S+')
+
+        # Force padding to a fixed length
+        self.fixed_padding = self.config['fixed_padding']
+
+        # Get index of padding and <EOS>.
+        self.pad_index = self.word_to_ix['<PAD>']
+        self.eos_index = self.word_to_ix['<EOS>'] if self.config['eos_token'] else None
+
+        # Wrap encoding of sentences with LRU cache.
+        cache_size = self.config['cache_size']
+        self.encode_sentence = functools.lru_cache(maxsize = cache_size if cache_size >= 0 else None)(self.encode_sentence)
+
+
+    def input_data_definitions(self):
+        """ 
+        Function returns a dictionary with definitions of input data that are required by the component.
+
+        :return: dictionary containing input data definitions (each of type :py:class:`ptp.utils.DataDefinition`).
+        """
+        return {
+            self.key_inputs: DataDefinition([-1, 1], [list, str], "Batch of sentences, each represented as a single string [BATCH_SIZE] x [string]"),
+            }
+
+
+    def output_data_definitions(self):
+        """ 
+        Function returns a dictionary with definitions of output data produced the component.
+
+        :return: dictionary containing output data definitions (each of type :py:class:`ptp.utils.DataDefinition`).
+        """
+        return {
+            self.key_outputs: DataDefinition([-1, -1], [torch.Tensor], "Batch of sentences represented as a single tensor of indices of particular words  [BATCH_SIZE x SEQ_LENGTH]"),
+            }
+
+
+    def tokenize(self, text):
+        """
+        Changes text (sentence) into list of tokens (words).
+
+        :param text: sentence (string).
+
+        :return: list of words (strings).
+        """
+        # Lowercase.
+        if self.lowercase:
+            text = text.lower()
+
+        # Remove strings.
+        for chars in self.remove_strings:
+            text = text.replace(chars, ' ')
+
+        # Remove characters and punctuation.
+        text = text.translate(self.translator)
+
+        # Tokenize.
+        return self.tokenizer.findall(text)
+
+
+    def encode_sentence(self, text):
+        """
+        Changes text (sentence) into indices of words, optionally padded to a fixed length.
+
+        :param text: sentence (string).
+
+        :return: tuple of indices.
+        """
+        word_to_ix = self.word_to_ix
+        indices = [word_to_ix[token] for token in self.tokenize(text)]
+
+        # Apply fixed padding to all sequences if requested
+        if self.fixed_padding > 0:
+            pad_trunc_list(indices, self.fixed_padding, padding_value=self.pad_index, eos_value=self.eos_index)
+
+        return tuple(indices)
+
+
+    def __call__(self, data_streams):
+        """
+        Encodes "inputs" in the format of batch of sentences into a single tensor with corresponding indices.
+
+        :param data_streams: :py:class:`ptp.datatypes.DataStreams` object containing (among others):
+
+            - "inputs": expected input field containing list of sentences [BATCH_SIZE] x [string]
+
+            - "outputs": added output field containing tensor with indices [BATCH_SIZE x SEQ_SIZE] 
+        """
+        # Encode sentences.
+        encoded = [self.encode_sentence(sample) for sample in data_streams[self.key_inputs]]
+        lengths = np.fromiter((len(indices) for indices in encoded), dtype=np.int64, count=len(encoded))
+        max_length = int(lengths.max()) if len(encoded) > 0 else 0
+
+        # Allocate the whole output at once and fill it with indices of all sentences.
+        output = np.full((len(encoded), max_length), self.pad_index, dtype=np.int64)
+        mask = np.arange(max_length) < lengths[:, None]
+        output[mask] = np.fromiter(itertools.chain.from_iterable(encoded), dtype=np.int64, count=int(lengths.sum()))
+
+        # Create the returned dict.
+        data_streams.publish({self.key_outputs: torch.from_numpy(output).to(self.app_state.device)})
@@ -109,11 +109,8 @@ class Loss(Component):
         :param stat_agg: ``StatisticsAggregator``
 
         """
-        # Get loss values.
-        loss_values = stat_col[self.key_loss]
-
-        # Calculate default aggregates.
-        stat_agg.aggregators[self.key_loss] = torch.mean(torch.tensor(loss_values))
-        stat_agg.aggregators[self.key_loss+'_min'] = min(loss_values)
-        stat_agg.aggregators[self.key_loss+'_max'] = max(loss_values)
-        stat_agg.aggregators[self.key_loss+'_std'] = 0.0 if len(loss_values) <= 1 else torch.std(torch.tensor(loss_values))
+        # Get default aggregates (std is the unbiased estimate).
+        stat_agg.aggregators[self.key_loss] = stat_col.mean(self.key_loss)
+        stat_agg.aggregators[self.key_loss+'_min'] = stat_col.min(self.key_loss)
+        stat_agg.aggregators[self.key_loss+'_max'] = stat_col.max(self.key_loss)
+        stat_agg.aggregators[self.key_loss+'_std'] = stat_col.std(self.key_loss, unbiased=True)
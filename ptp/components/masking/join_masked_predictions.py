@@ -17,12 +17,46 @@
 __author__ = "Tomasz Kornuta"
 
 import torch
-import numpy as np
+from collections.abc import Sequence
 
 from ptp.components.component import Component
 from ptp.data_types.data_definition import DataDefinition
 
 
+class LazyStrings(Sequence):
+    """
+    List of strings corresponding to a tensor of indices, translated using the word mappings only when accessed \
+    (i.e. there is no cost when none of the downstream components reads the strings).
+    """
+
+    def __init__(self, indices, ix_to_word):
+        """
+        Stores the indices and the (inverse) word mappings.
+
+        :param indices: Tensor of indices [BATCH_SIZE].
+
+        :param ix_to_word: Dictionary translating indices to words.
+        """
+        self.indices = indices
+        self.ix_to_word = ix_to_word
+        self.strings = None
+
+    def __getitem__(self, index):
+        # Translate all indices at the first access.
+        if self.strings is None:
+            self.strings = [self.ix_to_word[ix] for ix in self.indices.tolist()]
+        return self.strings[index]
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
 class JoinMaskedPredictions(Component):
     """
     Class responsible joining several prediction streams using the associated masks.
@@ -64,22 +98,29 @@ class JoinMaskedPredictions(Component):
         if type(input_word_mappings_keys) == str:
             input_word_mappings_keys = input_word_mappings_keys.replace(" ", "").split(",")
 
+        # Get output key mappings.
+        self.key_output_indices = self.stream_keys["output_indices"]
+        self.key_output_strings = self.stream_keys["output_strings"]
+
+        # Retrieve output word mappings from globals.
+        self.output_word_to_ix = self.globals["output_word_mappings"]
+        # Create inverse transformation.
+        self.output_ix_to_word = {value: key for (key, value) in self.output_word_to_ix.items()}
+
         # Retrieve input word mappings from globals.
         self.input_ix_to_word = []
+        self.input_ix_remaps = []
         for wmk in input_word_mappings_keys:
             # Get word mappings.
             word_to_ix = self.globals[wmk]
             # Create inverse transformation.
             ix_to_word = {value: key for (key, value) in word_to_ix.items()}
             self.input_ix_to_word.append(ix_to_word)
-
-
-        # Get output key mappings.
-        self.key_output_indices = self.stream_keys["output_indices"]
-        self.key_output_strings = self.stream_keys["output_strings"]
-
-        # Retrieve output word mappings from globals.
-        self.output_word_to_ix = self.globals["output_word_mappings"]
+            # Create tensor translating input indices to output indices (-1 for words missing in the output mappings).
+            remap = torch.full((max(ix_to_word.keys(), default=-1) + 1,), -1, dtype=torch.int64)
+            for (ix, word) in ix_to_word.items():
+                remap[ix] = self.output_word_to_ix.get(word, -1)
+            self.input_ix_remaps.append(remap)
 
 
     def input_data_definitions(self):
@@ -124,63 +165,34 @@ class JoinMaskedPredictions(Component):
             - "outputs": added output field containing tensor [BATCH_SIZE x ...] 
         """
         # Get inputs masks.
-        masks = []
-        for imsk in self.input_mask_stream_keys:
-            # Get mask from stream.
-            mask = data_streams[imsk]
-            masks.append(mask.data.cpu().numpy())
-        
-        # Sum all masks and make sure that they are complementary.
-        masks_sum = np.sum(masks, axis=0)
-        batch_size = masks_sum.shape[0]
-        sum_ones = sum(filter(lambda x: x == 1, masks_sum))
-        if sum_ones != batch_size:
+        masks = torch.stack([data_streams[imsk].data.cpu().long() for imsk in self.input_mask_stream_keys])
+
+        # Make sure that masks are complementary.
+        if not bool((masks.sum(0) == 1).all()):
             self.logger.error("Masks received from the {} streams are not complementary!".format(self.input_mask_stream_keys))
             exit(-1)
-
-        # Create mapping indicating from which input prediction/mask/dictionary stream we will take data associated with given "sample".
-        weights = np.array(range(len(masks)))
-        masks = np.array(masks).transpose()
-        mapping = np.dot(masks, weights)
-        #print("Mapping = \n",mapping)
-
-        # "Translate". 
-        output_answers = []
-        output_indices = []
-        output_predictions_lst = []
-        # Iterate through samples.
-        for sample in range(batch_size):
-            # Get the right dictionary.
-            ix_to_word = self.input_ix_to_word[mapping[sample]]
-            #print(ix_to_word)
-
-            # Get the right sample from the right prediction stream.
-            sample_prediction = data_streams[self.input_prediction_stream_keys[mapping[sample]]][sample]
-            #print(sample_prediction)
-            output_predictions_lst.append(sample_prediction)
-
-            # Get the index of max log-probabilities.
-            index = sample_prediction.max(0)[1].data.cpu().item()
-            #print(index)
-            
-            # Get the right word.
-            word = ix_to_word[index]
-            output_answers.append(word)
-
-            # Get original index using output dictionary.
-            output_indices.append(self.output_word_to_ix[word])
-
-        #print(output_predictions_lst)
-        #targets = data_streams["targets"].data.cpu().numpy()
-        #print("targets = \n",targets.tolist())
-        #print("joined answers = \n",output_indices)
-
-        # Change to tensor.
-        output_indices_tensor = torch.tensor(output_indices)
-
-        # Extend the dict by returned output streams.
+        masks = masks.bool()
+
+        # "Translate" predictions from all streams at once.
+        output_indices = torch.zeros(masks.shape[1], dtype=torch.int64)
+        for (ipsk, remap, mask) in zip(self.input_prediction_stream_keys, self.input_ix_remaps, masks):
+            if not bool(mask.any()):
+                continue
+            predictions = data_streams[ipsk].data
+            # Get the indices of max log-probabilities - only of the samples selected by mask.
+            indices = predictions[mask.to(predictions.device)].argmax(1).cpu()
+            # Get original indices using output dictionary.
+            output_indices[mask] = remap[indices]
+
+        # Check whether all words were found in the output dictionary.
+        if bool((output_indices < 0).any()):
+            sample = int((output_indices < 0).nonzero()[0])
+            stream = int(masks[:, sample].nonzero()[0])
+            index = int(data_streams[self.input_prediction_stream_keys[stream]][sample].argmax(0))
+            raise KeyError(self.input_ix_to_word[stream][index])
+
+        # Extend the dict by returned output streams - the words will be retrieved only when accessed.
         data_streams.publish({
-            self.key_output_indices: output_indices_tensor,
-            self.key_output_strings: output_answers
+            self.key_output_indices: output_indices,
+            self.key_output_strings: LazyStrings(output_indices, self.output_ix_to_word)
             })
-        
@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import os
+import json
+import array
+import hashlib
+import numpy as np
+
+
+# Marker of a missing integer value.
+MISSING_INT = np.iinfo(np.int64).min
+
+
+class TextColumnWriter(object):
+    """
+    Writes strings to a file of UTF-8 bytes, keeping offsets of their ends.
+    """
+
+    def __init__(self, prefix):
+        """
+        :param prefix: Prefix of the column files.
+        """
+        self.prefix = prefix
+        self.file = open(prefix + ".data.bin", 'wb')
+        self.offsets = array.array('q', [0])
+
+
+    def append(self, text):
+        """
+        Appends string to the column.
+
+        :param text: String.
+
+        :return: Index of the string.
+        """
+        data = text.encode('utf-8')
+        self.file.write(data)
+        self.offsets.append(self.offsets[-1] + len(data))
+        return len(self.offsets) - 2
+
+
+    def close(self):
+        self.file.close()
+        np.save(self.prefix + ".offsets.npy", np.frombuffer(self.offsets, dtype=np.int64))
+
+
+class TextColumn(object):
+    """
+    Memory-mapped column of strings (UTF-8 bytes plus offsets).
+    """
+
+    def __init__(self, prefix):
+        """
+        :param prefix: Prefix of the column files.
+        """
+        self.offsets = np.load(prefix + ".offsets.npy", mmap_mode='r')
+        # Memory mapping of an empty file is not allowed.
+        if self.offsets[-1] > 0:
+            self.data = np.memmap(prefix + ".data.bin", dtype=np.uint8, mode='r')
+        else:
+            self.data = np.empty(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return self.data[self.offsets[index]:self.offsets[index+1]].tobytes().decode('utf-8')
+
+
+class CategoryColumnWriter(object):
+    """
+    Writes strings with repeating values (e.g. answers or image ids) as a table of unique values and int32 codes.
+    """
+
+    def __init__(self, prefix):
+        """
+        :param prefix: Prefix of the column files.
+        """
+        self.prefix = prefix
+        self.table = TextColumnWriter(prefix + ".table")
+        self.value_to_code = {}
+        self.codes = array.array('i')
+
+
+    def append(self, value):
+        """
+        Appends value to the column.
+
+        :param value: String or None (missing value).
+        """
+        if value is None:
+            self.codes.append(-1)
+            return
+        code = self.value_to_code.get(value)
+        if code is None:
+            code = self.table.append(value)
+            self.value_to_code[value] = code
+        self.codes.append(code)
+
+
+    def close(self):
+        self.table.close()
+        np.save(self.prefix + ".codes.npy", np.frombuffer(self.codes, dtype=np.int32))
+
+
+class CategoryColumn(object):
+    """
+    Memory-mapped column of strings with repeating values.
+    """
+
+    def __init__(self, prefix):
+        """
+        :param prefix: Prefix of the column files.
+        """
+        table = TextColumn(prefix + ".table")
+        # Table of unique values is small, decode it at once.
+        self.table = [table[i] for i in range(len(table))]
+        self.codes = np.load(prefix + ".codes.npy", mmap_mode='r')
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        code = self.codes[index]
+        return self.table[code] if code >= 0 else None
+
+
+class IntColumnWriter(object):
+    """
+    Writes (optional) integer values.
+    """
+
+    def __init__(self, prefix):
+        """
+        :param prefix: Prefix of the column files.
+        """
+        self.prefix = prefix
+        self.values = array.array('q')
+
+    def append(self, value):
+        """
+        Appends value to the column.
+
+        :param value: Integer or None (missing value).
+        """
+        self.values.append(MISSING_INT if value is None else value)
+
+    def close(self):
+        np.save(self.prefix + ".values.npy", np.frombuffer(self.values, dtype=np.int64))
+
+
+class IntColumn(object):
+    """
+    Memory-mapped column of integers.
+    """
+
+    def __init__(self, prefix):
+        """
+        :param prefix: Prefix of the column files.
+        """
+        self.values = np.load(prefix + ".values.npy", mmap_mode='r')
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        value = self.values[index]
+        return int(value) if value != MISSING_INT else None
+
+
+# Classes of writers and readers of supported column types.
+COLUMN_TYPES = {
+    'text': (TextColumnWriter, TextColumn),
+    'category': (CategoryColumnWriter, CategoryColumn),
+    'int': (IntColumnWriter, IntColumn)
+    }
+
+
+class ColumnarDatasetWriter(object):
+    """
+    Writes records (dictionaries) incrementally into compact columnar arrays stored on disk, \
+    so the memory usage does not depend on the size of the dataset.
+
+    Supported types of columns are:
+
+        - ``text`` - UTF-8 strings plus offsets (e.g. questions),
+        - ``category`` - table of unique strings plus int32 codes (e.g. answers, image ids),
+        - ``int`` - int64 values (e.g. question family indices).
+
+    Columns of type ``category`` and ``int`` accept missing values (keys absent in the record).
+    Metadata is written when the writer is closed, so incomplete datasets are never opened.
+    """
+
+    def __init__(self, folder, columns):
+        """
+        Creates an empty dataset.
+
+        :param folder: Folder where the dataset will be stored.
+
+        :param columns: Dictionary of column types, indexed by names of columns (keys of records).
+        """
+        self.folder = os.path.expanduser(folder)
+        os.makedirs(self.folder, exist_ok=True)
+        # Remove metadata of the previous version of the dataset (if present).
+        if os.path.isfile(os.path.join(self.folder, "columns.json")):
+            os.remove(os.path.join(self.folder, "columns.json"))
+
+        self.columns = columns
+        self.writers = {name: COLUMN_TYPES[column_type][0](os.path.join(self.folder, "column_{}".format(i)))
+            for i, (name, column_type) in enumerate(columns.items())}
+        self.length = 0
+
+
+    def __len__(self):
+        return self.length
+
+
+    def append(self, record):
+        """
+        Appends record to the dataset.
+
+        :param record: Dictionary with values (keys not present in columns are ignored).
+        """
+        for name, writer in self.writers.items():
+            value = record.get(name)
+            if value is None and self.columns[name] == 'text':
+                raise KeyError("Record does not contain the required key '{}'".format(name))
+            writer.append(value)
+        self.length += 1
+
+
+    def close(self):
+        """
+        Closes all columns and writes the metadata.
+        """
+        for writer in self.writers.values():
+            writer.close()
+        metadata = {"columns": list(self.columns.items()), "length": self.length}
+        metadata_file = os.path.join(self.folder, "columns.json")
+        with open(metadata_file + ".tmp", 'w') as f:
+            json.dump(metadata, f)
+        os.replace(metadata_file + ".tmp", metadata_file)
+
+
+class ColumnarDataset(object):
+    """
+    Read-only dataset stored in columnar arrays (created by :py:class:`ColumnarDatasetWriter`), reopened via mmap.
+
+    Indexing returns records (dictionaries) created on the fly, with missing values skipped.
+    """
+
+    def __init__(self, folder):
+        """
+        Opens the dataset.
+
+        :param folder: Folder containing the dataset.
+        """
+        self.folder = os.path.expanduser(folder)
+        with open(os.path.join(self.folder, "columns.json"), 'r') as f:
+            metadata = json.load(f)
+        self.columns = [(name, column_type) for name, column_type in metadata["columns"]]
+        self.length = metadata["length"]
+        # Columns will be mapped on first access (also in every DataLoader worker).
+        self._columns = None
+
+
+    @staticmethod
+    def exists(folder):
+        """
+        Checks whether the (complete) dataset exists in a given folder.
+        """
+        return os.path.isfile(os.path.join(os.path.expanduser(folder), "columns.json"))
+
+
+    def __getstate__(self):
+        """
+        Excludes the memory-mapped arrays from pickling.
+        """
+        state = self.__dict__.copy()
+        state['_columns'] = None
+        return state
+
+
+    def column(self, name):
+        """
+        Returns column with a given name.
+
+        :param name: Name of the column.
+        """
+        if self._columns is None:
+            self._columns = {name: COLUMN_TYPES[column_type][1](os.path.join(self.folder, "column_{}".format(i)))
+                for i, (name, column_type) in enumerate(self.columns)}
+        return self._columns[name]
+
+
+    def __len__(self):
+        return self.length
+
+
+    def __getitem__(self, index):
+        """
+        Returns a single record.
+
+        :param index: Index of the record.
+
+        :return: Dictionary with values.
+        """
+        if index < 0:
+            index += self.length
+        if index < 0 or index >= self.length:
+            raise IndexError("Index {} out of range".format(index))
+        record = {}
+        for name, _ in self.columns:
+            value = self.column(name)[index]
+            if value is not None:
+                record[name] = value
+        return record
+
+
+def get_cache_folder(cache_root, name, source_files, columns):
+    """
+    Returns folder of the columnar dataset converted from given source files.
+
+    Name of the folder contains a hash of paths, modification times and sizes of the source files and the columns, \
+    so the dataset is converted again when any of those changes.
+
+    :param cache_root: Root folder of the cache.
+
+    :param name: Name of the dataset (prefix of the folder).
+
+    :param source_files: List of source files.
+
+    :param columns: Dictionary of column types.
+
+    :return: Path to the folder.
+    """
+    key = json.dumps([
+        [(os.path.abspath(source_file), os.path.getmtime(source_file), os.path.getsize(source_file)) for source_file in source_files],
+        list(columns.items())
+        ])
+    return os.path.join(os.path.expanduser(cache_root), "{}_{}".format(name, hashlib.md5(key.encode()).hexdigest()))
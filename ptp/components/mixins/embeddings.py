@@ -18,12 +18,20 @@
 __author__ = "Tomasz Kornuta"
 
 import os
+import json
+import array
+import hashlib
 import numpy as np
 import tqdm
 
 import torch
 
 import ptp.components.mixins.io as io
+from ptp.components.mixins.columnar_dataset import TextColumnWriter, TextColumn
+
+
+# Version of the binary format of embeddings - change it to force the conversion.
+BINARY_EMBEDDINGS_VERSION = 1
 
 
 def load_pretrained_embeddings(logger, folder, embeddings_name, word_to_ix, embeddings_size):
@@ -114,40 +122,181 @@ def load_pretrained_embeddings(logger, folder, embeddings_name, word_to_ix, embe
         else: 
             logger.info("File '{}' containing pretrained embeddings found in '{}' folder".format(embeddings_name, folder))
 
-        # Get number of lines/vectors.
-        num_lines = sum([1 for line in open(os.path.join(folder, embeddings_name))])
-        t = tqdm.tqdm(total=num_lines)
-
-        with open(os.path.join(folder, embeddings_name)) as f:
-            # Parse file and cherry pick the vectors that fit our vocabulary.
-            for line in f.readlines():
-                values = line.split()
-                if len(values) > embeddings_size+1:
-                    #print(len(values))
-                    # Case: two (or more) words!
-                    num_words = len(values) - embeddings_size
-                    words = values[0:num_words]
-                    word = ' '.join(words)
-                    #print(word)
-                    # Get remaining vector.
-                    vector = np.array(values[num_words:], dtype='float32')
-                else:
-                    # Get word.
-                    word = values[0]
-                    # Get remaining vector.
-                    vector = np.array(values[1:], dtype='float32')
-                # Get index.
-                index = word_to_ix.get(word)
-                if index:
-                    assert (len(vector) == embeddings_size), "Embeddings size must be equal to the size of pretrained embeddings!"
-                    # Ok, set vector.
-                    embeddings[index] = vector
-                    # Increment counter.
-                    num_loaded_embs += 1
-                t.update()
-            t.close()
+        # Convert the text file to the binary format (only once).
+        binary_folder = convert_embeddings_to_binary(logger, folder, embeddings_name, embeddings_size)
+
+        # Cherry pick the vectors that fit our vocabulary.
+        num_loaded_embs = gather_binary_embeddings(binary_folder, word_to_ix, embeddings)
 
     logger.info("Loaded {} pretrained embeddings for vocabulary of size {} from {}".format(num_loaded_embs, len(word_to_ix), embeddings_name))
 
     # Return matrix with embeddings.
     return torch.from_numpy(embeddings).float()
+
+
+def hash_word(word):
+    """
+    Calculates stable (i.e. independent of the process) 64-bit hash of a word.
+
+    :param word: Word (string).
+
+    :return: Hash (int).
+    """
+    return int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def write_vectors(f, vectors, embeddings_size):
+    """
+    Parses vectors and writes them to a binary file (as float32).
+
+    :param f: File object (opened in binary mode).
+
+    :param vectors: List of strings with values of vectors.
+
+    :param embeddings_size: Embeddings size.
+
+    :return: Number of written vectors.
+    """
+    vectors = np.loadtxt(vectors, dtype=np.float32, comments=None, ndmin=2)
+    assert (vectors.shape[1] == embeddings_size), "Embeddings size must be equal to the size of pretrained embeddings!"
+    f.write(vectors.tobytes())
+    return vectors.shape[0]
+
+
+def convert_embeddings_to_binary(logger, folder, embeddings_name, embeddings_size, chunk_size = 10000):
+    """
+    Converts the text file with pretrained embeddings (e.g. GloVe) into a binary format, consisting of:
+        - float32 matrix with vectors (memory-mapped when loading),
+        - words (UTF-8 bytes plus offsets),
+        - index of words: sorted hashes of words along with the associated rows of the matrix.
+
+    The file is parsed line by line, so the memory usage does not depend on its size. \
+    Conversion is skipped if the binary format was already created from the same file.
+
+    :param logger: Logger object.
+
+    :param folder: Relative path to to the folder.
+    :type folder: str
+
+    :param embeddings_name: Name of the text file with embeddings.
+
+    :param embeddings_size: Embeddings size. Warning: must match the length of vector in the selected file.
+
+    :param chunk_size: Number of vectors parsed at once (DEFAULT: 10000)
+
+    :return: Folder containing the binary format.
+    """
+    folder = os.path.expanduser(folder)
+    source_file = os.path.join(folder, embeddings_name)
+    binary_folder = source_file + ".binary"
+    metadata_file = os.path.join(binary_folder, "metadata.json")
+
+    # Check whether the binary format was created from the same file.
+    source = {"size": os.path.getsize(source_file), "mtime": os.path.getmtime(source_file)}
+    if os.path.isfile(metadata_file):
+        with open(metadata_file, 'r') as f:
+            metadata = json.load(f)
+        if metadata["version"] == BINARY_EMBEDDINGS_VERSION and metadata["source"] == source:
+            assert (metadata["embeddings_size"] == embeddings_size), "Embeddings size must be equal to the size of pretrained embeddings!"
+            logger.info("Found pretrained embeddings '{}' in the binary format".format(embeddings_name))
+            return binary_folder
+        # Remove metadata of the outdated version.
+        os.remove(metadata_file)
+
+    logger.info("Converting pretrained embeddings '{}' to the binary format, please wait...".format(embeddings_name))
+    os.makedirs(binary_folder, exist_ok=True)
+    words = TextColumnWriter(os.path.join(binary_folder, "words"))
+    hashes = array.array('Q')
+    num_vectors = 0
+    num_skipped_lines = 0
+
+    t = tqdm.tqdm(total=source["size"], unit='B', unit_scale=True)
+    with open(source_file, 'rb') as f, open(os.path.join(binary_folder, "vectors.bin"), 'wb') as vectors_file:
+        vectors = []
+        for line in f:
+            t.update(len(line))
+            line = line.rstrip()
+            if line.count(b' ') == embeddings_size:
+                # Typical case: word and values separated by single spaces.
+                (word, vector) = line.split(b' ', 1)
+                word = word.decode('utf-8')
+            else:
+                values = line.decode('utf-8').split()
+                if len(values) <= embeddings_size:
+                    # Skip empty (or broken) lines.
+                    num_skipped_lines += 1
+                    continue
+                # Word can consist of two (or more) "words" separated by spaces!
+                word = ' '.join(values[:-embeddings_size])
+                vector = ' '.join(values[-embeddings_size:])
+            words.append(word)
+            hashes.append(hash_word(word))
+            vectors.append(vector)
+            if len(vectors) == chunk_size:
+                num_vectors += write_vectors(vectors_file, vectors, embeddings_size)
+                vectors = []
+        if len(vectors) > 0:
+            num_vectors += write_vectors(vectors_file, vectors, embeddings_size)
+    t.close()
+    words.close()
+    if num_skipped_lines > 0:
+        logger.warning("Skipped {} lines that do not contain vectors of size {}".format(num_skipped_lines, embeddings_size))
+
+    # Create index of words: stable sort by hash, so the last occurrence of a duplicated word can be found.
+    hashes = np.frombuffer(hashes, dtype=np.uint64)
+    rows = np.argsort(hashes, kind='stable')
+    np.save(os.path.join(binary_folder, "hashes.npy"), hashes[rows])
+    np.save(os.path.join(binary_folder, "rows.npy"), rows)
+
+    # Write metadata at the end, so incomplete conversions are never used.
+    metadata = {"version": BINARY_EMBEDDINGS_VERSION, "source": source, "embeddings_size": embeddings_size, "num_vectors": num_vectors}
+    with open(metadata_file + ".tmp", 'w') as f:
+        json.dump(metadata, f)
+    os.replace(metadata_file + ".tmp", metadata_file)
+    logger.info("Converted {} vectors of pretrained embeddings to '{}'".format(num_vectors, binary_folder))
+    return binary_folder
+
+
+def gather_binary_embeddings(binary_folder, word_to_ix, embeddings):
+    """
+    Copies vectors of words from (word:index) mappings found in the embeddings stored in the binary format.
+
+    :param binary_folder: Folder containing the binary format.
+
+    :param word_to_ix: (word:index) mappings
+    :type word_to_ix: dict
+
+    :param embeddings: Matrix (numpy array) of embeddings, with rows indexed by indices of words (modified in place).
+
+    :return: Number of copied vectors.
+    """
+    with open(os.path.join(binary_folder, "metadata.json"), 'r') as f:
+        metadata = json.load(f)
+    if metadata["num_vectors"] == 0 or len(word_to_ix) == 0:
+        return 0
+    vectors = np.memmap(os.path.join(binary_folder, "vectors.bin"), dtype=np.float32, mode='r', shape=(metadata["num_vectors"], metadata["embeddings_size"]))
+    words = TextColumn(os.path.join(binary_folder, "words"))
+    hashes = np.load(os.path.join(binary_folder, "hashes.npy"), mmap_mode='r')
+    rows = np.load(os.path.join(binary_folder, "rows.npy"), mmap_mode='r')
+
+    # Find ranges of entries with the same hashes as words from the vocabulary.
+    vocabulary = list(word_to_ix.keys())
+    word_hashes = np.array([hash_word(word) for word in vocabulary], dtype=np.uint64)
+    lefts = np.searchsorted(hashes, word_hashes, side='left')
+    rights = np.searchsorted(hashes, word_hashes, side='right')
+
+    found_indices = []
+    found_rows = []
+    for word, left, right in zip(vocabulary, lefts.tolist(), rights.tolist()):
+        # Check words (hashes can collide), starting from the last occurrence.
+        for i in range(right - 1, left - 1, -1):
+            row = int(rows[i])
+            if words[row] == word:
+                found_indices.append(word_to_ix[word])
+                found_rows.append(row)
+                break
+
+    # Gather the vectors.
+    if len(found_rows) > 0:
+        embeddings[found_indices] = vectors[np.array(found_rows)]
+    return len(found_rows)
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import os
+import json
+import hashlib
+import numpy as np
+
+import torch
+
+from ptp.configuration.config_parsing import load_class_default_config_file
+from ptp.configuration.configuration_error import ConfigurationError
+
+
+# Keys of component configuration that do not influence the produced features.
+IGNORED_CONFIG_KEYS = ['priority', 'streams', 'globals', 'freeze']
+
+
+def merge_dicts(defaults, params):
+    """
+    Recursively merges two dictionaries.
+
+    :param defaults: Dictionary with default values.
+
+    :param params: Dictionary with values overwriting the default ones.
+
+    :return: Merged dictionary.
+    """
+    merged = dict(defaults)
+    for key, value in params.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_dicts(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def calculate_config_hash(config):
+    """
+    Calculates hash of the configuration of a component (e.g. image encoder), merged with its default configuration.
+
+    Keys that do not influence the outputs of the component (priority, streams, globals, freeze) are skipped.
+
+    :param config: Configuration of the component (dict or :py:class:`ptp.configuration.ConfigInterface`).
+
+    :return: Hash (str).
+    """
+    import ptp
+    params = config if isinstance(config, dict) else config.to_dict()
+    if 'type' not in params:
+        raise ConfigurationError("Configuration of the encoder does not contain the key 'type' defining the component type")
+    try:
+        class_obj = getattr(ptp, params['type'])
+    except AttributeError:
+        raise ConfigurationError("Class '{}' not found in the list of Component classes".format(params['type']))
+    params = merge_dicts(load_class_default_config_file(class_obj), params)
+    params = {key: value for key, value in params.items() if key not in IGNORED_CONFIG_KEYS}
+    return hashlib.md5(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class FeatureStoreWriter(object):
+    """
+    Writes features (e.g. feature maps returned by a frozen image encoder) to a new feature store.
+
+    Features are appended to a binary file, while ids, shape, type and hash of the configuration of the encoder \
+    are written to a json file when the store is closed, so incomplete stores are never used.
+    """
+
+    def __init__(self, folder, name, config_hash, dtype='float16'):
+        """
+        Creates an empty store.
+
+        :param folder: Folder where the store will be created.
+
+        :param name: Name of the store.
+
+        :param config_hash: Hash of the configuration of the encoder (see :py:func:`calculate_config_hash`).
+
+        :param dtype: Type of the stored values: float16 | float32 (DEFAULT: float16)
+        """
+        if dtype not in ['float16', 'float32']:
+            raise ConfigurationError("Invalid type of the feature store '{}', accepted values: float16 | float32".format(dtype))
+        folder = os.path.expanduser(folder)
+        os.makedirs(folder, exist_ok=True)
+        self.data_file = os.path.join(folder, name + ".bin")
+        self.metadata_file = os.path.join(folder, name + ".json")
+        self.config_hash = config_hash
+        self.dtype = dtype
+        self.shape = None
+        self.ids = {}
+
+        # Remove metadata of the previous version of the store (if present).
+        if os.path.isfile(self.metadata_file):
+            os.remove(self.metadata_file)
+        self.file = open(self.data_file, 'wb')
+
+
+    def __len__(self):
+        return len(self.ids)
+
+
+    def __contains__(self, sample_id):
+        return sample_id in self.ids
+
+
+    def append(self, ids, features):
+        """
+        Appends features of the (new) samples to the store. Features of ids already present in the store are skipped.
+
+        :param ids: List of ids (e.g. image ids) [BATCH_SIZE]
+
+        :param features: Tensor with features [BATCH_SIZE x ...]
+        """
+        features = features.detach().cpu().numpy().astype(self.dtype)
+        if self.shape is None:
+            self.shape = list(features.shape[1:])
+        for sample_id, sample_features in zip(ids, features):
+            if sample_id in self.ids:
+                continue
+            self.ids[sample_id] = len(self.ids)
+            self.file.write(sample_features.tobytes())
+
+
+    def close(self):
+        """
+        Closes the binary file and writes the metadata.
+        """
+        self.file.close()
+        metadata = {
+            "ids": sorted(self.ids.keys(), key=self.ids.get),
+            "shape": self.shape,
+            "dtype": self.dtype,
+            "config_hash": self.config_hash
+            }
+        with open(self.metadata_file + ".tmp", 'w') as f:
+            json.dump(metadata, f)
+        os.replace(self.metadata_file + ".tmp", self.metadata_file)
+
+
+    def discard(self):
+        """
+        Closes and removes the binary file of an incomplete store (without writing the metadata).
+        """
+        self.file.close()
+        os.remove(self.data_file)
+
+
+class FeatureStore(object):
+    """
+    Read-only feature store, with features kept in a memory-mapped array indexed by ids.
+    """
+
+    def __init__(self, folder, name):
+        """
+        Opens the store.
+
+        :param folder: Folder containing the store.
+
+        :param name: Name of the store.
+        """
+        folder = os.path.expanduser(folder)
+        self.data_file = os.path.join(folder, name + ".bin")
+        metadata_file = os.path.join(folder, name + ".json")
+        if not os.path.isfile(metadata_file):
+            raise ConfigurationError("Feature store '{}' does not exist (or is incomplete)".format(metadata_file))
+        with open(metadata_file, 'r') as f:
+            metadata = json.load(f)
+
+        self.id_to_row = {sample_id: row for row, sample_id in enumerate(metadata["ids"])}
+        self.shape = metadata["shape"]
+        self.dtype = metadata["dtype"]
+        self.config_hash = metadata["config_hash"]
+
+        # Array will be mapped on first access (also in every DataLoader worker).
+        self._features = None
+
+
+    def __getstate__(self):
+        """
+        Excludes the memory-mapped array from pickling.
+        """
+        state = self.__dict__.copy()
+        state['_features'] = None
+        return state
+
+
+    def __len__(self):
+        return len(self.id_to_row)
+
+
+    def __contains__(self, sample_id):
+        return sample_id in self.id_to_row
+
+
+    @property
+    def features(self):
+        """
+        Returns the memory-mapped array of features (copy-on-write, so the store is never modified).
+        """
+        if self._features is None:
+            self._features = np.memmap(self.data_file, dtype=self.dtype, mode='c', shape=tuple([len(self)] + self.shape))
+        return self._features
+
+
+    def get_features(self, sample_id):
+        """
+        Returns features of a given sample.
+
+        :param sample_id: Id of the sample (e.g. image id).
+
+        :return: Features (float32 Tensor)
+        """
+        features = torch.from_numpy(self.features[self.id_to_row[sample_id]])
+        return features.float()
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import os
+import json
+import hashlib
+import multiprocessing
+import tqdm
+import numpy as np
+from PIL import Image
+
+import torch
+from torchvision import transforms
+
+
+# Normalization that the pretrained models from TorchVision require.
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
+
+def _preprocess_image(args):
+    """
+    Loads a single image and applies the deterministic transformations (executed in the worker processes).
+
+    :param args: Tuple (path, height, width, dtype, normalize).
+
+    :return: Tuple (image as [DEPTH x HEIGHT x WIDTH] NumPy array, original [height, width] of the image).
+    """
+    (path, height, width, dtype, normalize) = args
+    img = Image.open(path).convert('RGB')
+    (original_width, original_height) = img.size
+    img = transforms.Resize([height, width])(img)
+    if dtype == 'uint8':
+        # Keep the original values, ToTensor/normalization will be applied on read.
+        img = np.asarray(img, dtype=np.uint8).transpose(2, 0, 1)
+    else:
+        img = transforms.ToTensor()(img)
+        if normalize:
+            img = transforms.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD)(img)
+        img = img.numpy().astype(np.float16)
+    return img, (original_height, original_width)
+
+
+class ImageCache(object):
+    """
+    Cache of preprocessed (i.e. resized and optionally normalized) images, stored on disk in a memory-mapped array.
+
+    The cache is built once (in parallel, by a pool of processes) and afterwards images are read without copying, \
+    as views of the memory-mapped array. Images are stored either as:
+
+        - ``uint8`` - original (resized) values, ToTensor and normalization are applied on read (results are identical \
+        to the ones returned by the PIL-based pipeline),
+        - ``float16`` - values after ToTensor and (optional) normalization (half the size of float32 tensors).
+
+    Files of the cache are named after a hash of all parameters (ids, paths, modification times and sizes of images, \
+    size, type and normalization), so changing any of them results in building a new cache.
+    """
+
+    def __init__(self, logger, cache_folder, image_paths, height, width, dtype='uint8', normalize=False):
+        """
+        Initializes the cache, building it if required.
+
+        :param logger: Logger object.
+
+        :param cache_folder: Folder where the cache files will be stored.
+
+        :param image_paths: Dictionary of paths to images, indexed by image ids.
+
+        :param height: Height of the cached images.
+
+        :param width: Width of the cached images.
+
+        :param dtype: Type of the stored values: uint8 | float16 (DEFAULT: uint8)
+
+        :param normalize: Apply normalization required by the pretrained TorchVision models (DEFAULT: False)
+        """
+        if dtype not in ['uint8', 'float16']:
+            raise ValueError("Invalid type of the image cache '{}', accepted values: uint8 | float16".format(dtype))
+
+        self.logger = logger
+        self.height = height
+        self.width = width
+        self.dtype = dtype
+        self.normalize = normalize
+
+        # Sort ids, so the cache does not depend on the order of samples.
+        ids = sorted(image_paths.keys())
+        self.id_to_row = {img_id: row for row, img_id in enumerate(ids)}
+
+        # Build the cache key (modification times and sizes of files are included, so modified images are cached again).
+        images = []
+        for img_id in ids:
+            stat = os.stat(image_paths[img_id])
+            images.append((img_id, image_paths[img_id], stat.st_mtime, stat.st_size))
+        key = hashlib.md5(json.dumps([height, width, dtype, normalize, images]).encode()).hexdigest()
+        prefix = os.path.join(os.path.expanduser(cache_folder), "image_cache_{}x{}_{}_{}".format(height, width, dtype, key[:16]))
+        self.images_file = prefix + "_images.npy"
+        self.sizes_file = prefix + "_sizes.npy"
+
+        if os.path.isfile(self.images_file) and os.path.isfile(self.sizes_file):
+            self.logger.info("Using image cache from '{}'".format(self.images_file))
+        else:
+            os.makedirs(os.path.dirname(prefix), exist_ok=True)
+            self.build([image_paths[img_id] for img_id in ids])
+
+        # Arrays will be mapped on first access (also in every DataLoader worker).
+        self._images = None
+        self._sizes = None
+
+        # Normalization applied on read.
+        self.mean = torch.tensor(IMAGENET_MEAN).view(3, 1, 1)
+        self.std = torch.tensor(IMAGENET_STD).view(3, 1, 1)
+
+
+    def build(self, paths):
+        """
+        Preprocesses images and writes them to the memory-mapped array.
+
+        :param paths: List of paths to images, in the order of rows.
+        """
+        self.logger.info("Building image cache of {} images in '{}'".format(len(paths), self.images_file))
+        # Write to temporary files first, so an interrupted build does not leave an incomplete cache.
+        images_tmp = self.images_file + ".tmp"
+        images = np.lib.format.open_memmap(images_tmp, mode='w+', dtype=self.dtype, shape=(len(paths), 3, self.height, self.width))
+        sizes = np.empty((len(paths), 2), dtype=np.int64)
+
+        args = [(path, self.height, self.width, self.dtype, self.normalize) for path in paths]
+        with multiprocessing.Pool() as pool:
+            t = tqdm.tqdm(total=len(paths))
+            for row, (img, size) in enumerate(pool.imap(_preprocess_image, args, chunksize=16)):
+                images[row] = img
+                sizes[row] = size
+                t.update()
+            t.close()
+
+        # Flush and move files to their final location.
+        images.flush()
+        del images
+        sizes_tmp = self.sizes_file + ".tmp"
+        with open(sizes_tmp, 'wb') as f:
+            np.save(f, sizes)
+        os.replace(images_tmp, self.images_file)
+        os.replace(sizes_tmp, self.sizes_file)
+
+
+    def __getstate__(self):
+        """
+        Excludes the memory-mapped arrays from pickling (e.g. when passing the task to DataLoader workers).
+        """
+        state = self.__dict__.copy()
+        state['_images'] = None
+        state['_sizes'] = None
+        return state
+
+
+    @property
+    def images(self):
+        """
+        Returns the memory-mapped array of images (copy-on-write, so the cache file is never modified).
+        """
+        if self._images is None:
+            self._images = np.load(self.images_file, mmap_mode='c')
+        return self._images
+
+
+    @property
+    def sizes(self):
+        """
+        Returns array with original [height, width] of images.
+        """
+        if self._sizes is None:
+            self._sizes = np.load(self.sizes_file)
+        return self._sizes
+
+
+    def __contains__(self, img_id):
+        return img_id in self.id_to_row
+
+
+    def get_image(self, img_id, as_uint8=False):
+        """
+        Returns image from the cache.
+
+        :param img_id: Identifier of the image.
+
+        :param as_uint8: Return raw uint8 tensor, without applying ToTensor and normalization \
+        (valid only for uint8 cache, DEFAULT: False)
+
+        :return: image (Tensor [DEPTH x HEIGHT x WIDTH])
+        """
+        # Zero-copy view of the memory-mapped array.
+        img = torch.from_numpy(self.images[self.id_to_row[img_id]])
+        if self.dtype == 'float16':
+            return img.float()
+        if as_uint8:
+            return img
+        return self.postprocess(img)
+
+
+    def get_image_size(self, img_id):
+        """
+        Returns original size of the image.
+
+        :param img_id: Identifier of the image.
+
+        :return: Tuple (height, width).
+        """
+        (height, width) = self.sizes[self.id_to_row[img_id]]
+        return int(height), int(width)
+
+
+    def postprocess(self, img):
+        """
+        Applies ToTensor and (optional) normalization to raw image returned by :py:func:`get_image` \
+        (values stored in float16 cache are already processed, so they are returned unchanged).
+
+        :param img: Raw image (Tensor [DEPTH x HEIGHT x WIDTH])
+
+        :return: image (Tensor [DEPTH x HEIGHT x WIDTH])
+        """
+        if self.dtype == 'float16':
+            return img
+        img = img.float().div_(255)
+        if self.normalize:
+            img = img.sub_(self.mean).div_(self.std)
+        return img
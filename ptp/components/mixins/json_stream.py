@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import re
+import json
+
+
+# Whitespace allowed between JSON tokens.
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class JSONStreamReader(object):
+    """
+    Incremental reader of JSON documents, reading the file in chunks, so only the currently parsed value \
+    (e.g. a single question) needs to fit in the memory.
+    """
+
+    def __init__(self, f, chunk_size = 1 << 24):
+        """
+        Initializes the reader.
+
+        :param f: File object (opened in text mode).
+
+        :param chunk_size: Number of characters read from the file at once (DEFAULT: 16M)
+        """
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+
+    def read_chunk(self):
+        """
+        Reads next chunk of the file, dropping the already parsed part of the buffer.
+
+        :return: False if the end of file was reached.
+        """
+        if self.eof:
+            return False
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position:] + data
+        self.position = 0
+        return True
+
+
+    def peek(self):
+        """
+        Skips whitespaces and returns the next character (without consuming it).
+
+        :return: Next character or None at the end of file.
+        """
+        while True:
+            self.position = WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.read_chunk():
+                return None
+
+
+    def expect(self, chars):
+        """
+        Consumes the next character, checking whether it is one of the expected ones.
+
+        :param chars: String with the expected characters.
+
+        :return: Consumed character.
+        """
+        char = self.peek()
+        if char is None or char not in chars:
+            raise ValueError("Invalid JSON document: expected one of '{}', found '{}'".format(chars, char))
+        self.position += 1
+        return char
+
+
+    def read_value(self):
+        """
+        Parses and returns the next value (string, number, object, array etc.).
+
+        :return: Parsed value.
+        """
+        self.peek()
+        while True:
+            try:
+                (value, end) = self.decoder.raw_decode(self.buffer, self.position)
+                # Value ending exactly at the end of buffer (e.g. a number) might be incomplete.
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # The value is incomplete - read more data and try again.
+            self.read_chunk()
+
+
+def iterate_json_object(f, chunk_size = 1 << 24):
+    """
+    Iterates over members of the top-level JSON object, e.g. ``{"id1": {...}, "id2": {...}}``.
+
+    :param f: File object (opened in text mode).
+
+    :param chunk_size: Number of characters read from the file at once (DEFAULT: 16M)
+
+    :return: Generator of (key, value) tuples.
+    """
+    reader = JSONStreamReader(f, chunk_size)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.read_value()
+        reader.expect(':')
+        yield key, reader.read_value()
+        if reader.expect(',}') == '}':
+            return
+
+
+def iterate_json_array(f, key, chunk_size = 1 << 24):
+    """
+    Iterates over elements of the array stored under a given key of the top-level JSON object, \
+    e.g. ``{"info": {...}, "questions": [{...}, {...}]}``. Other members of the object are skipped.
+
+    :param f: File object (opened in text mode).
+
+    :param key: Key of the array.
+
+    :param chunk_size: Number of characters read from the file at once (DEFAULT: 16M)
+
+    :return: Generator of elements of the array.
+    """
+    reader = JSONStreamReader(f, chunk_size)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        member_key = reader.read_value()
+        reader.expect(':')
+        if member_key == key:
+            reader.expect('[')
+            if reader.peek() == ']':
+                reader.expect(']')
+            else:
+                while True:
+                    yield reader.read_value()
+                    if reader.expect(',]') == ']':
+                        break
+        else:
+            # Skip the value.
+            reader.read_value()
+        if reader.expect(',}') == '}':
+            return
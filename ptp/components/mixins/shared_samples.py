@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import array
+import numbers
+import numpy as np
+import torch
+
+
+def get_column_type(value):
+    """
+    Returns type of the column able to store a given value.
+
+    :param value: Value of the first sample.
+
+    :return: One of 'int', 'float', 'text', 'tokens' or 'tensor'.
+    """
+    if isinstance(value, torch.Tensor):
+        return 'tensor'
+    if isinstance(value, str):
+        return 'text'
+    if isinstance(value, list) and all(isinstance(word, str) for word in value):
+        return 'tokens'
+    if isinstance(value, numbers.Integral) and not isinstance(value, bool):
+        return 'int'
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return 'float'
+    raise TypeError("Values of type '{}' cannot be stored in shared memory".format(type(value).__name__))
+
+
+class SharedSamples(object):
+    """
+    Read-only list of samples (dictionaries with identical keys) stored in columnar tensors placed in shared memory.
+
+    Samples kept as lists of dictionaries consist of millions of small Python objects. Every access to such an object \
+    from a DataLoader worker updates its reference count, so the pages inherited from the main process are gradually \
+    copied (copy-on-write) and every worker ends up with a private copy of the dataset. Here the values are stored in \
+    a handful of flat tensors, that are never written to after creation, so workers (forked or spawned) share them.
+
+    Supported types of columns (inferred from values of the first sample) are:
+
+        - ``int``/``float`` - int64/float64 values,
+        - ``text`` - UTF-8 strings plus offsets,
+        - ``tokens`` - lists of words, encoded with a vocabulary into int32 ids plus offsets,
+        - ``tensor`` - tensors of identical shapes (e.g. preloaded images), stacked into a single tensor.
+
+    Indexing returns samples (dictionaries) created on the fly.
+    """
+
+    def __init__(self, samples):
+        """
+        Moves samples into shared memory.
+
+        :param samples: List of samples (dictionaries).
+        """
+        self.length = len(samples)
+        self.columns = [(key, get_column_type(value)) for key, value in samples[0].items()] if self.length > 0 else []
+        self.tensors = {}
+        self.vocabularies = {}
+        for key, column_type in self.columns:
+            try:
+                values = [sample[key] for sample in samples]
+            except KeyError:
+                raise KeyError("All samples must contain the key '{}'".format(key))
+            if column_type == 'int':
+                self.tensors[key] = torch.tensor(values, dtype=torch.int64)
+            elif column_type == 'float':
+                self.tensors[key] = torch.tensor(values, dtype=torch.float64)
+            elif column_type == 'text':
+                self.tensors[key] = self.encode_texts(values)
+            elif column_type == 'tokens':
+                self.tensors[key], self.vocabularies[key] = self.encode_tokens(values)
+            else: # tensor
+                # Copy tensors one by one into a preallocated tensor.
+                stacked = values[0].new_empty((self.length,) + values[0].shape)
+                for i, value in enumerate(values):
+                    stacked[i] = value
+                self.tensors[key] = stacked
+        # Move all tensors to shared memory, so they are not copied to spawned processes either.
+        for value in self.tensors.values():
+            if isinstance(value, tuple):
+                for tensor in value:
+                    tensor.share_memory_()
+            else:
+                value.share_memory_()
+        self.create_views()
+
+
+    @staticmethod
+    def encode_texts(texts):
+        """
+        Encodes strings into UTF-8 bytes.
+
+        :param texts: List of strings.
+
+        :return: Tuple (uint8 tensor of bytes, int64 tensor of offsets).
+        """
+        data = bytearray()
+        offsets = array.array('q', [0])
+        for text in texts:
+            data += text.encode('utf-8')
+            offsets.append(len(data))
+        return (torch.from_numpy(np.frombuffer(data, dtype=np.uint8).copy()), torch.from_numpy(np.frombuffer(offsets, dtype=np.int64).copy()))
+
+
+    @staticmethod
+    def encode_tokens(sequences):
+        """
+        Encodes lists of words with a vocabulary (words are indexed in order of their first occurrence).
+
+        :param sequences: List of lists of words.
+
+        :return: Tuple ((int32 tensor of token ids, int64 tensor of offsets), vocabulary).
+        """
+        word_to_id = {}
+        ids = array.array('i')
+        offsets = array.array('q', [0])
+        for sequence in sequences:
+            ids.extend(word_to_id.setdefault(word, len(word_to_id)) for word in sequence)
+            offsets.append(len(ids))
+        tensors = (torch.from_numpy(np.frombuffer(ids, dtype=np.int32).copy()), torch.from_numpy(np.frombuffer(offsets, dtype=np.int64).copy()))
+        return tensors, list(word_to_id.keys())
+
+
+    def create_views(self):
+        """
+        Creates numpy views of the shared tensors (used for fast access to single values).
+        """
+        self.views = {key: tuple(tensor.numpy() for tensor in value) if isinstance(value, tuple) else value.numpy()
+            for key, value in self.tensors.items() if self.column_type(key) != 'tensor'}
+
+
+    def __getstate__(self):
+        """
+        Excludes the numpy views from pickling (e.g. when passed to spawned DataLoader workers), \
+        as pickling them would copy the data. Shared tensors are passed by handles.
+        """
+        state = self.__dict__.copy()
+        state['views'] = None
+        return state
+
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.create_views()
+
+
+    def column_type(self, key):
+        """
+        Returns type of a given column.
+
+        :param key: Name of the column.
+        """
+        return dict(self.columns)[key]
+
+
+    @property
+    def nbytes(self):
+        """
+        Returns size of the shared tensors (in bytes).
+        """
+        tensors = [tensor for value in self.tensors.values() for tensor in (value if isinstance(value, tuple) else (value,))]
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+
+    def __len__(self):
+        return self.length
+
+
+    def get_value(self, key, column_type, index):
+        """
+        Returns a single value.
+
+        :param key: Name of the column.
+
+        :param column_type: Type of the column.
+
+        :param index: Index of the sample.
+        """
+        if column_type == 'tensor':
+            return self.tensors[key][index]
+        view = self.views[key]
+        if column_type == 'int':
+            return int(view[index])
+        if column_type == 'float':
+            return float(view[index])
+        data, offsets = view
+        values = data[offsets[index]:offsets[index+1]]
+        if column_type == 'text':
+            return values.tobytes().decode('utf-8')
+        # Tokens.
+        vocabulary = self.vocabularies[key]
+        return [vocabulary[i] for i in values.tolist()]
+
+
+    def __getitem__(self, index):
+        """
+        Returns a single sample.
+
+        :param index: Index of the sample.
+
+        :return: Dictionary with values.
+        """
+        if index < 0:
+            index += self.length
+        if index < 0 or index >= self.length:
+            raise IndexError("Index {} out of range".format(index))
+        return {key: self.get_value(key, column_type, index) for key, column_type in self.columns}
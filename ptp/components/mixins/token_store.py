@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import os
+import json
+import array
+import numpy as np
+
+
+class TokenStore(object):
+    """
+    Compact storage of sequences of tokens (words), encoded with a vocabulary into a single int32 array of token ids, \
+    with an int64 array of offsets indicating where the consecutive sequences start.
+
+    Token ids of a sequence are returned as a (zero-copy) slice of the array, whereas words are decoded on demand, \
+    so the store can replace lists of lists of strings. Stores saved to disk can be reopened via mmap.
+    """
+
+    def __init__(self, ids, offsets, vocabulary):
+        """
+        Initializes the store with already encoded sequences.
+
+        :param ids: Array of token ids of all sequences (concatenated).
+
+        :param offsets: Array of offsets of sequences, of length equal to number of sequences + 1.
+
+        :param vocabulary: List of words, indexed by token ids.
+        """
+        self._ids = ids
+        self._offsets = offsets
+        self.vocabulary = vocabulary
+        # Set only for stores loaded from files.
+        self.prefix = None
+        self.mmap = False
+
+
+    @classmethod
+    def from_sequences(cls, sequences):
+        """
+        Encodes sequences of words, building the vocabulary (words are indexed in order of their first occurrence).
+
+        :param sequences: Iterable (e.g. a generator) of lists of words.
+
+        :return: TokenStore object.
+        """
+        word_to_id = {}
+        ids = array.array('i')
+        offsets = array.array('q', [0])
+        for sequence in sequences:
+            ids.extend(word_to_id.setdefault(word, len(word_to_id)) for word in sequence)
+            offsets.append(len(ids))
+        return cls(np.frombuffer(ids, dtype=np.int32), np.frombuffer(offsets, dtype=np.int64), list(word_to_id.keys()))
+
+
+    @staticmethod
+    def exists(folder, name):
+        """
+        Checks whether the (complete) store exists in a given folder.
+
+        :param folder: Folder containing the store.
+
+        :param name: Name of the store (prefix of its files).
+        """
+        return os.path.isfile(os.path.join(os.path.expanduser(folder), name + ".vocabulary.json"))
+
+
+    def save(self, folder, name):
+        """
+        Saves the store to files. Vocabulary is written last, so incomplete stores are never opened.
+
+        :param folder: Folder where the store will be saved.
+
+        :param name: Name of the store (prefix of its files).
+        """
+        folder = os.path.expanduser(folder)
+        os.makedirs(folder, exist_ok=True)
+        prefix = os.path.join(folder, name)
+        np.save(prefix + ".ids.npy", self.ids)
+        np.save(prefix + ".offsets.npy", self.offsets)
+        with open(prefix + ".vocabulary.json.tmp", 'w') as f:
+            json.dump(self.vocabulary, f)
+        os.replace(prefix + ".vocabulary.json.tmp", prefix + ".vocabulary.json")
+
+
+    @classmethod
+    def load(cls, folder, name, mmap = True):
+        """
+        Loads the store from files.
+
+        :param folder: Folder containing the store.
+
+        :param name: Name of the store (prefix of its files).
+
+        :param mmap: If True, arrays will be memory-mapped instead of read into the memory (DEFAULT: True)
+
+        :return: TokenStore object.
+        """
+        prefix = os.path.join(os.path.expanduser(folder), name)
+        with open(prefix + ".vocabulary.json", 'r') as f:
+            vocabulary = json.load(f)
+        store = cls(None, None, vocabulary)
+        store.prefix = prefix
+        store.mmap = mmap
+        return store
+
+
+    def __getstate__(self):
+        """
+        Excludes the memory-mapped arrays from pickling (e.g. when passed to DataLoader workers).
+        """
+        state = self.__dict__.copy()
+        # Vocabulary array (created by decode_batch) can be recreated.
+        state.pop('_vocabulary_array', None)
+        if self.prefix is not None:
+            state['_ids'] = None
+            state['_offsets'] = None
+        return state
+
+
+    @property
+    def ids(self):
+        """
+        Returns array of token ids of all sequences (concatenated). Arrays are loaded on first access.
+        """
+        if self._ids is None:
+            mmap_mode = 'r' if self.mmap else None
+            self._ids = np.load(self.prefix + ".ids.npy", mmap_mode=mmap_mode)
+            self._offsets = np.load(self.prefix + ".offsets.npy", mmap_mode=mmap_mode)
+        return self._ids
+
+
+    @property
+    def offsets(self):
+        """
+        Returns array of offsets of sequences.
+        """
+        self.ids
+        return self._offsets
+
+
+    def __len__(self):
+        """
+        Returns number of sequences.
+        """
+        return len(self.offsets) - 1
+
+
+    def sequence_length(self, index):
+        """
+        Returns number of tokens in a given sequence.
+
+        :param index: Index of the sequence.
+        """
+        if index < 0:
+            index += len(self)
+        return int(self.offsets[index+1] - self.offsets[index])
+
+
+    def get_ids(self, index):
+        """
+        Returns token ids of a given sequence.
+
+        :param index: Index of the sequence.
+
+        :return: Slice (view) of the array of token ids.
+        """
+        if index < 0:
+            index += len(self)
+        return self.ids[self.offsets[index]:self.offsets[index+1]]
+
+
+    def decode(self, ids):
+        """
+        Decodes token ids into words.
+
+        :param ids: Array of token ids.
+
+        :return: List of words.
+        """
+        vocabulary = self.vocabulary
+        return [vocabulary[i] for i in ids.tolist()]
+
+
+    def decode_batch(self, ids):
+        """
+        Decodes a 2D array of token ids (e.g. a batch of sequences of equal lengths) into words at once.
+
+        :param ids: Array of token ids [BATCH_SIZE x SEQUENCE_LENGTH].
+
+        :return: List of lists of words.
+        """
+        # Vocabulary as an array of objects, created on first use.
+        if getattr(self, '_vocabulary_array', None) is None:
+            self._vocabulary_array = np.empty(len(self.vocabulary), dtype=object)
+            self._vocabulary_array[:] = self.vocabulary
+        return self._vocabulary_array[ids].tolist()
+
+
+    def __getitem__(self, index):
+        """
+        Returns words of a given sequence.
+
+        :param index: Index of the sequence.
+
+        :return: List of words.
+        """
+        return self.decode(self.get_ids(index))
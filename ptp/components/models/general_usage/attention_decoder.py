@@ -51,6 +51,11 @@ class AttentionDecoder(Model):
 
         self.autoregression_length = self.config["autoregression_length"]
 
+        # Get index of the <EOS> token - used to stop decoding when every sequence in batch has finished.
+        self.eos_index = self.config["eos_index"]
+        if self.eos_index >= 0 and (self.prediction_mode != "Dense" or not self.ffn_output):
+            raise ConfigurationError("Setting 'eos_index' requires 'prediction_mode' set to 'Dense' and 'ffn_output' enabled")
+
         # Retrieve input size from global variables.
         self.key_input_size = self.global_keys["input_size"]
         self.input_size = self.globals["input_size"]
@@ -173,6 +178,20 @@ class AttentionDecoder(Model):
         
         return d
 
+    def fill_with_eos(self, outputs):
+        """
+        Fills outputs of the steps that were not decoded with one-hot <EOS> predictions \
+        (with Log Softmax: 0 for <EOS> and the lowest float for the other words, so log-probabilities stay finite).
+
+        :param outputs: Tensor [BATCH_SIZE x NUM_STEPS x PREDICTION_SIZE] (modified in place).
+        """
+        if self.use_logsoftmax:
+            outputs.fill_(torch.finfo(outputs.dtype).min)
+            outputs[:, :, self.eos_index] = 0
+        else:
+            outputs.zero_()
+            outputs[:, :, self.eos_index] = 1
+
     def forward(self, data_streams):
         """
         Forward pass of the model.
@@ -193,12 +212,16 @@ class AttentionDecoder(Model):
         hidden = hidden.transpose(0,1)
         #print("{}: hidden shape: {}, device: {}\n".format(self.name, hidden.shape, hidden.device))
 
-        # List that will contain the output sequence
-        activations = []
-
         # First input to the decoder - trainable "start of sequence" token
         activations_partial = self.sos_token.expand(batch_size, -1).unsqueeze(1)
 
+        # Preallocate tensor for outputs of all steps [BATCH_SIZE x SEQ_LEN x PREDICTION_SIZE].
+        if self.prediction_mode == "Dense":
+            outputs = inputs.new_zeros(batch_size, self.autoregression_length, self.prediction_size)
+        # Check whether decoding can stop when every sequence has emitted <EOS>.
+        stop_at_eos = self.eos_index >= 0 and not self.training
+        finished = None
+
         # Feed back the outputs iteratively
         for i in range(self.autoregression_length):
 
@@ -216,21 +239,28 @@ class AttentionDecoder(Model):
             activations_partial, hidden = self.rnn_cell(activations_partial, hidden)
             activations_partial = self.activation2output(activations_partial)
 
-            # Add the single step output into list
+            # Write the single step output into outputs.
             if self.prediction_mode == "Dense":
-                activations += [activations_partial]
+                outputs[:, i] = activations_partial[:, 0]
+
+            if stop_at_eos:
+                eos = activations_partial[:, 0].argmax(dim=1) == self.eos_index
+                finished = eos if finished is None else finished | eos
+                if bool(finished.all()):
+                    # Remaining steps will contain <EOS> predictions.
+                    self.fill_with_eos(outputs[:, i+1:])
+                    break
 
-        # Reassemble all the outputs from list into an output tensor
         if self.prediction_mode == "Dense":
-            outputs = torch.cat(activations, 1)
             # Log softmax - along PREDICTION dim.
             if self.use_logsoftmax:
                 outputs = self.log_softmax(outputs)
             # Add predictions to datadict.
             data_streams.publish({self.key_predictions: outputs})
         elif self.prediction_mode == "Last":
+            outputs = activations_partial.squeeze(1)
             if self.use_logsoftmax:
-                outputs = self.log_softmax(activations_partial.squeeze(1))
+                outputs = self.log_softmax(outputs)
             # Add predictions to datadict.
             data_streams.publish({self.key_predictions: outputs})
 
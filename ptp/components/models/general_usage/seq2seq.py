@@ -39,6 +39,9 @@ class Seq2Seq(Model):
         self.input_mode = self.config["input_mode"]
 
         self.autoregression_length = self.config["autoregression_length"]
+
+        # Get index of the <EOS> token - used to stop decoding when every sequence in batch has finished.
+        self.eos_index = self.config["eos_index"]
         
         # Check if initial state (h0/c0) is zero, trainable, or coming from input stream.
         self.initial_state = self.config["initial_state"]
@@ -162,6 +165,20 @@ class Seq2Seq(Model):
 
         return d
 
+    def fill_with_eos(self, outputs):
+        """
+        Fills outputs of the steps that were not decoded with one-hot <EOS> predictions \
+        (with Log Softmax: 0 for <EOS> and the lowest float for the other words, so log-probabilities stay finite).
+
+        :param outputs: Tensor [BATCH_SIZE x NUM_STEPS x PREDICTION_SIZE] (modified in place).
+        """
+        if self.use_logsoftmax:
+            outputs.fill_(torch.finfo(outputs.dtype).min)
+            outputs[:, :, self.eos_index] = 0
+        else:
+            outputs.zero_()
+            outputs[:, :, self.eos_index] = 1
+
     def forward(self, data_streams):
         """
         Forward pass of the model.
@@ -187,17 +204,26 @@ class Seq2Seq(Model):
         activations, hidden = self.rnn_cell_enc(inputs, hidden)
         activations_partial = self.activation2output(activations[:, -1, :])
 
-        # Propagate inputs through rnn cell.
-        activations_partial, hidden = self.rnn_cell_dec(activations_partial.unsqueeze(1), hidden)
-        activations_partial = activations_partial.squeeze(1)
-        activations_partial = self.activation2output(activations_partial)
-        activations = [activations_partial]
-        for i in range(self.autoregression_length - 1):
+        # Preallocate tensor for outputs of all steps [BATCH_SIZE x SEQ_LEN x PREDICTION_SIZE].
+        outputs = inputs.new_zeros(batch_size, self.autoregression_length, self.prediction_size)
+        # Check whether decoding can stop when every sequence has emitted <EOS>.
+        stop_at_eos = self.eos_index >= 0 and not self.training
+        finished = None
+
+        # Decoder - propagate outputs through rnn cell iteratively.
+        for i in range(self.autoregression_length):
             activations_partial, hidden = self.rnn_cell_dec(activations_partial.unsqueeze(1), hidden)
             activations_partial = activations_partial.squeeze(1)
             activations_partial = self.activation2output(activations_partial)
-            activations += [activations_partial]
-        outputs = torch.stack(activations, 1)
+            outputs[:, i] = activations_partial
+
+            if stop_at_eos:
+                eos = activations_partial.argmax(dim=1) == self.eos_index
+                finished = eos if finished is None else finished | eos
+                if bool(finished.all()):
+                    # Remaining steps will contain <EOS> predictions.
+                    self.fill_with_eos(outputs[:, i+1:])
+                    break
 
         # Log softmax - along PREDICTION dim.
         if self.use_logsoftmax:
@@ -60,47 +60,87 @@ class CompactBilinearPooling(Model):
         self.question_encoding_size = self.globals["question_encoding_size"]
         self.output_size = self.globals["output_size"]
 
-        # Initialize sketch projection matrices.
-        image_sketch_projection_matrix = self.generate_count_sketch_projection_matrix(self.image_encoding_size, self.output_size)
-        question_sketch_projection_matrix = self.generate_count_sketch_projection_matrix(self.question_encoding_size, self.output_size)
-
-        # Make them parameters of the model, so can be stored/loaded and trained (optionally).
-        trainable_projections = self.config["trainable_projections"]
-        self.image_sketch_projection_matrix = torch.nn.Parameter(image_sketch_projection_matrix, requires_grad=trainable_projections)
-        self.question_sketch_projection_matrix = torch.nn.Parameter(question_sketch_projection_matrix, requires_grad=trainable_projections)
-
-
-    def generate_count_sketch_projection_matrix(self, input_size, output_size):
+        # Generate hashes of count sketches: indices h and signs s.
+        (image_indices, image_signs) = self.generate_count_sketch(self.image_encoding_size, self.output_size)
+        (question_indices, question_signs) = self.generate_count_sketch(self.question_encoding_size, self.output_size)
+
+        self.trainable_projections = self.config["trainable_projections"]
+        if self.trainable_projections:
+            # Make dense projection matrices (initialized with the count sketches) trainable parameters of the model.
+            self.image_sketch_projection_matrix = torch.nn.Parameter(self.generate_count_sketch_projection_matrix(image_indices, image_signs, self.output_size))
+            self.question_sketch_projection_matrix = torch.nn.Parameter(self.generate_count_sketch_projection_matrix(question_indices, question_signs, self.output_size))
+        else:
+            # Store only the hashes as buffers, so they are saved/loaded along with the model.
+            self.register_buffer("image_sketch_indices", image_indices)
+            self.register_buffer("image_sketch_signs", image_signs)
+            self.register_buffer("question_sketch_indices", question_indices)
+            self.register_buffer("question_sketch_signs", question_signs)
+
+
+    def generate_count_sketch(self, input_size, output_size):
         """ 
-        Initializes Count Sketch projection matrix for given input (size).
+        Initializes Count Sketch projection for given input (size).
         Its role will be to project vector v∈Rn to y∈Rd.
         We initialize two vectors s∈{−1,1}n and h∈{1,...,d}n:
             * s contains either 1 or −1 for each index
             * h maps each index i in the input v to an index j in the output y.
         Both s and h are initialized randomly from a uniform distribution and remain constant.
+
+        :return: Tuple (h, s) of tensors of size [input_size] - indices (int64) and signs (float).
         """
         # Generate s: 1 or -1
         s = 2 * np.random.randint(2, size=input_size) - 1
-        s = torch.from_numpy(s)
-        #print("s=",s.shape)
-
         # Generate h (indices)
         h = np.random.randint(output_size, size=input_size)
-        #print("h=",h.shape)
-        indices = np.concatenate((np.arange(input_size)[..., np.newaxis],h[..., np.newaxis]), axis=1)
-        indices = torch.from_numpy(indices)
-        #print("indices=",indices.shape)
-
-        # Generate sparse matrix.
-        sparse_sketch_matrix = torch.sparse.FloatTensor(indices.t(), s, torch.Size([input_size, output_size]))
-        #print("\n sparse_sketch_matrix=",sparse_sketch_matrix.shape)
-        # Return dense matrix.
-        dense_ssm = sparse_sketch_matrix.to_dense().type(self.app_state.FloatTensor)
-        #print("\n dense_ssm=",dense_ssm)
+        return torch.from_numpy(h).long(), torch.from_numpy(s).type(self.app_state.FloatTensor)
+
 
+    def generate_count_sketch_projection_matrix(self, indices, signs, output_size):
+        """ 
+        Creates dense projection matrix [input_size x output_size] equivalent to the Count Sketch with given hashes.
+
+        :param indices: Tensor of indices h.
+
+        :param signs: Tensor of signs s.
+
+        :param output_size: Size of the output.
+        """
+        dense_ssm = torch.zeros(indices.size(0), output_size).type(self.app_state.FloatTensor)
+        dense_ssm[torch.arange(indices.size(0)), indices] = signs
         return dense_ssm
 
-        
+
+    def count_sketch(self, inputs, indices, signs):
+        """ 
+        Projects batch of vectors with the Count Sketch, i.e. y[h[i]] += s[i] * v[i].
+
+        :param inputs: Tensor of inputs [BATCH_SIZE x INPUT_SIZE].
+
+        :param indices: Tensor of indices h.
+
+        :param signs: Tensor of signs s.
+
+        :return: Tensor of sketches [BATCH_SIZE x OUTPUT_SIZE].
+        """
+        sketch = inputs.new_zeros(inputs.size(0), self.output_size)
+        return sketch.index_add_(1, indices, inputs * signs)
+
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        """
+        Converts dense projection matrices from checkpoints of models with not trainable projections \
+        (created by previous versions of the model) into hashes of count sketches.
+        """
+        if not self.trainable_projections:
+            for modality in ["image", "question"]:
+                key = prefix + modality + "_sketch_projection_matrix"
+                if key in state_dict:
+                    dense_ssm = state_dict.pop(key)
+                    indices = dense_ssm.abs().argmax(dim=1)
+                    state_dict[prefix + modality + "_sketch_indices"] = indices
+                    state_dict[prefix + modality + "_sketch_signs"] = dense_ssm.gather(1, indices.unsqueeze(1)).squeeze(1)
+        super(CompactBilinearPooling, self)._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
 
     def input_data_definitions(self):
         """ 
@@ -135,38 +175,20 @@ class CompactBilinearPooling(Model):
         enc_img = data_streams[self.key_image_encodings]
         enc_q = data_streams[self.key_question_encodings]
 
-        sketch_pm_img = self.image_sketch_projection_matrix
-        sketch_pm_q = self.question_sketch_projection_matrix
-
         # Project both batches.
-        sketch_img = enc_img.mm(sketch_pm_img)
-        sketch_q = enc_q.mm(sketch_pm_q)
-
-        # Add imaginary parts (with zeros).
-        sketch_img_reim = torch.stack([sketch_img, torch.zeros(sketch_img.shape).type(self.app_state.FloatTensor)], dim=2)
-        sketch_q_reim = torch.stack([sketch_q, torch.zeros(sketch_q.shape).type(self.app_state.FloatTensor)], dim=2)
-        #print("\n sketch_img_reim=",sketch_img_reim)
-        #print("\n sketch_img_reim.shape=",sketch_img_reim.shape)
-
-        # Perform FFT.
-        # Returns the real and the imaginary parts together as one tensor of the same shape of input.
-        fft_img = torch.fft(sketch_img_reim, signal_ndim=1)
-        fft_q = torch.fft(sketch_q_reim, signal_ndim=1)
-        #print(fft_img)
-
-        # Get real and imaginary parts.
-        real1 = fft_img[:,:,0]
-        imag1 = fft_img[:,:,1]
-        real2 = fft_q[:,:,0]
-        imag2 = fft_q[:,:,1]
-
-        # Calculate product.
-        fft_product = torch.stack([real1 * real2 - imag1 * imag2, real1 * imag2 + imag1 * real2], dim = -1)
-        #print("fft_product=",fft_product)
-
-        # Inverse FFT.
-        cbp = torch.ifft(fft_product, signal_ndim=1)[:,:,0]
-        #print("cbp=",cbp)
+        if self.trainable_projections:
+            sketch_img = enc_img.mm(self.image_sketch_projection_matrix)
+            sketch_q = enc_q.mm(self.question_sketch_projection_matrix)
+        else:
+            sketch_img = self.count_sketch(enc_img, self.image_sketch_indices, self.image_sketch_signs)
+            sketch_q = self.count_sketch(enc_q, self.question_sketch_indices, self.question_sketch_signs)
+
+        # Perform FFT of real inputs (returns only the non-redundant half of the spectrum).
+        fft_img = torch.fft.rfft(sketch_img, dim=1)
+        fft_q = torch.fft.rfft(sketch_q, dim=1)
+
+        # Inverse FFT of the (complex) product, i.e. circular convolution of the sketches.
+        cbp = torch.fft.irfft(fft_img * fft_q, n=self.output_size, dim=1)
 
         # Add predictions to datadict.
         data_streams.publish({self.key_outputs: cbp})
@@ -57,11 +57,8 @@ class RelationalNetwork(Model):
         self.feature_maps_depth = self.globals["feature_maps_depth"]
         self.question_encoding_size = self.globals["question_encoding_size"]
         
-        # Create "object" coordinates.
-        self.obj_coords = []
-        for h in range(self.feature_maps_height):
-            for w in range(self.feature_maps_width):
-                self.obj_coords.append((h,w))
+        # Number of "objects" (locations in feature maps).
+        self.num_objects = self.feature_maps_height * self.feature_maps_width
 
         # Calculate input size to the g_theta: two "objects" + question (+ optionally: image size)
         input_size = 2 * self.feature_maps_depth + self.question_encoding_size
@@ -102,6 +99,9 @@ class RelationalNetwork(Model):
         # Finally create the sequential model out of those modules.
         self.g_theta = torch.nn.Sequential(*modules)
 
+        # Get flag indicating whether to project the objects by the first layer of g_theta before combining them in pairs.
+        self.pairwise_projections = self.config["pairwise_projections"]
+
 
     def input_data_definitions(self):
         """ 
@@ -136,37 +136,83 @@ class RelationalNetwork(Model):
         feat_m = data_streams[self.key_feature_maps]
         enc_q = data_streams[self.key_question_encodings]
 
-        # List [FEAT_WIDTH x FEAT_HEIGHT] of tensors [BATCH SIZE x (2 * FEAT_DEPTH + QUESTION_SIZE)]
-        relational_inputs = []
-        # Iterate through all pairs of "objects".
-        for (h1,w1) in self.obj_coords:
-            for (h2,w2) in self.obj_coords:
-                # Get feature maps.
-                fm1 = feat_m[:, :, h1,w1].view(-1, self.feature_maps_depth)
-                fm2 = feat_m[:, :, h2,w2].view(-1, self.feature_maps_depth)
-                # Concatenate with question [BATCH SIZE x (2 * FEAT_DEPTH + QUESTION_SIZE)]
-                concat = torch.cat([fm1, fm2, enc_q], dim=1)
-                relational_inputs.append(concat)
-
-        # Stack tensors along with the batch dimension
-        # [BATCH SIZE x (FEAT_WIDTH x FEAT_HEIGHT)^2  x (2 * FEAT_DEPTH + QUESTION_SIZE)]
-        # i.e. [BATCH SIZE x NUM_RELATIONS  x (2 * FEAT_DEPTH + QESTION_SIZE)]
-        stacked_inputs = torch.stack(relational_inputs, dim=1)
-
-        # Get shape [BATCH SIZE x (2 * FEAT_DEPTH + QESTION_SIZE)]
-        shape = stacked_inputs.shape
+        # Flatten the "objects" [BATCH SIZE x NUM_OBJECTS x FEAT_DEPTH].
+        objects = feat_m.reshape(-1, self.feature_maps_depth, self.num_objects).transpose(1, 2)
+
+        if self.pairwise_projections:
+            stacked_relations = self.relations_from_projections(objects, enc_q)
+        else:
+            stacked_relations = self.relations_from_pairs(objects, enc_q)
+
+        # Element wise sum along relations [BATCH_SIZE x OUTPUT_SIZE]
+        summed_relations = torch.sum(stacked_relations, dim=1)
+
+        # Add outputs to datadict.
+        data_streams.publish({self.key_outputs: summed_relations})
+
+
+    def relations_from_pairs(self, objects, enc_q):
+        """
+        Creates inputs of all pairs of "objects" (in a single tensor) and passes them through g_theta.
+
+        :param objects: Tensor of objects [BATCH SIZE x NUM_OBJECTS x FEAT_DEPTH].
+
+        :param enc_q: Tensor of encoded questions [BATCH SIZE x QUESTION_SIZE].
+
+        :return: Tensor of relations [BATCH SIZE x NUM_RELATIONS x OUTPUT_SIZE].
+        """
+        batch_size = objects.size(0)
+        n = self.num_objects
+        # Pairs of objects: (i,j) -> [o_i, o_j, q], ordered by i, then by j.
+        # [BATCH SIZE x NUM_OBJECTS x NUM_OBJECTS x (2 * FEAT_DEPTH + QUESTION_SIZE)]
+        stacked_inputs = torch.cat([
+            objects.unsqueeze(2).expand(-1, -1, n, -1),
+            objects.unsqueeze(1).expand(-1, n, -1, -1),
+            enc_q.view(batch_size, 1, 1, -1).expand(-1, n, n, -1)
+            ], dim=3)
 
         # Reshape such that we do a broadcast over the last dimension.
-        stacked_inputs = stacked_inputs.contiguous().view(-1, shape[-1])
+        stacked_inputs = stacked_inputs.view(batch_size * n * n, -1)
 
         # Pass it through g_theta.
         stacked_relations = self.g_theta(stacked_inputs)
 
         # Reshape to [BATCH_SIZE x NUM_RELATIONS x OUTPUT_SIZE]
-        stacked_relations = stacked_relations.view(*shape[0:-1], self.output_size)
+        return stacked_relations.view(batch_size, n * n, self.output_size)
 
-        # Element wise sum along relations [BATCH_SIZE x OUTPUT_SIZE]
-        summed_relations = torch.sum(stacked_relations, dim=1)
 
-        # Add outputs to datadict.
-        data_streams.publish({self.key_outputs: summed_relations})
+    def relations_from_projections(self, objects, enc_q):
+        """
+        Computes relations without creating inputs of all pairs of "objects".
+        As the first layer of g_theta is linear, it is applied to objects and question separately, \
+        and the projections are summed pairwise (what gives the same result, but requires less memory and operations).
+
+        :param objects: Tensor of objects [BATCH SIZE x NUM_OBJECTS x FEAT_DEPTH].
+
+        :param enc_q: Tensor of encoded questions [BATCH SIZE x QUESTION_SIZE].
+
+        :return: Tensor of relations [BATCH SIZE x NUM_RELATIONS x OUTPUT_SIZE].
+        """
+        batch_size = objects.size(0)
+        n = self.num_objects
+        depth = self.feature_maps_depth
+        first_layer = self.g_theta[0]
+        # Split weights of the first layer into parts processing the first object, second object and question.
+        weight_first = first_layer.weight[:, :depth]
+        weight_second = first_layer.weight[:, depth:2*depth]
+        weight_question = first_layer.weight[:, 2*depth:]
+
+        # Projections [BATCH SIZE x NUM_OBJECTS x HIDDEN] and [BATCH SIZE x HIDDEN].
+        proj_first = torch.matmul(objects, weight_first.t())
+        proj_second = torch.matmul(objects, weight_second.t())
+        proj_question = torch.nn.functional.linear(enc_q, weight_question, first_layer.bias)
+
+        # Sum projections of pairs [BATCH SIZE x NUM_OBJECTS x NUM_OBJECTS x HIDDEN].
+        hidden = (proj_first + proj_question.unsqueeze(1)).unsqueeze(2) + proj_second.unsqueeze(1)
+        hidden = hidden.view(batch_size * n * n, -1)
+
+        # Pass it through the remaining layers of g_theta.
+        stacked_relations = self.g_theta[1:](hidden)
+
+        # Reshape to [BATCH_SIZE x NUM_RELATIONS x OUTPUT_SIZE]
+        return stacked_relations.view(batch_size, n * n, self.output_size)
@@ -150,7 +150,7 @@ class AccuracyStatistics(Component):
         :param stat_col: ``StatisticsCollector``.
 
         """
-        stat_col.add_statistics(self.key_accuracy, '{:6.4f}')
+        stat_col.add_statistics(self.key_accuracy, '{:6.4f}', weights=self.key_accuracy+'_support')
         stat_col.add_statistics(self.key_accuracy+'_support', None)
 
     def collect_statistics(self, stat_col, data_streams):
@@ -187,20 +187,14 @@ class AccuracyStatistics(Component):
         :param stat_agg: ``StatisticsAggregator``
 
         """
-        accuracies = stat_col[self.key_accuracy]
-        supports = stat_col[self.key_accuracy+'_support']
-
         # Special case - no samples!
-        if sum(supports) == 0:
+        if stat_col.sum(self.key_accuracy+'_support') == 0:
             stat_agg[self.key_accuracy] = 0
             stat_agg[self.key_accuracy+'_std'] = 0
 
         else: 
-            # Calculate weighted precision.
-            accuracies_avg = np.average(accuracies, weights=supports)
-            accuracies_var = np.average((accuracies-accuracies_avg)**2, weights=supports)
-
-            stat_agg[self.key_accuracy] = accuracies_avg
-            #stat_agg[self.key_accuracy+'_min'] = np.min(accuracies)
-            #stat_agg[self.key_accuracy+'_max'] = np.max(accuracies)
-            stat_agg[self.key_accuracy+'_std'] = math.sqrt(accuracies_var)
+            # Get weighted accuracy (weighted by supports).
+            stat_agg[self.key_accuracy] = stat_col.mean(self.key_accuracy)
+            #stat_agg[self.key_accuracy+'_min'] = stat_col.min(self.key_accuracy)
+            #stat_agg[self.key_accuracy+'_max'] = stat_col.max(self.key_accuracy)
+            stat_agg[self.key_accuracy+'_std'] = stat_col.std(self.key_accuracy)
@@ -16,10 +16,8 @@
 
 __author__ = "Tomasz Kornuta"
 
+import sys
 import torch
-import math
-import numpy as np
-from nltk.translate.bleu_score import sentence_bleu
 
 from ptp.components.component import Component
 from ptp.data_types.data_definition import DataDefinition
@@ -29,7 +27,10 @@ class BLEUStatistics(Component):
     """
     Class collecting statistics: BLEU (Bilingual Evaluation Understudy Score).
 
-    It accepts targets and predictions represented as indices of words and uses the provided word mappings to change those into words used finally for calculation of BLEU similarity.
+    It accepts targets and predictions represented as indices of words. Indices of words that are not present \
+    in the provided word mappings or are ignored are masked out, and the scores are computed by counting (clipped) n-grams \
+    directly on index tensors, for the whole batch at once. The results are equal to the ones returned by NLTK \
+    ``sentence_bleu`` (for sentence-level scores) and ``corpus_bleu`` (for the corpus-level aggregator).
 
     """
 
@@ -66,7 +67,13 @@ class BLEUStatistics(Component):
         # Construct reverse mapping for faster processing.
         self.ix_to_word = dict((v,k) for k,v in word_to_ix.items())
 
-        # Get masking flag.
+        # Create vocabulary mask, indicating indices of words that are used in calculations.
+        self.vocabulary_mask = torch.zeros(max(self.ix_to_word.keys(), default=-1) + 1, dtype=torch.bool)
+        for ix, word in self.ix_to_word.items():
+            if word not in self.ignored_words:
+                self.vocabulary_mask[ix] = True
+
+        # Get weights of n-grams.
         self.weights = self.config["weights"]
 
 
@@ -111,69 +118,129 @@ class BLEUStatistics(Component):
         pass
 
 
-    def calculate_BLEU(self, data_streams):
+    def compact(self, indices):
         """
-        Calculates BLEU for predictions of a given batch.
+        Removes masked words (i.e. unknown or ignored) from sequences, moving the remaining words to the front.
+
+        :param indices: Tensor with indices of words [BATCH_SIZE x SEQ_LENGTH]
+
+        :return: Tuple (tensor with indices of words [BATCH_SIZE x SEQ_LENGTH], lengths of sequences [BATCH_SIZE])
+        """
+        in_range = (indices >= 0) & (indices < len(self.vocabulary_mask))
+        valid = self.vocabulary_mask[indices.clamp(0, max(len(self.vocabulary_mask) - 1, 0))] & in_range
+        # Stable sort moves valid words to the front, keeping their order.
+        _, order = torch.sort((~valid).to(torch.uint8), dim=1, stable=True)
+        return indices.gather(1, order), valid.sum(dim=1)
 
-        :param data_streams: DataStreams containing the targets and predictions (and optionally masks).
-        :type data_streams: DataStreams
 
-        :return: Accuracy.
+    def calculate_ngram_statistics(self, data_streams):
+        """
+        Calculates n-gram statistics of predictions of a given batch.
+
+        :param data_streams: DataStreams containing the targets and predictions.
+        :type data_streams: DataStreams
 
+        :return: Tuple (numerators [BATCH_SIZE x NUM_ORDERS], denominators [BATCH_SIZE x NUM_ORDERS], \
+            lengths of predictions [BATCH_SIZE], lengths of targets [BATCH_SIZE]).
         """
         # Get targets.
-        targets = data_streams[self.key_targets].data.cpu().numpy().tolist()
+        targets = data_streams[self.key_targets].data.cpu()
 
         if self.use_prediction_distributions:
             # Get indices of the max log-probability.
-            preds = data_streams[self.key_predictions].max(-1)[1].data.cpu().numpy().tolist()
+            preds = data_streams[self.key_predictions].max(-1)[1].data.cpu()
         else: 
-            preds = data_streams[self.key_predictions].data.cpu().numpy().tolist()
+            preds = data_streams[self.key_predictions].data.cpu()
+
+        # Remove masked words.
+        targets, target_lengths = self.compact(targets.long())
+        preds, pred_lengths = self.compact(preds.long())
+        batch_size = preds.shape[0]
+
+        numerators = torch.zeros(batch_size, len(self.weights), dtype=torch.float64)
+        denominators = torch.zeros(batch_size, len(self.weights), dtype=torch.float64)
+        for i in range(len(self.weights)):
+            n = i + 1
+            # Number of n-grams in predictions (at least 1, as in NLTK).
+            denominators[:, i] = (pred_lengths - n + 1).clamp(min=1)
+            if preds.shape[1] < n or targets.shape[1] < n:
+                continue
+
+            # Get n-grams present in sequences, prefixed with sample indices: [NUM_NGRAMS x (1+n)].
+            ngrams = []
+            for (sequences, lengths) in [(preds, pred_lengths), (targets, target_lengths)]:
+                windows = sequences.unfold(1, n, 1)
+                positions = torch.arange(windows.shape[1]).unsqueeze(0)
+                present = positions < (lengths - n + 1).unsqueeze(1)
+                samples = torch.arange(batch_size).unsqueeze(1).expand(-1, windows.shape[1])
+                ngrams.append(torch.cat([samples[present].unsqueeze(1), windows[present]], dim=1))
+            num_pred_ngrams = len(ngrams[0])
+
+            ngrams = torch.cat(ngrams)
+
+            # Count the unique n-grams in predictions and targets.
+            vocabulary_size = len(self.vocabulary_mask)
+            if batch_size * vocabulary_size ** n < 2**62:
+                # Encode (sample, n-gram) as a single number, which is much faster than finding unique rows.
+                codes = ngrams[:, 0]
+                for k in range(1, n + 1):
+                    codes = codes * vocabulary_size + ngrams[:, k]
+                unique_codes, inverse = torch.unique(codes, return_inverse=True)
+                samples = unique_codes // vocabulary_size ** n
+            else:
+                unique_ngrams, inverse = torch.unique(ngrams, dim=0, return_inverse=True)
+                samples = unique_ngrams[:, 0]
+            pred_counts = torch.bincount(inverse[:num_pred_ngrams], minlength=len(samples))
+            target_counts = torch.bincount(inverse[num_pred_ngrams:], minlength=len(samples))
+
+            # Sum clipped counts for every sample.
+            clipped_counts = torch.min(pred_counts, target_counts).to(torch.float64)
+            numerators[:, i].index_add_(0, samples, clipped_counts)
+
+        return numerators, denominators, pred_lengths, target_lengths
+
+
+    def calculate_score(self, numerators, denominators, pred_lengths, target_lengths):
+        """
+        Calculates BLEU score(s) on the basis of n-gram statistics.
 
-        #if self.use_masking:
-        #    # Get masks from inputs.
-        #    masks = data_streams[self.key_masks].data.cpu().numpy().tolist()
-        #else:
-        #    batch_size = preds.shape[0]       
-        
-        # Calculate the correct predictinos.
-        scores = []
-
-        #print("targets ({}): {}\n".format(len(targets), targets[0]))
-        #print("preds ({}): {}\n".format(len(preds), preds[0]))
-
-        for target_indices, pred_indices in zip(targets, preds):
-            # Change target indices to words.
-            target_words = []
-            for t_ind in target_indices:
-                if t_ind in self.ix_to_word.keys():
-                    w = self.ix_to_word[t_ind]
-                    if w not in self.ignored_words:
-                        target_words.append(w)
-            # Change prediction indices to words.
-            pred_words = []
-            for p_ind in pred_indices:
-                if p_ind in self.ix_to_word.keys():
-                    w = self.ix_to_word[p_ind]
-                    if w not in self.ignored_words:
-                        pred_words.append(w)
-            # Calculate BLEU.
-            scores.append(sentence_bleu([target_words], pred_words, self.weights))
-            #print("TARGET: {}\n".format(target_words))
-            #print("PREDICTION: {}\n".format(pred_words))
-            #print("BLEU: {}\n".format(scores[-1]))
-
-            
-        # Get batch size.
-        batch_size = len(targets)
+        Follows NLTK: returns 0 when there are no matching unigrams, and uses the smallest float \
+        instead of zero precisions of higher order n-grams.
+
+        :return: Tensor with score(s).
+        """
+        weights = torch.tensor(self.weights, dtype=torch.float64)
+        precisions = torch.where(numerators > 0, numerators / denominators, torch.full_like(numerators, sys.float_info.min))
+        log_score = (weights * torch.log(precisions)).sum(dim=-1)
+
+        # Brevity penalty.
+        pred_lengths = pred_lengths.to(torch.float64)
+        target_lengths = target_lengths.to(torch.float64)
+        brevity_penalty = torch.where(pred_lengths > target_lengths, torch.ones_like(pred_lengths),
+            torch.exp(1 - target_lengths / pred_lengths.clamp(min=1)))
+        brevity_penalty = torch.where(pred_lengths > 0, brevity_penalty, torch.zeros_like(pred_lengths))
+
+        scores = brevity_penalty * torch.exp(log_score)
+        return torch.where(numerators[..., 0] > 0, scores, torch.zeros_like(scores))
+
+
+    def calculate_BLEU(self, data_streams):
+        """
+        Calculates BLEU for predictions of a given batch.
+
+        :param data_streams: DataStreams containing the targets and predictions (and optionally masks).
+        :type data_streams: DataStreams
+
+        :return: Average of sentence BLEU scores.
+
+        """
+        scores = self.calculate_score(*self.calculate_ngram_statistics(data_streams))
 
         # Normalize by batch size.
-        if batch_size > 0:
-            score = sum(scores) / batch_size
+        if len(scores) > 0:
+            return scores.mean().item()
         else:
-            score = 0
-
-        return score
+            return 0
 
 
     def add_statistics(self, stat_col):
@@ -183,7 +250,9 @@ class BLEUStatistics(Component):
         :param stat_col: ``StatisticsCollector``.
 
         """
-        stat_col.add_statistics(self.key_bleu, '{:6.4f}')
+        stat_col.add_statistics(self.key_bleu, '{:6.4f}', weights='batch_size')
+        # N-gram statistics summed over all collected batches (used by aggregator to calculate the corpus-level BLEU).
+        stat_col.add_running_sum(self.key_bleu+'_ngram_statistics')
 
     def collect_statistics(self, stat_col, data_streams):
         """
@@ -192,7 +261,13 @@ class BLEUStatistics(Component):
         :param stat_col: ``StatisticsCollector``.
 
         """
-        stat_col[self.key_bleu] = self.calculate_BLEU(data_streams)
+        numerators, denominators, pred_lengths, target_lengths = self.calculate_ngram_statistics(data_streams)
+        scores = self.calculate_score(numerators, denominators, pred_lengths, target_lengths)
+        stat_col[self.key_bleu] = scores.mean().item() if len(scores) > 0 else 0
+
+        # Update the running n-gram statistics: [numerators, denominators, length of predictions, length of targets].
+        stat_col.add_to_running_sum(self.key_bleu+'_ngram_statistics', torch.cat([numerators.sum(dim=0), denominators.sum(dim=0),
+            pred_lengths.sum().view(1).to(torch.float64), target_lengths.sum().view(1).to(torch.float64)]))
 
     def add_aggregators(self, stat_agg):
         """
@@ -205,6 +280,7 @@ class BLEUStatistics(Component):
         #stat_agg.add_aggregator(self.key_bleu+'_min', '{:7.5f}')
         #stat_agg.add_aggregator(self.key_bleu+'_max', '{:7.5f}')
         stat_agg.add_aggregator(self.key_bleu+'_std', '{:7.5f}')
+        stat_agg.add_aggregator(self.key_bleu+'_corpus', '{:7.5f}')  # represents the corpus-level BLEU
 
 
     def aggregate_statistics(self, stat_col, stat_agg):
@@ -216,25 +292,22 @@ class BLEUStatistics(Component):
         :param stat_agg: ``StatisticsAggregator``
 
         """
-        scores = stat_col[self.key_bleu]
+        # Get mean and std - weighted by batch sizes, if they were collected.
+        stat_agg[self.key_bleu] = stat_col.mean(self.key_bleu)
+        #stat_agg[self.key_bleu+'_min'] = stat_col.min(self.key_bleu)
+        #stat_agg[self.key_bleu+'_max'] = stat_col.max(self.key_bleu)
+        stat_agg[self.key_bleu+'_std'] = stat_col.std(self.key_bleu)
+
+        # Calculate corpus-level BLEU using n-gram statistics collected from all batches.
+        ngram_statistics = stat_col.running_sum(self.key_bleu+'_ngram_statistics')
+        if ngram_statistics is not None:
+            num_orders = len(self.weights)
+            numerators, denominators, lengths = ngram_statistics.split([num_orders, num_orders, 2])
+            stat_agg[self.key_bleu+'_corpus'] = self.calculate_score(numerators, denominators, lengths[0], lengths[1]).item()
+        else:
+            stat_agg[self.key_bleu+'_corpus'] = 0
 
         # Check if batch size was collected.
-        if "batch_size" in stat_col.keys():
-            batch_sizes = stat_col['batch_size']
-
-            # Calculate weighted precision.
-            scores_avg = np.average(scores, weights=batch_sizes)
-            scores_var = np.average((scores-scores_avg)**2, weights=batch_sizes)
-
-            stat_agg[self.key_bleu] = scores_avg
-            #stat_agg[self.key_bleu+'_min'] = np.min(scores)
-            #stat_agg[self.key_bleu+'_max'] = np.max(scores)
-            stat_agg[self.key_bleu+'_std'] = math.sqrt(scores_var)
-        else:
-            # Else: use simple mean.
-            stat_agg[self.key_bleu] = np.mean(scores)
-            #stat_agg[self.key_bleu+'_min'] = np.min(scores)
-            #stat_agg[self.key_bleu+'_max'] = np.max(scores)
-            stat_agg[self.key_bleu+'_std'] = np.std(scores)
+        if "batch_size" not in stat_col.keys():
             # But inform user about that!
             self.logger.warning("Aggregated statistics might contain errors due to the lack of information about sizes of aggregated batches")
@@ -78,6 +78,11 @@ class PrecisionRecallStatistics(Component):
             self.labels = list(range(self.num_classes))
             self.index_mappings = {i: i for i in range(self.num_classes)}
 
+        # Create array remapping indices to rows/columns of the confusion matrix (-1 for unknown indices).
+        self.index_remap = np.full(max(self.index_mappings.keys(), default=-1) + 1, -1, dtype=np.int64)
+        for index, i in self.index_mappings.items():
+            self.index_remap[index] = i
+
         # Check display options.
         self.show_confusion_matrix = self.config["show_confusion_matrix"]
         self.show_class_scores = self.config["show_class_scores"]
@@ -127,15 +132,7 @@ class PrecisionRecallStatistics(Component):
                 self.logger.info("Confusion matrix:\n{}".format(confusion_matrix))
 
             # Calculate weighted averages.
-            support_sum = sum(supports)
-            if support_sum > 0:
-                precision_avg = sum([pi*si for (pi,si) in zip(precisions,supports)]) / support_sum 
-                recall_avg = sum([ri*si for (ri,si) in zip(recalls,supports)]) / support_sum
-                f1score_avg = sum([fi*si for (fi,si) in zip(f1scores,supports)]) / support_sum
-            else:
-                precision_avg = 0
-                recall_avg = 0
-                f1score_avg = 0
+            precision_avg, recall_avg, f1score_avg, support_sum = self.calculate_weighted_averages(precisions, recalls, f1scores, supports)
 
             # Log class scores.
             if self.show_class_scores:
@@ -177,57 +174,74 @@ class PrecisionRecallStatistics(Component):
             masks = np.ones(targets.shape[0])
 
         # Create the confusion matrix, use SciKit learn order:
-        # Column - predicted class
-        #print(self.index_mappings)
         # Row - target (actual) class
-        confusion_matrix = np.zeros([self.num_classes, self.num_classes], dtype=int)
-        for i, (target, pred) in enumerate(zip(targets, preds)):
-            #print("T: ",target)
-            #print("P: ",pred)
-            # If both indices are ok.
-            if target in self.index_mappings.keys() and pred in self.index_mappings.keys():
-                #print(self.index_mappings[target])
-                #print(self.index_mappings[pred])
-                confusion_matrix[self.index_mappings[target]][self.index_mappings[pred]] += 1 * masks[i]
+        # Column - predicted class
+        # Skip samples with indices that are not present in the mappings.
+        valid = (targets >= 0) & (targets < len(self.index_remap)) & (preds >= 0) & (preds < len(self.index_remap))
+        targets = self.index_remap[targets[valid]]
+        preds = self.index_remap[preds[valid]]
+        masks = masks[valid].astype(float)
+        valid = (targets >= 0) & (preds >= 0)
+        confusion_matrix = np.bincount(targets[valid] * self.num_classes + preds[valid], weights=masks[valid],
+            minlength=self.num_classes * self.num_classes).reshape(self.num_classes, self.num_classes).astype(int)
+
+        precisions, recalls, f1scores, supports = self.calculate_scores(confusion_matrix)
+
+        return confusion_matrix, precisions, recalls, f1scores, supports
+
 
+    @staticmethod
+    def calculate_scores(confusion_matrix):
+        """
+        Calculates precission, recall, f1score and support for every class.
+
+        :param confusion_matrix: Confusion matrix (rows - target classes, columns - predicted classes).
+
+        :return: Arrays with precisions, recalls, f1scores and supports.
+        """
         # Calculate true positive (TP), eqv. with hit.
-        tp = np.zeros([self.num_classes], dtype=int)
-        for i in range(self.num_classes):
-            tp[i] = confusion_matrix[i][i]
-        #print("TP = ",tp)        
+        tp = np.diagonal(confusion_matrix).astype(float)
 
         # Calculate false positive (FP) eqv. with false alarm, Type I error
         # Predictions that incorrectly labelled as belonging to a given class.
         # Sum wrong predictions along the column.
         fp = np.sum(confusion_matrix, axis=0) - tp
-        #print("FP = ",fp)
 
         # Calculate false negative (FN), eqv. with miss, Type II error
         # The target belonged to a given class, but it wasn't correctly labeled.
         # Sum wrong predictions along the row.
         fn = np.sum(confusion_matrix, axis=1) - tp
-        #print("FN = ",fn)        
 
         # Precision is the fraction of events where we correctly declared i
         # out of all instances where the algorithm declared i.
-        precisions = [float(tpi) / float(tpi+fpi) if (tpi+fpi) > 0 else 0.0 for (tpi,fpi) in zip(tp,fp)]
+        precisions = np.divide(tp, tp + fp, out=np.zeros_like(tp), where=(tp + fp) > 0)
 
         # Recall is the fraction of events where we correctly declared i 
         # out of all of the cases where the true of state of the world is i.
-        recalls = [float(tpi) / float(tpi+fni) if (tpi+fni) > 0 else 0.0 for (tpi,fni) in zip(tp,fn)]
+        recalls = np.divide(tp, tp + fn, out=np.zeros_like(tp), where=(tp + fn) > 0)
 
         # Calcualte f1-scores.
-        f1scores = [ 2 * pi * ri / float(pi+ri) if (pi+ri) > 0 else 0.0 for (pi,ri) in zip(precisions,recalls)]
+        f1scores = np.divide(2 * precisions * recalls, precisions + recalls, out=np.zeros_like(tp), where=(precisions + recalls) > 0)
 
         # Get support.
         supports = np.sum(confusion_matrix, axis=1)
 
-        #print('precision: {}'.format(precision))
-        #print('recall: {}'.format(recall))
-        #print('f1score: {}'.format(f1score))
-        #print('support: {}'.format(support))
+        return precisions, recalls, f1scores, supports
 
-        return confusion_matrix, precisions, recalls, f1scores, supports
+
+    @staticmethod
+    def calculate_weighted_averages(precisions, recalls, f1scores, supports):
+        """
+        Calculates averages of precisions, recalls and f1scores, weighted by supports of classes.
+
+        :return: Averaged precision, recall, f1score and sum of supports.
+        """
+        support_sum = int(np.sum(supports))
+        if support_sum > 0:
+            return np.dot(precisions, supports) / support_sum, np.dot(recalls, supports) / support_sum, \
+                np.dot(f1scores, supports) / support_sum, support_sum
+        else:
+            return 0, 0, 0, support_sum
 
 
     def add_statistics(self, stat_col):
@@ -238,11 +252,13 @@ class PrecisionRecallStatistics(Component):
 
         """
         # Those will be displayed.
-        stat_col.add_statistics(self.key_precision, '{:05.4f}')
-        stat_col.add_statistics(self.key_recall, '{:05.4f}')
-        stat_col.add_statistics(self.key_f1score, '{:05.4f}')
+        stat_col.add_statistics(self.key_precision, '{:05.4f}', weights=self.key_f1score+'_support')
+        stat_col.add_statistics(self.key_recall, '{:05.4f}', weights=self.key_f1score+'_support')
+        stat_col.add_statistics(self.key_f1score, '{:05.4f}', weights=self.key_f1score+'_support')
         # That one will be collected and used by aggregator.
         stat_col.add_statistics(self.key_f1score+'_support', None)
+        # Confusion matrix summed over all collected batches (used by aggregator).
+        stat_col.add_running_sum(self.key_f1score+'_confusion_matrix')
 
 
     def collect_statistics(self, stat_col, data_streams):
@@ -253,22 +269,10 @@ class PrecisionRecallStatistics(Component):
 
         """
         # Calculate all four statistics.
-        _, precisions, recalls, f1scores, supports = self.calculate_statistics(data_streams)
+        confusion_matrix, precisions, recalls, f1scores, supports = self.calculate_statistics(data_streams)
 
         # Calculate weighted averages.
-        precision_sum = sum([pi*si for (pi,si) in zip(precisions,supports)])
-        recall_sum = sum([ri*si for (ri,si) in zip(recalls,supports)])
-        f1score_sum = sum([fi*si for (fi,si) in zip(f1scores,supports)])
-        support_sum = sum(supports)
-
-        if support_sum > 0:
-            precision_avg = precision_sum / support_sum 
-            recall_avg = recall_sum / support_sum
-            f1score_avg = f1score_sum / support_sum
-        else:
-            precision_avg = 0
-            recall_avg = 0
-            f1score_avg = 0
+        precision_avg, recall_avg, f1score_avg, support_sum = self.calculate_weighted_averages(precisions, recalls, f1scores, supports)
 
         # Export averages to statistics.
         stat_col[self.key_precision] = precision_avg
@@ -278,6 +282,9 @@ class PrecisionRecallStatistics(Component):
         # Export support to statistics.
         stat_col[self.key_f1score+'_support'] = support_sum
 
+        # Update the running confusion matrix.
+        stat_col.add_to_running_sum(self.key_f1score+'_confusion_matrix', confusion_matrix)
+
 
 
     def add_aggregators(self, stat_agg):
@@ -304,13 +311,8 @@ class PrecisionRecallStatistics(Component):
         :param stat_agg: ``StatisticsAggregator``
 
         """
-        precision_sums = stat_col[self.key_precision]
-        recall_sums = stat_col[self.key_recall]
-        f1score_sums = stat_col[self.key_f1score]
-        supports = stat_col[self.key_f1score+'_support']
-
         # Special case - no samples!
-        if sum(supports) == 0:
+        if stat_col.sum(self.key_f1score+'_support') == 0:
             stat_agg[self.key_precision] = 0
             stat_agg[self.key_precision+'_std'] = 0
             stat_agg[self.key_recall] = 0
@@ -319,23 +321,16 @@ class PrecisionRecallStatistics(Component):
             stat_agg[self.key_f1score+'_std'] = 0
 
         else: 
-            # Else: calculate weighted precision.
-            precisions_avg = np.average(precision_sums, weights=supports)
-            precisions_var = np.average((precision_sums-precisions_avg)**2, weights=supports)
-            
-            stat_agg[self.key_precision] = precisions_avg
-            stat_agg[self.key_precision+'_std'] = math.sqrt(precisions_var)
-
-            # Calculate weighted recall.
-            recalls_avg = np.average(recall_sums, weights=supports)
-            recalls_var = np.average((recall_sums-recalls_avg)**2, weights=supports)
-
-            stat_agg[self.key_recall] = recalls_avg
-            stat_agg[self.key_recall+'_std'] = math.sqrt(recalls_var)
-
-            # Calculate weighted f1 score.
-            f1scores_avg = np.average(f1score_sums, weights=supports)
-            f1scores_var = np.average((f1score_sums-f1scores_avg)**2, weights=supports)
-
-            stat_agg[self.key_f1score] = f1scores_avg
-            stat_agg[self.key_f1score+'_std'] = math.sqrt(f1scores_var)
+            # Else: calculate scores on the basis of the confusion matrix collected over all batches.
+            precisions, recalls, f1scores, supports = self.calculate_scores(stat_col.running_sum(self.key_f1score+'_confusion_matrix'))
+            precision_avg, recall_avg, f1score_avg, _ = self.calculate_weighted_averages(precisions, recalls, f1scores, supports)
+
+            # Standard deviations of batch scores (weighted by supports) around the scores of all batches.
+            stat_agg[self.key_precision] = precision_avg
+            stat_agg[self.key_precision+'_std'] = stat_col.std(self.key_precision, center=precision_avg)
+
+            stat_agg[self.key_recall] = recall_avg
+            stat_agg[self.key_recall+'_std'] = stat_col.std(self.key_recall, center=recall_avg)
+
+            stat_agg[self.key_f1score] = f1score_avg
+            stat_agg[self.key_f1score+'_std'] = stat_col.std(self.key_f1score, center=f1score_avg)
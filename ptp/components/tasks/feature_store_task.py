@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import torch
+
+from ptp.components.tasks.task import Task
+from ptp.components.mixins.feature_store import FeatureStore, calculate_config_hash
+from ptp.application.component_factory import ComponentFactory
+from ptp.data_types.data_streams import DataStreams
+from ptp.data_types.data_definition import DataDefinition
+from ptp.configuration.configuration_error import ConfigurationError
+
+
+class FeatureStoreTask(Task):
+    """
+    Task wrapper streaming features precomputed by a (frozen) image encoder in place of images.
+
+    Wraps a task (e.g. CLEVR, GQA or VQAMED2019) configured in the ``wrapped_task`` section, turns off streaming \
+    of its images and adds to every sample the features read (by image id) from the feature store created by \
+    the :py:class:`ptp.workers.FeatureExtractor` worker. This way the training pipeline can skip the encoder.
+
+    The store records the hash of configuration of the encoder, which is compared with the hash of configuration \
+    passed in the ``encoder`` section, so stale features are detected.
+    """
+
+    def __init__(self, name, config):
+        """
+        Initializes the wrapper, creates the wrapped task and opens the feature store.
+
+        :param name: Name of the component.
+
+        :param config: Dictionary of parameters (read from configuration ``.yaml`` file).
+        """
+        # Call constructors of parent classes.
+        Task.__init__(self, name, FeatureStoreTask, config)
+
+        # Get key mappings.
+        self.key_image_ids = self.stream_keys["image_ids"]
+        self.key_features = self.stream_keys["features"]
+
+        # Open the feature store.
+        store_name = self.config["store_name"]
+        if store_name == '':
+            raise ConfigurationError("Please indicate the name of the feature store ('store_name')")
+        self.feature_store = FeatureStore(self.config["store_folder"], store_name)
+
+        # Check whether the features were extracted by the encoder with the same configuration.
+        if self.feature_store.config_hash != calculate_config_hash(self.config["encoder"]):
+            raise ConfigurationError("Feature store '{}' is stale: it was created by an encoder with a different configuration".format(store_name))
+        self.logger.info("Using feature store '{}' with {} samples of shape {}".format(store_name, len(self.feature_store), self.feature_store.shape))
+
+        # Create the wrapped task - without images.
+        self.config["wrapped_task"].add_config_params({"stream_images": False})
+        self.wrapped_task, _ = ComponentFactory.build("wrapped_task", self.config["wrapped_task"])
+        if not isinstance(self.wrapped_task, Task):
+            raise ConfigurationError("Class '{}' is not derived from the Task class!".format(type(self.wrapped_task).__name__))
+        # Make sure the wrapped task returns image ids.
+        if self.key_image_ids not in self.wrapped_task.output_data_definitions():
+            raise ConfigurationError("Wrapped task does not return stream '{}' with image ids".format(self.key_image_ids))
+
+        # Set global variables - all dimensions ASIDE OF BATCH.
+        if len(self.feature_store.shape) == 3:
+            self.globals["feature_maps_depth"] = self.feature_store.shape[0]
+            self.globals["feature_maps_height"] = self.feature_store.shape[1]
+            self.globals["feature_maps_width"] = self.feature_store.shape[2]
+        else:
+            self.globals["feature_size"] = self.feature_store.shape[0]
+
+
+    def output_data_definitions(self):
+        """
+        Function returns a dictionary with definitions of output data produced the component.
+
+        :return: dictionary containing output data definitions (each of type :py:class:`ptp.utils.DataDefinition`).
+        """
+        d = self.wrapped_task.output_data_definitions()
+        d[self.key_features] = DataDefinition([-1] + self.feature_store.shape, [torch.Tensor], "Batch of precomputed features [BATCH_SIZE x FEATURES_SIZE]")
+        return d
+
+
+    def __len__(self):
+        """
+        Returns the "size" of the "task" (total number of samples).
+
+        :return: The size of the wrapped task.
+        """
+        return len(self.wrapped_task)
+
+
+    def __getitem__(self, index):
+        """
+        Getter method to access the dataset and return a single sample.
+
+        :param index: index of the sample to return.
+        :type index: int
+
+        :return: DataStreams returned by the wrapped task, extended by the features.
+        """
+        data_streams = self.wrapped_task[index]
+        data_streams.publish({self.key_features: self.feature_store.get_features(data_streams[self.key_image_ids])})
+        return data_streams
+
+
+    def collate_fn(self, batch):
+        """
+        Combines a list of DataStreams (retrieved with :py:func:`__getitem__`) into a batch.
+
+        :param batch: list of individual samples to combine
+        :type batch: list
+
+        :return: DataStreams returned by collate function of the wrapped task, extended by the features.
+        """
+        data_streams = self.wrapped_task.collate_fn(batch)
+        streams = dict(data_streams.items())
+        streams[self.key_features] = torch.stack([sample[self.key_features] for sample in batch])
+        return DataStreams(streams)
+
+
+    def add_statistics(self, stat_col):
+        """
+        Adds statistics of the wrapped task.
+
+        :param stat_col: ``StatisticsCollector``.
+        """
+        self.wrapped_task.add_statistics(stat_col)
+
+
+    def collect_statistics(self, stat_col, data_streams):
+        """
+        Collects statistics of the wrapped task.
+
+        :param stat_col: ``StatisticsCollector``.
+
+        :param data_streams: ``DataStreams`` containing inputs, targets etc.
+        """
+        self.wrapped_task.collect_statistics(stat_col, data_streams)
+
+
+    def add_aggregators(self, stat_agg):
+        """
+        Adds aggregators of the wrapped task.
+
+        :param stat_agg: ``StatisticsAggregator``.
+        """
+        self.wrapped_task.add_aggregators(stat_agg)
+
+
+    def aggregate_statistics(self, stat_col, stat_agg):
+        """
+        Aggregates statistics of the wrapped task.
+
+        :param stat_col: ``StatisticsCollector``.
+
+        :param stat_agg: ``StatisticsAggregator``.
+        """
+        self.wrapped_task.aggregate_statistics(stat_col, stat_agg)
+
+
+    def initialize_epoch(self, epoch):
+        """
+        Initializes epoch of the wrapped task.
+
+        :param epoch: current epoch
+        :type epoch: int
+        """
+        self.wrapped_task.initialize_epoch(epoch)
+
+
+    def finalize_epoch(self, epoch):
+        """
+        Finalizes epoch of the wrapped task.
+
+        :param epoch: current epoch
+        :type epoch: int
+        """
+        self.wrapped_task.finalize_epoch(epoch)
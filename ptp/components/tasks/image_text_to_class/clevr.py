@@ -18,13 +18,16 @@
 __author__ = "Tomasz Kornuta"
 
 import os
-import json
+import tqdm
 from PIL import Image
 
 import torch
 from torchvision import transforms
 
 from ptp.components.tasks.task import Task
+from ptp.components.mixins.image_cache import ImageCache, IMAGENET_MEAN, IMAGENET_STD
+from ptp.components.mixins.columnar_dataset import ColumnarDataset, ColumnarDatasetWriter, get_cache_folder
+from ptp.components.mixins.json_stream import iterate_json_array
 from ptp.data_types.data_definition import DataDefinition
 
 #from ptp.components.mixins.io import save_nparray_to_csv_file
@@ -121,6 +124,19 @@ class CLEVR(Task):
                 self.image_preprocessing = ["resize"] + self.image_preprocessing
         self.logger.info("Applied image preprocessing: {}".format(self.image_preprocessing))
 
+        # Build the image transformations.
+        image_transformations_list = []
+        # Optional: resize.
+        if 'resize' in self.image_preprocessing:
+            image_transformations_list.append(transforms.Resize([self.height,self.width]))
+        # Add obligatory transformation.
+        image_transformations_list.append(transforms.ToTensor())
+        # Optional: normalization.
+        if 'normalize' in self.image_preprocessing:
+            # Use normalization that the pretrained models from TorchVision require.
+            image_transformations_list.append(transforms.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD))
+        self.image_transformations = transforms.Compose(image_transformations_list)
+
         # Mapping of question subtypes to types (not used, but keeping it just in case).
         #self.question_subtype_to_type_mapping = {
         #    'query_size': 'query_attribute',
@@ -196,6 +212,17 @@ class CLEVR(Task):
 
         # Load dataset.
         self.dataset = self.load_dataset(data_file)
+
+        # Optional: cache of preprocessed images.
+        self.image_cache = None
+        if self.stream_images and self.config['image_cache']:
+            if not resize:
+                raise ConfigurationError("Image cache requires all images to be resized, please set 'resize_image'")
+            image_paths = {sample["image_filename"]: os.path.join(self.split_image_folder, sample["image_filename"]) for sample in self.dataset}
+            self.image_cache = ImageCache(
+                self.logger, os.path.join(self.data_folder, "image_cache"), image_paths, self.height, self.width,
+                self.config['image_cache_type'], 'normalize' in self.image_preprocessing
+                )
         
         # Display exemplary sample.
         i = 0
@@ -256,20 +283,52 @@ class CLEVR(Task):
         return len(self.dataset)
 
 
+    def get_image_ids(self):
+        """
+        Returns ids of images of all samples (decoded from the column of image ids at once).
+
+        :return: List of image ids.
+        """
+        column = self.dataset.column("image_filename")
+        return [column.table[code] for code in column.codes.tolist()]
+
+
     def load_dataset(self, source_data_file):
         """
-        Loads the dataset from source file
+        Loads the dataset from source file.
+
+        At first use the JSON file is parsed incrementally and questions are converted to compact columnar arrays \
+        (stored in the 'cache' subfolder of the data_folder), which are next reopened via mmap.
 
         :param source_data_file: jSON file with image ids, questions, answers, scene graphs, etc.
 
+        :return: :py:class:`ptp.components.mixins.columnar_dataset.ColumnarDataset` (sequence of dictionaries)
         """
         self.logger.info("Loading dataset from:\n {}".format(source_data_file))
-        dataset = []
-
-        with open(source_data_file) as f:
-            self.logger.info("Loading samples from '{}'...".format(source_data_file))
-            dataset = json.load(f)['questions']
 
+        # Fields of questions that will be stored.
+        columns = {
+            "question_index": "int",
+            "image_filename": "category",
+            "question": "text",
+            "answer": "category",
+            "question_family_index": "int"
+            }
+        folder = get_cache_folder(os.path.join(self.data_folder, "cache"), "clevr", [source_data_file], columns)
+
+        # Convert the file - if required.
+        if not ColumnarDataset.exists(folder):
+            self.logger.info("Converting samples from '{}' to '{}'...".format(source_data_file, folder))
+            writer = ColumnarDatasetWriter(folder, columns)
+            with open(source_data_file) as f:
+                t = tqdm.tqdm()
+                for question in iterate_json_array(f, "questions"):
+                    writer.append(question)
+                    t.update()
+                t.close()
+            writer.close()
+
+        dataset = ColumnarDataset(folder)
         self.logger.info("Loaded dataset consisting of {} samples".format(len(dataset)))
         return dataset
 
@@ -280,35 +339,18 @@ class CLEVR(Task):
         Additionally, it performs all the required transformations.
 
         :param img_id: Identifier of the images.
-        :param img_folder: Path to the image.
 
         :return: image (Tensor)
         """
+        # Use the preprocessed image when possible.
+        if self.image_cache is not None:
+            return self.image_cache.get_image(img_id)
 
         # Load the image.
         img = Image.open(os.path.join(self.split_image_folder, img_id)).convert('RGB')
 
-        image_transformations_list = []
-
-        # Optional: resize.
-        if 'resize' in self.image_preprocessing:
-            image_transformations_list.append(transforms.Resize([self.height,self.width]))
-
-        # Add obligatory transformation.
-        image_transformations_list.append(transforms.ToTensor())
-
-        # Optional: normalization.
-        if 'normalize' in self.image_preprocessing:
-            # Use normalization that the pretrained models from TorchVision require.
-            image_transformations_list.append(transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]))
-
         # Resize the image and transform to Torch Tensor.
-        transforms_com = transforms.Compose(image_transformations_list)
-        # Apply transformations.
-        img = transforms_com(img)
-
-        # Return image.
-        return img
+        return self.image_transformations(img)
 
     def __getitem__(self, index):
         """
@@ -18,7 +18,6 @@
 __author__ = "Tomasz Kornuta"
 
 import os
-import json
 import tqdm
 from PIL import Image
 
@@ -26,6 +25,9 @@ import torch
 from torchvision import transforms
 
 from ptp.components.tasks.task import Task
+from ptp.components.mixins.image_cache import ImageCache, IMAGENET_MEAN, IMAGENET_STD
+from ptp.components.mixins.columnar_dataset import ColumnarDataset, ColumnarDatasetWriter, get_cache_folder
+from ptp.components.mixins.json_stream import iterate_json_object
 from ptp.data_types.data_definition import DataDefinition
 
 from ptp.configuration.config_parsing import get_value_from_dictionary, get_value_list_from_dictionary
@@ -102,6 +104,19 @@ class GQA(Task):
 
         self.logger.info("Applied image preprocessing: {}".format(self.image_preprocessing))
 
+        # Build the image transformations.
+        image_transformations_list = []
+        # Optional: resize.
+        if 'resize' in self.image_preprocessing:
+            image_transformations_list.append(transforms.Resize([self.height,self.width]))
+        # Add obligatory transformation.
+        image_transformations_list.append(transforms.ToTensor())
+        # Optional: normalization.
+        if 'normalize' in self.image_preprocessing:
+            # Use normalization that the pretrained models from TorchVision require.
+            image_transformations_list.append(transforms.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD))
+        self.image_transformations = transforms.Compose(image_transformations_list)
+
         # Get the absolute path.
         self.data_folder = os.path.expanduser(self.config['data_folder'])
 
@@ -139,6 +154,15 @@ class GQA(Task):
 
         # Load dataset.
         self.dataset = self.load_dataset(data_files)
+
+        # Optional: cache of preprocessed images.
+        self.image_cache = None
+        if self.stream_images and self.config['image_cache']:
+            image_paths = {sample[self.key_image_ids]: os.path.join(self.split_image_folder, sample[self.key_image_ids]+".jpg") for sample in self.dataset}
+            self.image_cache = ImageCache(
+                self.logger, os.path.join(self.data_folder, "image_cache"), image_paths, self.height, self.width,
+                self.config['image_cache_type'], 'normalize' in self.image_preprocessing
+                )
         
         # Display exemplary sample.
         i = 0
@@ -190,47 +214,72 @@ class GQA(Task):
         return len(self.dataset)
 
 
+    def get_image_ids(self):
+        """
+        Returns ids of images of all samples (decoded from the column of image ids at once).
+
+        :return: List of image ids.
+        """
+        column = self.dataset.column(self.key_image_ids)
+        return [column.table[code] for code in column.codes.tolist()]
+
+
     def load_dataset(self, source_files):
         """
         Loads the dataset from source files.
 
+        At first use the JSON files are parsed incrementally and samples are converted to compact columnar arrays \
+        (stored in the 'cache' subfolder of the data_folder), which are next reopened via mmap.
+
         :param source_files: list of jSON file with image ids, questions, answers, scene graphs, etc.
 
+        :return: :py:class:`ptp.components.mixins.columnar_dataset.ColumnarDataset` (sequence of dictionaries)
         """
         self.logger.info("Loading dataset from:\n {}".format(source_files))
-        dataset = []
-
-        # Load and process files, one by one.
-        for source_file in source_files:
-            with open(source_file) as f:
-                self.logger.info("Loading samples from '{}'...".format(source_file))
-                json_dataset = json.load(f)
-                # Process samples.
-
-                # Add tdqm bar.
-                t = tqdm.tqdm(total=len(json_dataset))
-                for key,value in json_dataset.items():
-                    # New sample.
-                    sample = {}
-                    sample[self.key_sample_ids] = key
-                    sample[self.key_image_ids] = value["imageId"]
-                    sample[self.key_questions] = value["question"]
-
-                    # Return answer. 
-                    if "answer" in value.keys():
-                        sample[self.key_answers] = value["answer"]
-                        sample[self.key_full_answers] = value["fullAnswer"]
-                    else:
-                        # Test set.
-                        sample[self.key_answers] = "<UNK>"
-                        sample[self.key_full_answers] = "<UNK>"
-
-                    # Add to dataset.
-                    dataset.append(sample)
-                    t.update()
-                # Close the bar.
-                t.close()
 
+        # Streams that will be stored.
+        columns = {
+            self.key_sample_ids: "text",
+            self.key_image_ids: "category",
+            self.key_questions: "text",
+            self.key_answers: "category",
+            self.key_full_answers: "text"
+            }
+        folder = get_cache_folder(os.path.join(self.data_folder, "cache"), "gqa", source_files, columns)
+
+        # Convert the files - if required.
+        if not ColumnarDataset.exists(folder):
+            writer = ColumnarDatasetWriter(folder, columns)
+            # Load and process files, one by one.
+            for source_file in source_files:
+                self.logger.info("Converting samples from '{}' to '{}'...".format(source_file, folder))
+                with open(source_file) as f:
+                    # Add tdqm bar.
+                    t = tqdm.tqdm()
+                    for key, value in iterate_json_object(f):
+                        # New sample.
+                        sample = {}
+                        sample[self.key_sample_ids] = key
+                        sample[self.key_image_ids] = value["imageId"]
+                        sample[self.key_questions] = value["question"]
+
+                        # Return answer.
+                        if "answer" in value.keys():
+                            sample[self.key_answers] = value["answer"]
+                            sample[self.key_full_answers] = value["fullAnswer"]
+                        else:
+                            # Test set.
+                            sample[self.key_answers] = "<UNK>"
+                            sample[self.key_full_answers] = "<UNK>"
+
+                        # Add to dataset.
+                        writer.append(sample)
+                        t.update()
+                    # Close the bar.
+                    t.close()
+            writer.close()
+
+        dataset = ColumnarDataset(folder)
         self.logger.info("Loaded dataset consisting of {} samples".format(len(dataset)))
         return dataset
 
@@ -241,35 +290,18 @@ class GQA(Task):
         Additionally, it performs all the required transformations.
 
         :param img_id: Identifier of the images.
-        :param img_folder: Path to the image.
 
         :return: image (Tensor)
         """
+        # Use the preprocessed image when possible.
+        if self.image_cache is not None:
+            return self.image_cache.get_image(img_id)
 
         # Load the image.
         img = Image.open(os.path.join(self.split_image_folder, img_id+".jpg")).convert('RGB')
 
-        image_transformations_list = []
-
-        # Optional: resize.
-        if 'resize' in self.image_preprocessing:
-            image_transformations_list.append(transforms.Resize([self.height,self.width]))
-
-        # Add obligatory transformation.
-        image_transformations_list.append(transforms.ToTensor())
-
-        # Optional: normalization.
-        if 'normalize' in self.image_preprocessing:
-            # Use normalization that the pretrained models from TorchVision require.
-            image_transformations_list.append(transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]))
-
         # Resize the image and transform to Torch Tensor.
-        transforms_com = transforms.Compose(image_transformations_list)
-        # Apply transformations.
-        img = transforms_com(img)
-
-        # Return image.
-        return img
+        return self.image_transformations(img)
 
     def __getitem__(self, index):
         """
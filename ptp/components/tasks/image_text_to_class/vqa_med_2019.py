@@ -18,7 +18,11 @@
 __author__ = "Chaitanya Shivade, Tomasz Kornuta"
 
 import os
+import json
 import string
+import pickle
+import hashlib
+import multiprocessing
 import tqdm
 
 import pandas as pd
@@ -30,9 +34,10 @@ import torch
 from torchvision import transforms
 
 from ptp.components.tasks.task import Task
+from ptp.components.mixins.image_cache import ImageCache, IMAGENET_MEAN, IMAGENET_STD
 from ptp.data_types.data_definition import DataDefinition
 
-from ptp.components.mixins.io import save_nparray_to_csv_file
+from ptp.components.mixins.io import save_nparray_to_csv_file, load_pickle
 from ptp.configuration.config_parsing import get_value_list_from_dictionary, get_value_from_dictionary
 
 
@@ -62,6 +67,12 @@ class VQAMED2019(Task):
 
     .._repo: https://github.com/abachaa/VQA-Med-2019
     """
+    # Version of the format of cached samples (changing it invalidates all cache files).
+    cache_version = 1
+
+    # Number of texts processed by a single worker process at once.
+    preprocessing_chunk_size = 1000
+
     def __init__(self, name, config):
         """
         Initializes task object. Calls base constructor. Downloads the dataset if not present and loads the adequate files depending on the mode.
@@ -94,6 +105,12 @@ class VQAMED2019(Task):
         # Get flag indicating whether we want to (pre)aload all images at the start.
         self.preload_images = self.config['preload_images']
 
+        # Get flag indicating whether we want to use the cache of preprocessed images.
+        self.use_image_cache = self.stream_images and self.config['image_cache']
+        if self.use_image_cache and self.preload_images:
+            self.logger.warning("Images will be served from the image cache, disabling preloading")
+            self.preload_images = False
+
         # Check the desired image size.
         if len(self.config['resize_image']) != 2:
             self.logger.error("'resize_image' field must contain 2 values: the desired height and width")
@@ -129,6 +146,25 @@ class VQAMED2019(Task):
             self.image_preprocessing = 'random_affine | random_horizontal_flip | normalize'.split(" | ")
         self.logger.info("Applied image preprocessing: {}".format(self.image_preprocessing))
 
+        # Build the (optional) random image transformations.
+        random_transformations_list = []
+        if 'random_affine' in self.image_preprocessing:
+            rotate = (-45, 80)
+            translate = (0.05, 0.25)
+            scale = (0.5, 2)
+            random_transformations_list.append(transforms.RandomAffine(rotate, translate, scale))
+        if 'random_horizontal_flip' in self.image_preprocessing:
+            random_transformations_list.append(transforms.RandomHorizontalFlip())
+        self.random_image_transformations = transforms.Compose(random_transformations_list) if random_transformations_list else None
+
+        # Build the deterministic image transformations: add two obligatory transformations.
+        image_transformations_list = [transforms.Resize([self.height,self.width]), transforms.ToTensor()]
+        # Optional normalizastion.
+        if 'normalize' in self.image_preprocessing:
+            # Use normalization that the pretrained models from TorchVision require.
+            image_transformations_list.append(transforms.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD))
+        self.image_transformations = transforms.Compose(image_transformations_list)
+
 
         # Get question preprocessing.
         self.question_preprocessing = get_value_list_from_dictionary(
@@ -156,6 +192,10 @@ class VQAMED2019(Task):
         # Get the absolute path.
         self.data_folder = os.path.expanduser(self.config['data_folder'])
 
+        # Get dataset loading options.
+        self.cache_dataset = self.config['cache_dataset']
+        self.preprocessing_workers = self.config['preprocessing_workers']
+
         # Get split.
         split = get_value_from_dictionary('split', self.config, "training,validation,training_validation,test_answers,test".split(","))
 
@@ -270,6 +310,19 @@ class VQAMED2019(Task):
             source_image_folder = os.path.join(split_folder, 'VQAMed2019_Test_Images')
             self.dataset = self.load_testset_without_answers(source_file, source_image_folder)
 
+        # Move the samples to shared memory, so the DataLoader workers will not copy them.
+        if self.config['shared_samples']:
+            self.dataset = self.share_samples(self.dataset)
+
+        # Optional: cache of preprocessed images.
+        self.image_cache = None
+        if self.use_image_cache:
+            image_paths = {os.path.join(item["image_folder"], item[self.key_image_ids]): os.path.join(item["image_folder"], item[self.key_image_ids] + '.jpg') for item in self.dataset}
+            self.image_cache = ImageCache(
+                self.logger, os.path.join(self.data_folder, "image_cache"), image_paths, self.height, self.width,
+                self.config['image_cache_type'], 'normalize' in self.image_preprocessing
+                )
+
         # Ok, now we got the whole dataset (for given "split").
         self.ix = np.arange(len(self.dataset))
         if self.config["import_indices"] != '':
@@ -343,6 +396,29 @@ class VQAMED2019(Task):
         return len(self.dataset)
 
 
+    def get_sample_lengths(self):
+        """
+        Returns lengths of all samples.
+
+        :return: List of numbers of words in questions.
+        """
+        lengths = []
+        for i in self.ix:
+            question = self.dataset[i][self.key_questions]
+            # Questions might be already tokenized.
+            lengths.append(len(question) if type(question) == list else len(question.split()))
+        return lengths
+
+
+    def get_image_ids(self):
+        """
+        Returns ids of images of all samples.
+
+        :return: List of image ids.
+        """
+        return [self.dataset[i][self.key_image_ids] for i in self.ix]
+
+
     def filter_sources(self, source_files, source_image_folders, source_categories):
         """
         Loads the dataset from one or more files.
@@ -431,7 +507,8 @@ class VQAMED2019(Task):
         self.logger.info("Generated weights for {} samples and exported them to {}".format(len(sample_weights_ix), os.path.join(path, name)))
 
 
-    def preprocess_text(self, text, lowercase = False, remove_punctuation = False, tokenize = False, remove_stop_words = False):
+    @staticmethod
+    def preprocess_text(text, lowercase = False, remove_punctuation = False, tokenize = False, remove_stop_words = False):
         """
         Function that preprocesses questions/answers as suggested by ImageCLEF VQA challenge organizers:
             * lowercases all words (optional)
@@ -535,6 +612,156 @@ class VQAMED2019(Task):
         return result
 
 
+    @staticmethod
+    def preprocess_texts(texts, lowercase = False, remove_punctuation = False, tokenize = False, remove_stop_words = False):
+        """
+        Preprocesses a list of texts with :py:func:`preprocess_text` (executed in the worker processes).
+
+        :param texts: List of texts to be processed.
+
+        :return: List of preprocessed texts.
+        """
+        return [VQAMED2019.preprocess_text(text, lowercase, remove_punctuation, tokenize, remove_stop_words) for text in texts]
+
+
+    def preprocess_all_texts(self, texts, preprocessing, remove_stop_words):
+        """
+        Preprocesses all texts (questions or answers) loaded from a source file, using a pool of processes.
+
+        :param texts: List of texts to be processed.
+
+        :param preprocessing: List of applied preprocessing options.
+
+        :param remove_stop_words: Remove stop words (DEFAULT: False)
+
+        :return: List of preprocessed texts.
+        """
+        flags = ('lowercase' in preprocessing, 'remove_punctuation' in preprocessing, 'tokenize' in preprocessing, remove_stop_words)
+
+        # Do not spawn processes for small files.
+        if self.preprocessing_workers == 1 or len(texts) < self.preprocessing_chunk_size:
+            return VQAMED2019.preprocess_texts(texts, *flags)
+
+        # Split texts into chunks and process them in parallel (preserving the order).
+        chunks = [texts[i:i+self.preprocessing_chunk_size] for i in range(0, len(texts), self.preprocessing_chunk_size)]
+        processes = self.preprocessing_workers if self.preprocessing_workers > 0 else None
+        results = []
+        with multiprocessing.Pool(processes) as pool:
+            t = tqdm.tqdm(total=len(texts))
+            for chunk in pool.imap(VQAMED2019._preprocess_chunk, [(chunk, flags) for chunk in chunks]):
+                results.extend(chunk)
+                t.update(len(chunk))
+            t.close()
+        return results
+
+
+    @staticmethod
+    def _preprocess_chunk(args):
+        """
+        Unpacks arguments and calls :py:func:`preprocess_texts` (pool.imap passes a single argument).
+
+        :param args: Tuple (texts, flags).
+        """
+        (texts, flags) = args
+        return VQAMED2019.preprocess_texts(texts, *flags)
+
+
+    def load_source_file(self, data_file, image_folder, category, columns):
+        """
+        Loads and preprocesses samples from a single source file.
+
+        Preprocessed samples are stored in a binary cache file (in the 'cache' subfolder of the data_folder), \
+        with a name depending on the source file (path, modification time and size), image folder, category \
+        and question/answer preprocessing options, so the cache is automatically invalidated when any of those changes.
+        As every source file is cached separately, interrupted loading of a split can be resumed.
+
+        :param data_file: Source file.
+
+        :param image_folder: Folder containing image files.
+
+        :param category: Category associated with all samples from the file (None: read from the file).
+
+        :param columns: Names of columns of the source file.
+
+        :return: List of items (dictionaries).
+        """
+        # Check the cache.
+        if self.cache_dataset:
+            key = json.dumps([
+                self.cache_version, os.path.abspath(data_file), os.path.getmtime(data_file), os.path.getsize(data_file), image_folder, category, columns,
+                [self.key_image_ids, self.key_questions, self.key_answers, self.key_category_ids], self.question_preprocessing, self.answer_preprocessing
+                ])
+            cache_file = os.path.join(self.data_folder, "cache", "vqa_med_2019_{}.pkl".format(hashlib.md5(key.encode()).hexdigest()))
+            if os.path.isfile(cache_file):
+                items = load_pickle(self.logger, cache_file)
+                if items is not None:
+                    return items
+
+        # Load file content using '|' separator.
+        df = pd.read_csv(filepath_or_buffer=data_file, sep='|',header=None, names=columns)
+
+        # Get category ids.
+        if category is None:
+            category_mapping = {'modality': 0, 'plane': 1, 'organ': 2, 'abnormality': 3}
+            categories = [category_mapping[c] for c in df["category"]]
+        else:
+            categories = [category] * len(df.index)
+
+        # Process questions - if required.
+        questions = self.preprocess_all_texts(
+            df[self.key_questions].tolist(),
+            self.question_preprocessing,
+            'remove_stop_words' in self.question_preprocessing
+            )
+
+        # Process answers - if required.
+        if self.key_answers in columns:
+            answers = self.preprocess_all_texts(df[self.key_answers].tolist(), self.answer_preprocessing, False)
+        else:
+            # Test set without answers.
+            answer = ['<UNK>'] if 'tokenize' in self.answer_preprocessing else '<UNK>'
+            answers = [answer] * len(df.index)
+
+        # Create item "dictionaries".
+        items = [{
+            # Image name and path leading to it.
+            self.key_image_ids: img_id,
+            "image_folder": image_folder,
+            self.key_questions: question,
+            self.key_answers: answer,
+            # Add category.
+            self.key_category_ids: category_id
+            } for img_id, question, answer, category_id in zip(df[self.key_image_ids].tolist(), questions, answers, categories)]
+
+        # Store items in the cache.
+        if self.cache_dataset:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(cache_file + ".tmp", 'wb') as f:
+                pickle.dump(items, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(cache_file + ".tmp", cache_file)
+            self.logger.info("Stored preprocessed samples in {}".format(cache_file))
+
+        return items
+
+
+    def preload_dataset_images(self, dataset):
+        """
+        Preloads (and preprocesses) images of all samples, if set so in the configuration.
+
+        :param dataset: List of items (dictionaries).
+        """
+        if not (self.preload_images and self.stream_images):
+            return
+        self.logger.info("Preloading images of {} samples".format(len(dataset)))
+        t = tqdm.tqdm(total=len(dataset))
+        for item in dataset:
+            img, img_size = self.get_image(item[self.key_image_ids], item["image_folder"])
+            item[self.key_images] = img
+            item[self.key_image_sizes] = img_size
+            t.update()
+        t.close()
+
+
     def load_dataset(self, source_files, source_image_folders, source_categories):
         """
         Loads the dataset from one or more files.
@@ -553,57 +780,10 @@ class VQAMED2019(Task):
         for data_file, image_folder, category in zip(source_files, source_image_folders, source_categories):
             # Set absolute path to file.
             self.logger.info('Loading dataset from {} (category: {})...'.format(data_file, category))
-            # Load file content using '|' separator.
-            df = pd.read_csv(filepath_or_buffer=data_file, sep='|',header=None,
-                    names=[self.key_image_ids,self.key_questions,self.key_answers])
-
-            # Add tdqm bar.
-            t = tqdm.tqdm(total=len(df.index))
-            for _, row in df.iterrows():
-                # Retrieve question and answer.
-                question = row[self.key_questions]
-                answer = row[self.key_answers]
-
-                # Process question - if required.
-                preprocessed_question = self.preprocess_text(
-                    question,
-                    'lowercase' in self.question_preprocessing,
-                    'remove_punctuation' in self.question_preprocessing,
-                    'tokenize' in self.question_preprocessing,
-                    'remove_stop_words' in self.question_preprocessing
-                    )
-
-                # Process answer - if required.
-                preprocessed_answer = self.preprocess_text(
-                    answer,
-                    'lowercase' in self.answer_preprocessing,
-                    'remove_punctuation' in self.answer_preprocessing,
-                    'tokenize' in self.answer_preprocessing,
-                    False
-                    )
-
-                # Create item "dictionary".
-                item = {
-                    # Image name and path leading to it.
-                    self.key_image_ids: row[self.key_image_ids],
-                    "image_folder": image_folder,
-                    self.key_questions: preprocessed_question,
-                    self.key_answers: preprocessed_answer,
-                    # Add category.
-                    self.key_category_ids: category
-                    }
-
-                # Preload image.
-                if self.preload_images and self.stream_images:
-                    img, img_size = self.get_image(row[self.key_image_ids], image_folder)
-                    item[self.key_images] = img
-                    item[self.key_image_sizes] = img_size
-
-                # Add item to dataset.
-                dataset.append(item)
-
-                t.update()
-            t.close()
+            dataset.extend(self.load_source_file(data_file, image_folder, category, [self.key_image_ids,self.key_questions,self.key_answers]))
+
+        # Preload images.
+        self.preload_dataset_images(dataset)
 
         self.logger.info("Loaded dataset consisting of {} samples".format(len(dataset)))
         # Return the created list.
@@ -619,66 +799,12 @@ class VQAMED2019(Task):
         :param image_folder: Folder containing image files.
 
         """
-        # Set containing list of tuples.
-        dataset = []
-        category_mapping = {'modality': 0, 'plane': 1, 'organ': 2, 'abnormality': 3}
-
         # Set absolute path to file.
         self.logger.info('Loading test set from {}...'.format(data_file))
-        # Load file content using '|' separator.
-        df = pd.read_csv(filepath_or_buffer=data_file, sep='|',header=None,
-                names=[self.key_image_ids,"category",self.key_questions,self.key_answers])
-
-        # Add tdqm bar.
-        t = tqdm.tqdm(total=len(df.index))
-        for _, row in df.iterrows():
-            # Retrieve question and answer.
-            question = row[self.key_questions]
-            answer = row[self.key_answers]
-
-            # Process question - if required.
-            preprocessed_question = self.preprocess_text(
-                question,
-                'lowercase' in self.question_preprocessing,
-                'remove_punctuation' in self.question_preprocessing,
-                'tokenize' in self.question_preprocessing,
-                'remove_stop_words' in self.question_preprocessing
-                )
+        dataset = self.load_source_file(data_file, image_folder, None, [self.key_image_ids,"category",self.key_questions,self.key_answers])
 
-            # Process answer - if required.
-            preprocessed_answer = self.preprocess_text(
-                answer,
-                'lowercase' in self.answer_preprocessing,
-                'remove_punctuation' in self.answer_preprocessing,
-                'tokenize' in self.answer_preprocessing,
-                False
-                )
-
-            # Get category id.
-            category_id = category_mapping[row["category"]]
-
-            # Create item "dictionary".
-            item = {
-                # Image name and path leading to it.
-                self.key_image_ids: row[self.key_image_ids],
-                "image_folder": image_folder,
-                self.key_questions: preprocessed_question,
-                self.key_answers: preprocessed_answer,
-                # Add category.
-                self.key_category_ids: category_id
-                }
-
-            # Preload image.
-            if self.preload_images and self.stream_images:
-                img, img_size = self.get_image(row[self.key_image_ids], image_folder)
-                item[self.key_images] = img
-                item[self.key_image_sizes] = img_size
-
-            # Add item to dataset.
-            dataset.append(item)
-
-            t.update()
-        t.close()
+        # Preload images.
+        self.preload_dataset_images(dataset)
 
         self.logger.info("Loaded dataset consisting of {} samples".format(len(dataset)))
         # Return the created list.
@@ -694,60 +820,13 @@ class VQAMED2019(Task):
         :param image_folder: Folder containing image files.
 
         """
-        # Set containing list of tuples.
-        dataset = []
-        category_id = 5 # <UNK>
-        answer = '<UNK>'
-
         # Set absolute path to file.
         self.logger.info('Loading test set from {}...'.format(data_file))
-        # Load file content using '|' separator.
-        df = pd.read_csv(filepath_or_buffer=data_file, sep='|',header=None,
-                names=[self.key_image_ids,self.key_questions])
-
-        # Add tdqm bar.
-        t = tqdm.tqdm(total=len(df.index))
-        for _, row in df.iterrows():
-            # Retrieve question.
-            question = row[self.key_questions]
-
-            # Process question - if required.
-            preprocessed_question = self.preprocess_text(
-                question,
-                'lowercase' in self.question_preprocessing,
-                'remove_punctuation' in self.question_preprocessing,
-                'tokenize' in self.question_preprocessing,
-                'remove_stop_words' in self.question_preprocessing
-                )
+        # Use <UNK> category.
+        dataset = self.load_source_file(data_file, image_folder, 5, [self.key_image_ids,self.key_questions])
 
-            # Process answer - if required.
-            if 'tokenize' in self.answer_preprocessing:
-                preprocessed_answer = [answer]
-            else:
-                preprocessed_answer = answer 
-
-            # Create item "dictionary".
-            item = {
-                # Image name and path leading to it.
-                self.key_image_ids: row[self.key_image_ids],
-                "image_folder": image_folder,
-                self.key_questions: preprocessed_question,
-                self.key_answers: preprocessed_answer,
-                # Add category.
-                self.key_category_ids: category_id
-                }
-
-            # Preload image.
-            if self.preload_images and self.stream_images:
-                img, img_size = self.get_image(row[self.key_image_ids], image_folder)
-                item[self.key_images] = img
-                item[self.key_image_sizes] = img_size
-
-            # Add item to dataset.
-            dataset.append(item)
-
-            t.update()
-        t.close()
+        # Preload images.
+        self.preload_dataset_images(dataset)
 
         self.logger.info("Loaded dataset consisting of {} samples".format(len(dataset)))
         # Return the created list.
@@ -763,36 +842,29 @@ class VQAMED2019(Task):
 
         :return: image (Tensor), image size (Tensor, w,h, both scaled to (0,1>)
         """
+        if self.image_cache is not None:
+            # Get the resized image from the cache.
+            cache_id = os.path.join(img_folder, img_id)
+            img = self.image_cache.get_image(cache_id, as_uint8=True)
+            height, width = self.image_cache.get_image_size(cache_id)
+            # Apply the random transformations on top of it.
+            if self.random_image_transformations is not None:
+                img = self.random_image_transformations(img)
+            # Transform to float and normalize.
+            img = self.image_cache.postprocess(img)
 
-        extension = '.jpg'
-        # Load the image.
-        img = Image.open(os.path.join(img_folder, img_id + extension))
-        # Get its width and height.
-        width, height = img.size
-
-        image_transformations_list = []
-        # Optional.
-        if 'random_affine' in self.image_preprocessing:
-            rotate = (-45, 80)
-            translate = (0.05, 0.25)
-            scale = (0.5, 2)
-            image_transformations_list.append(transforms.RandomAffine(rotate, translate, scale))
-        if 'random_horizontal_flip' in self.image_preprocessing:
-            image_transformations_list.append(transforms.RandomHorizontalFlip())
-            
-        # Add two obligatory transformations.
-        image_transformations_list.append(transforms.Resize([self.height,self.width]))
-        image_transformations_list.append(transforms.ToTensor())
-
-        # Optional normalizastion.
-        if 'normalize' in self.image_preprocessing:
-            # Use normalization that the pretrained models from TorchVision require.
-            image_transformations_list.append(transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]))
-
-        # Resize the image and transform to Torch Tensor.
-        transforms_com = transforms.Compose(image_transformations_list)
-        # Apply transformations.
-        img = transforms_com(img)
+        else:
+            extension = '.jpg'
+            # Load the image.
+            img = Image.open(os.path.join(img_folder, img_id + extension))
+            # Get its width and height.
+            width, height = img.size
+
+            # Apply the random transformations.
+            if self.random_image_transformations is not None:
+                img = self.random_image_transformations(img)
+            # Resize the image and transform to Torch Tensor.
+            img = self.image_transformations(img)
 
         # Get scaled image size.
         img_size = torch.FloatTensor([float(height/self.scale_image_height), float(width/self.scale_image_width)])
@@ -19,6 +19,7 @@ __author__ = "Tomasz Kornuta"
 
 import os
 import torch
+import numpy as np
 from torchvision import datasets, transforms
 
 from ptp.components.tasks.task import Task
@@ -67,7 +68,8 @@ class CIFAR100(Task):
         self.use_train_data = self.config['use_train_data']
 
         # Add transformations depending on the resizing option.
-        if 'resize_image' in self.config:
+        self.resize_image = 'resize_image' in self.config
+        if self.resize_image:
             # Check the desired size.
             if len(self.config['resize_image']) != 2:
                 self.logger.error("'resize_image' field must contain 2 values: the desired height and width")
@@ -148,6 +150,10 @@ class CIFAR100(Task):
             self.fine_to_coarse_id_mapping[fine_id] = fine_to_coarse_mapping[fine_label]
             #print(" {} ({}) : {} ".format(fine_label, fine_id, self.coarse_ix_to_word[fine_to_coarse_mapping[fine_label]]))
 
+        # Arrays used by the batch-level access path: fine targets of all samples and fine to coarse id mapping.
+        self.fine_targets = np.asarray(self.dataset.targets, dtype=np.int64)
+        self.fine_to_coarse_ids = np.array([self.fine_to_coarse_id_mapping[fine_id] for fine_id in range(len(fine_labels))], dtype=np.int64)
+
         # Set global variables - all dimensions ASIDE OF BATCH.
         self.globals["num_coarse_classes"] = len(coarse_word_to_ix)
         self.globals["num_fine_classes"] = len(fine_labels)
@@ -206,3 +212,31 @@ class CIFAR100(Task):
 
         #print(data_streams)
         return data_streams
+
+
+    def __getitems__(self, indices):
+        """
+        Batch-level access path: slices the images and targets of all samples directly into batch tensors.
+
+        :param indices: List of indices of samples.
+
+        :return: DataStreams containing the batch (the same as the one returned by :py:func:`collate_fn`).
+        """
+        if self.resize_image:
+            # Resizing is done on PIL images, sample by sample.
+            return self.collate_fn([self[index] for index in indices])
+
+        indices = np.asarray(indices, dtype=np.int64)
+        fine_targets = self.fine_targets[indices]
+        coarse_targets = self.fine_to_coarse_ids[fine_targets]
+        data_streams = self.create_data_streams(torch.from_numpy(indices))
+        # The same conversion as done by ToTensor: [BATCH_SIZE x HEIGHT x WIDTH x 3] -> [BATCH_SIZE x 3 x HEIGHT x WIDTH] in range [0, 1].
+        images = torch.from_numpy(self.dataset.data[indices]).permute(0, 3, 1, 2).contiguous()
+        data_streams[self.key_inputs] = images.to(torch.get_default_dtype()).div(255)
+        # Targets.
+        data_streams[self.key_coarse_targets] = torch.from_numpy(coarse_targets)
+        data_streams[self.key_fine_targets] = torch.from_numpy(fine_targets)
+        # Labels.
+        data_streams[self.key_coarse_labels] = [self.coarse_ix_to_word[target] for target in coarse_targets.tolist()]
+        data_streams[self.key_fine_labels] = [self.fine_ix_to_word[target] for target in fine_targets.tolist()]
+        return data_streams
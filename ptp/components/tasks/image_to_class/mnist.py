@@ -70,7 +70,8 @@ class MNIST(Task):
         self.use_train_data = self.config['use_train_data']
 
         # Add transformations depending on the resizing option.
-        if 'resize_image' in self.config:
+        self.resize_image = 'resize_image' in self.config
+        if self.resize_image:
             # Check the desired size.
             if len(self.config['resize_image']) != 2:
                 self.logger.error("'resize_image' field must contain 2 values: the desired height and width")
@@ -152,5 +153,27 @@ class MNIST(Task):
         data_streams = self.create_data_streams(index)
         data_streams[self.key_inputs] = img
         data_streams[self.key_targets] = target
-        data_streams[self.key_labels] = self.ix_to_word[target.item()]
+        data_streams[self.key_labels] = self.ix_to_word[int(target)]
+        return data_streams
+
+
+    def __getitems__(self, indices):
+        """
+        Batch-level access path: slices the images and targets of all samples directly into batch tensors.
+
+        :param indices: List of indices of samples.
+
+        :return: DataStreams containing the batch (the same as the one returned by :py:func:`collate_fn`).
+        """
+        if self.resize_image:
+            # Resizing is done on PIL images, sample by sample.
+            return self.collate_fn([self[index] for index in indices])
+
+        indices = torch.as_tensor(indices, dtype=torch.int64)
+        targets = self.dataset.targets[indices]
+        data_streams = self.create_data_streams(indices)
+        # The same conversion as done by ToTensor: [BATCH_SIZE x 1 x HEIGHT x WIDTH] in range [0, 1].
+        data_streams[self.key_inputs] = self.dataset.data[indices].unsqueeze(1).to(torch.get_default_dtype()).div(255)
+        data_streams[self.key_targets] = targets
+        data_streams[self.key_labels] = [self.ix_to_word[target] for target in targets.tolist()]
         return data_streams
@@ -20,6 +20,7 @@ import torch
 from torch.utils.data import Dataset
 
 from ptp.components.component import Component
+from ptp.components.mixins.shared_samples import SharedSamples
 from ptp.data_types.data_streams import DataStreams
 
 
@@ -156,6 +157,85 @@ class Task(Component, Dataset):
         return DataStreams({key: torch.utils.data.dataloader.default_collate([sample[key] for sample in batch]) for key in batch[0]})
 
 
+    def has_batch_access(self):
+        """
+        Checks whether the task implements the batch-level access path, i.e. the ``__getitems__(indices)`` method, \
+        returning the whole batch at once (DataStreams already collated, just like returned by :py:func:`collate_fn`).
+
+        The :py:class:`torch.utils.data.DataLoader` calls ``__getitems__`` (if present) instead of :py:func:`__getitem__`, \
+        so tasks backed by arrays can slice them directly into batch tensors, without creating DataStreams for every sample.
+
+        :return: True if the task implements ``__getitems__``.
+        """
+        return callable(getattr(self, '__getitems__', None))
+
+
+    def get_collate_fn(self):
+        """
+        Returns the collate function that should be used by the data loader.
+
+        :return: :py:func:`collate_fn` or, for tasks with the batch-level access path, :py:func:`pass_collated_batch`.
+        """
+        return self.pass_collated_batch if self.has_batch_access() else self.collate_fn
+
+
+    def pass_collated_batch(self, batch):
+        """
+        Collate function used for batches returned by ``__getitems__``, which are already collated.
+
+        :param batch: DataStreams containing the batch.
+
+        :return: The same DataStreams.
+        """
+        return batch
+
+
+    def get_sample_lengths(self):
+        """
+        Returns lengths of all samples (e.g. numbers of words in sentences), used by samplers grouping samples \
+        of similar lengths into batches (e.g. :py:class:`ptp.utils.samplers.BucketBatchSampler`).
+
+        .. note::
+
+            Returns None - To be redefined in inheriting classes with variable-length samples.
+
+        :return: List or array of lengths (or None if not supported).
+        """
+        return None
+
+
+    def get_image_ids(self):
+        """
+        Returns ids of images of all samples (e.g. used by the feature extractor to encode every image only once).
+
+        .. note::
+
+            Returns None - To be redefined in inheriting classes returning images.
+
+        :return: List of image ids, as returned in the image ids stream (or None if not supported).
+        """
+        return None
+
+
+    def share_samples(self, samples):
+        """
+        Moves samples loaded into memory (a list of dictionaries) into columnar tensors placed in shared memory \
+        (see :py:class:`ptp.components.mixins.shared_samples.SharedSamples`), so the DataLoader workers \
+        read them without creating private copies of the dataset.
+
+        .. note::
+
+            Must be called before the DataLoader starts the workers, e.g. at the end of the constructor.
+
+        :param samples: List of samples (dictionaries with identical keys).
+
+        :return: :py:class:`SharedSamples` object, that can replace the list.
+        """
+        shared_samples = SharedSamples(samples)
+        self.logger.info("Moved {} samples to shared memory ({:.1f} MB)".format(len(shared_samples), shared_samples.nbytes / 2**20))
+        return shared_samples
+
+
     def initialize_epoch(self, epoch):
         """
         Function called to initialize a new epoch.
@@ -67,6 +67,15 @@ class LanguageIdentification(Task):
         return len(self.inputs)
 
 
+    def get_sample_lengths(self):
+        """
+        Returns lengths of all samples.
+
+        :return: List of numbers of words in sentences.
+        """
+        return [len(sentence.split()) for sentence in self.inputs]
+
+
     def __getitem__(self, index):
         """
         Getter method to access the dataset and return a sample.
@@ -17,6 +17,7 @@ __author__ = "Tomasz Kornuta"
 import os
 
 import ptp.components.mixins.io as io
+from ptp.components.mixins.token_store import TokenStore
 from ptp.components.tasks.task import Task
 from ptp.data_types.data_definition import DataDefinition
 
@@ -55,13 +56,15 @@ class WiLYNGramLanguageModeling(Task):
         # Select set.
         if self.config['use_train_data']:
             inputs_file = "x_train.txt"
-            ngrams_file =  "ngrams_train.txt"
+            ngrams_name =  "ngrams_train"
         else:
             inputs_file = "x_test.txt"
-            ngrams_file =  "ngrams_test.txt"
+            ngrams_name =  "ngrams_test"
+        # N-grams are stored encoded in a token store, separately for every context size.
+        token_store_name = "{}.context_{}.token_store".format(ngrams_name, self.context)
 
         # Check if we can load ngrams.
-        if not io.check_file_existence(self.data_folder, ngrams_file):
+        if not TokenStore.exists(self.data_folder, token_store_name):
             # Sadly not, we have to generate them.
             if not io.check_file_existence(self.data_folder, inputs_file):
                 # Even worst - we have to download wily.
@@ -69,43 +72,43 @@ class WiLYNGramLanguageModeling(Task):
                 zipfile_name = "wili-2018.zip"
                 io.download_extract_zip_file(self.logger, self.data_folder, url, zipfile_name)
 
-
             # Load file.
             inputs = io.load_string_list_from_txt_file(self.data_folder, inputs_file)
 
             self.logger.info("Please wait, generating n-grams...")
-            self.ngrams_sent = []
-            # Now we have to split sentencese into n-grams.
-            for sentence in inputs:
-                # Split sentence into words.
-                words = sentence.split()
-                
-                # Build a list of ngrams.
-                for i in range(len(words) - self.context):
-                    ngram = [words[j] for j in range(i, i+1+self.context)]
-                    self.ngrams_sent.append(' '.join(ngram))
+            ngrams = self.generate_ngrams(inputs)
 
+            # Encode n-grams and save them.
+            token_store = TokenStore.from_sequences(ngrams)
             # Assert that they are any ngrams there!
-            assert len(self.ngrams_sent) > 0, "Number of n-grams generated on the basis of '{}' must be greater than 0!".format(inputs_file)
-            # Done.
-            self.logger.info("Generated {} n-grams, example:\n{}".format(len(self.ngrams_sent), self.ngrams_sent[0]))
+            assert len(token_store) > 0, "Number of n-grams generated on the basis of '{}' must be greater than 0!".format(inputs_file)
+            self.logger.info("Saving {} n-grams to token store '{}'".format(len(token_store), token_store_name))
+            token_store.save(self.data_folder, token_store_name)
 
-            self.logger.info("Saving {} n-grams to file '{}'".format(len(self.ngrams_sent), ngrams_file))
-            # N-grams generated, save them to file.
-            io.save_string_list_to_txt_file(self.data_folder, ngrams_file, self.ngrams_sent)
-        else:
-            self.logger.info("Please wait, loading n-grams from file '{}'".format(ngrams_file))
-            # Load file.
-            self.ngrams_sent = io.load_string_list_from_txt_file(self.data_folder, ngrams_file)
+        # Open (memory-mapped) token store.
+        self.token_store = TokenStore.load(self.data_folder, token_store_name)
+        # Assert that they are any ngrams there!
+        assert len(self.token_store) > 0, "Number of n-grams loaded from {} must be greater than 0!".format(token_store_name)
+        # Done.
+        self.logger.info("Loaded {} n-grams, example:\n{}".format(len(self.token_store), ' '.join(self.token_store[0])))
+
+
+    def generate_ngrams(self, inputs):
+        """
+        Splits sentences into n-grams, each consisting of context + 1 words.
+
+        :param inputs: List of sentences.
+
+        :return: Generator of n-grams (lists of words).
+        """
+        for sentence in inputs:
+            # Split sentence into words.
+            words = sentence.split()
+
+            # Build a list of ngrams.
+            for i in range(len(words) - self.context):
+                yield words[i:i+1+self.context]
 
-            # Assert that they are equal in size!
-            assert len(self.ngrams_sent) > 0, "Number of n-grams loaded from {} must be greater than 0!".format(ngrams_file)
-            # Done.
-            self.logger.info("Loaded {} n-grams, example:\n{}".format(len(self.ngrams_sent), self.ngrams_sent[0]))
-        
-        # Split words in n-grams.
-        self.ngrams = [ngram.split() for ngram in self.ngrams_sent]
-        
 
     def output_data_definitions(self):
         """ 
@@ -127,7 +130,7 @@ class WiLYNGramLanguageModeling(Task):
 
         :return: The size of the task.
         """
-        return len(self.ngrams)
+        return len(self.token_store)
 
 
     def __getitem__(self, index):
@@ -142,7 +145,8 @@ class WiLYNGramLanguageModeling(Task):
         """
         # Return data_streams.
         data_streams = self.create_data_streams(index)
-        data_streams[self.key_inputs] = ' '.join(self.ngrams[index][:self.context])
-        data_streams[self.key_targets] = self.ngrams[index][-1] # Last word
+        ngram = self.token_store[index]
+        data_streams[self.key_inputs] = ' '.join(ngram[:self.context])
+        data_streams[self.key_targets] = ngram[-1] # Last word
         #print("task: context = {} target = {}".format(data_streams[self.key_inputs], data_streams[self.key_targets]))
         return data_streams
@@ -19,10 +19,12 @@ import random
 import tempfile
 import unicodedata
 import re
+import numpy as np
 
 from nltk.tokenize import WhitespaceTokenizer
 
 import ptp.components.mixins.io as io
+from ptp.components.mixins.token_store import TokenStore
 from ptp.configuration import ConfigurationError
 from ptp.components.tasks.task import Task
 from ptp.data_types.data_definition import DataDefinition
@@ -137,8 +139,8 @@ class TranslationPairs(Task):
 
         # Separate into src - tgt sentence pairs + tokenize
         tokenizer = WhitespaceTokenizer()
-        self.sentences_source = []
-        self.sentences_target = []
+        sentences_source = []
+        sentences_target = []
         for s_src, s_tgt in zip(lines_source, lines_target):
             src = tokenizer.tokenize(s_src)
             tgt = tokenizer.tokenize(s_tgt)
@@ -146,16 +148,19 @@ class TranslationPairs(Task):
             # If self.sentence_length < 0, then give all the pairs regardless of length
             if (len(src) <= self.sentence_length and len(tgt) <= self.sentence_length) \
                 or self.sentence_length < 0:
-                self.sentences_source += [src]
-                self.sentences_target += [tgt]
+                sentences_source += [src]
+                sentences_target += [tgt]
 
-        self.logger.info("Load text consisting of {} sentences".format(len(self.sentences_source)))
+        # Encode sentences into compact token stores.
+        self.source_store = TokenStore.from_sequences(sentences_source)
+        self.target_store = TokenStore.from_sequences(sentences_target)
+        self.logger.info("Load text consisting of {} sentences".format(len(self.source_store)))
 
         # Calculate the size of dataset.
-        self.dataset_length = len(self.sentences_source)
+        self.dataset_length = len(self.source_store)
 
         # Display exemplary sample.
-        self.logger.info("Exemplary sample:\n  source: {}\n  target: {}".format(self.sentences_source[0], self.sentences_target[0]))
+        self.logger.info("Exemplary sample:\n  source: {}\n  target: {}".format(self.source_store[0], self.target_store[0]))
         
 
     def output_data_definitions(self):
@@ -196,6 +201,15 @@ class TranslationPairs(Task):
         return self.dataset_length
 
 
+    def get_sample_lengths(self):
+        """
+        Returns lengths of all samples.
+
+        :return: Array of numbers of words in source sentences.
+        """
+        return np.diff(self.source_store.offsets)
+
+
     def __getitem__(self, index):
         """
         Getter method to access the dataset and return a sample.
@@ -208,8 +222,8 @@ class TranslationPairs(Task):
         """
         # Return data_streams.
         data_streams = self.create_data_streams(index)
-        data_streams[self.key_sources] = self.sentences_source[index]
-        data_streams[self.key_targets] = self.sentences_target[index]
+        data_streams[self.key_sources] = self.source_store[index]
+        data_streams[self.key_targets] = self.target_store[index]
         return data_streams
 
     def collate_fn(self, batch):
@@ -15,10 +15,12 @@
 __author__ = "Tomasz Kornuta"
 
 import os
+import numpy as np
 
 from nltk.tokenize import WhitespaceTokenizer
 
 import ptp.components.mixins.io as io
+from ptp.components.mixins.token_store import TokenStore
 from ptp.configuration import ConfigurationError
 from ptp.components.tasks.task import Task
 from ptp.data_types.data_definition import DataDefinition
@@ -44,7 +46,8 @@ class WikiTextLanguageModeling(Task):
         The init method downloads the required files, loads the file associated with a given subset (train/valid/test), 
         concatenates all sencentes and tokenizes them using NLTK's WhitespaceTokenizer.
 
-        It also stores the intermediate results, so for example, it file with tokenized set is found, it simply loads it.
+        It also stores the intermediate results: tokens are encoded with a vocabulary and saved in a token store \
+        (:py:class:`ptp.components.mixins.token_store.TokenStore`), so if the store is found, it simply memory-maps it.
 
         :param name: Name of the component.
 
@@ -72,60 +75,70 @@ class WikiTextLanguageModeling(Task):
             raise ConfigurationError("Task supports three 'subset' options: 'train', 'valid', 'test' ")
         subset = self.config['subset']
 
-        # Check if file with tokenized words exists.
+        # Name of the token store with encoded tokens.
+        token_store_name = "wiki."+self.config['subset']+".token_store"
+        # Name of the file with tokenized words (created by the previous versions of the task).
         filename_tokenized_words = "wiki."+self.config['subset']+".tokenized_words"
 
-        if not io.check_files_existence(self.data_folder, filename_tokenized_words):
+        if not TokenStore.exists(self.data_folder, token_store_name):
             # If not, we must generate (and save it) using source files.
 
-            # Names of files used by this task.
-            filenames = ["wiki.train.tokens", "wiki.valid.tokens", "wiki.test.tokens"]
-
-            # Initialize dataset if files do not exist.
-            if not io.check_files_existence(self.data_folder, filenames):
-                # Set url and source filename depending on dataset.
-                if dataset == "wikitext-2":
-                    url = "https://s3.amazonaws.com/research.metamind.io/wikitext/wikitext-2-v1.zip"
-                    zipfile_name = "wikitext-2-v1.zip"
-                else: 
-                    url = "https://s3.amazonaws.com/research.metamind.io/wikitext/wikitext-103-v1.zip"
-                    zipfile_name = "wikitext-103-v1.zip"
-
-                # Download and extract wikitext zip.
-                io.download_extract_zip_file(self.logger, self.data_folder, url, zipfile_name)
-
-                # Move extracted files to the right folder.
-                io.move_files_between_dirs(self.logger, os.path.join(self.data_folder, dataset) , self.data_folder, filenames)
+            if io.check_files_existence(self.data_folder, filename_tokenized_words):
+                # Ok, file with tokens exists, load it.
+                tokens = io.load_string_list_from_txt_file(self.data_folder, filename_tokenized_words)
+                self.logger.info("Load text consisting of {} tokens from '{}'".format(len(tokens), filename_tokenized_words))
             else:
-                self.logger.info("Files {} found in folder '{}'".format(filenames, self.data_folder))
-
-
-            # Load the whole sentences.
-            sentences = io.load_string_list_from_txt_file(self.data_folder, "wiki."+subset+".tokens")
-            self.logger.info("Loaded {} sentences from the 'wiki.{}.tokens' subset".format(len(sentences), subset))
-
-            # Generate text full of tokens.
-            self.logger.info("Please wait, using NLTK to tokenize the loaded sentences...")
-            # Create a single text by replacing newlines with <eos> tokens.
-            text = " <eos> ".join(sentences)
-            # Tokenize.
-            tokenizer = WhitespaceTokenizer()
-            self.tokens = tokenizer.tokenize(text)
-            # Save fo file.
-            io.save_string_list_to_txt_file(self.data_folder, filename_tokenized_words, self.tokens)
-            self.logger.info("Created text consisting of {} tokens and saved it to '{}'".format(len(self.tokens), filename_tokenized_words))
-        else:
-            # Ok, file with tokens exists, load it.
-            self.tokens = io.load_string_list_from_txt_file(self.data_folder, filename_tokenized_words)
-            self.logger.info("Load text consisting of {} tokens from '{}'".format(len(self.tokens), filename_tokenized_words))
+                # Names of files used by this task.
+                filenames = ["wiki.train.tokens", "wiki.valid.tokens", "wiki.test.tokens"]
+
+                # Initialize dataset if files do not exist.
+                if not io.check_files_existence(self.data_folder, filenames):
+                    # Set url and source filename depending on dataset.
+                    if dataset == "wikitext-2":
+                        url = "https://s3.amazonaws.com/research.metamind.io/wikitext/wikitext-2-v1.zip"
+                        zipfile_name = "wikitext-2-v1.zip"
+                    else: 
+                        url = "https://s3.amazonaws.com/research.metamind.io/wikitext/wikitext-103-v1.zip"
+                        zipfile_name = "wikitext-103-v1.zip"
+
+                    # Download and extract wikitext zip.
+                    io.download_extract_zip_file(self.logger, self.data_folder, url, zipfile_name)
+
+                    # Move extracted files to the right folder.
+                    io.move_files_between_dirs(self.logger, os.path.join(self.data_folder, dataset) , self.data_folder, filenames)
+                else:
+                    self.logger.info("Files {} found in folder '{}'".format(filenames, self.data_folder))
+
+                # Load the whole sentences.
+                sentences = io.load_string_list_from_txt_file(self.data_folder, "wiki."+subset+".tokens")
+                self.logger.info("Loaded {} sentences from the 'wiki.{}.tokens' subset".format(len(sentences), subset))
+
+                # Generate text full of tokens.
+                self.logger.info("Please wait, using NLTK to tokenize the loaded sentences...")
+                # Create a single text by replacing newlines with <eos> tokens.
+                text = " <eos> ".join(sentences)
+                # Tokenize.
+                tokenizer = WhitespaceTokenizer()
+                tokens = tokenizer.tokenize(text)
+
+            # Encode tokens as a single sequence and save the store.
+            TokenStore.from_sequences([tokens]).save(self.data_folder, token_store_name)
+            self.logger.info("Created text consisting of {} tokens and saved it to '{}'".format(len(tokens), token_store_name))
+            del tokens
+
+        # Open (memory-mapped) token store.
+        self.token_store = TokenStore.load(self.data_folder, token_store_name)
+        self.logger.info("Load text consisting of {} tokens ({} unique) from '{}'".format(
+            self.token_store.sequence_length(0), len(self.token_store.vocabulary), token_store_name))
 
         # Get the required sample length.
         self.sentence_length = self.config['sentence_length']
         # Calculate the size of dataset.
-        self.dataset_length = len(self.tokens) - self.sentence_length - 1 # as target is "shifted" by 1.
+        self.dataset_length = self.token_store.sequence_length(0) - self.sentence_length - 1 # as target is "shifted" by 1.
 
         # Display exemplary sample.
-        self.logger.info("Exemplary sample:\n  source: {}\n  target: {}".format(self.tokens[0:self.sentence_length], self.tokens[1:self.sentence_length+1]))
+        sample = self.get_words(0)
+        self.logger.info("Exemplary sample:\n  source: {}\n  target: {}".format(sample[:-1], sample[1:]))
         
 
     def output_data_definitions(self):
@@ -150,6 +163,28 @@ class WikiTextLanguageModeling(Task):
         return self.dataset_length
 
 
+    def get_sample_lengths(self):
+        """
+        Returns lengths of all samples (all consist of sentence_length words).
+
+        :return: Array of lengths.
+        """
+        return np.full(self.dataset_length, self.sentence_length)
+
+
+    def get_words(self, index):
+        """
+        Decodes words of the sample, i.e. sentence_length + 1 consecutive tokens (as target is "shifted" by 1).
+
+        :param index: index of the sample.
+
+        :return: List of words.
+        """
+        # Slice of the memory-mapped array - without a copy.
+        ids = self.token_store.get_ids(0)[index:index+self.sentence_length+1]
+        return self.token_store.decode(ids)
+
+
     def __getitem__(self, index):
         """
         Getter method to access the dataset and return a sample.
@@ -162,11 +197,28 @@ class WikiTextLanguageModeling(Task):
         """
         # Return data_streams.
         data_streams = self.create_data_streams(index)
-        data_streams[self.key_sources] = self.tokens[index:index+self.sentence_length]
-        data_streams[self.key_targets] = self.tokens[index+1:index+self.sentence_length+1] # target is "shifted" by 1.
+        words = self.get_words(index)
+        data_streams[self.key_sources] = words[:-1]
+        data_streams[self.key_targets] = words[1:] # target is "shifted" by 1.
         #print("task: index = {} source = {} target = {}".format(index, data_streams[self.key_sources], data_streams[self.key_targets]))
         return data_streams
 
+    def __getitems__(self, indices):
+        """
+        Batch-level access path: gathers token ids of all samples from the token store at once and decodes them.
+
+        :param indices: List of indices of samples.
+
+        :return: DataStreams containing the batch (the same as the one returned by :py:func:`collate_fn`).
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        # Windows of sentence_length + 1 consecutive tokens [BATCH_SIZE x SENTENCE_LENGTH + 1].
+        ids = self.token_store.get_ids(0)[indices[:, np.newaxis] + np.arange(self.sentence_length + 1)]
+        data_streams = self.create_data_streams(indices.tolist())
+        data_streams[self.key_sources] = self.token_store.decode_batch(ids[:, :-1])
+        data_streams[self.key_targets] = self.token_store.decode_batch(ids[:, 1:]) # target is "shifted" by 1.
+        return data_streams
+
     def collate_fn(self, batch):
         """
         Generates a batch of samples from a list of individuals samples retrieved by :py:func:`__getitem__`.
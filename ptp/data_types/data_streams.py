@@ -31,6 +31,8 @@ class DataStreams(collections.abc.MutableMapping):
 
     **This is the main object class used to share data between all components through a worker, starting from task to loss and visualization.**
     """
+    # Streams are stored in __dict__, the slots hold the state of device transfers.
+    __slots__ = ('__dict__', '__weakref__', '_device', '_on_device', '_transferred_bytes')
 
     def __init__(self, *args, **kwargs):
         """
@@ -45,6 +47,18 @@ class DataStreams(collections.abc.MutableMapping):
         :param kwargs: Used to pass a keyworded, variable-length argument list.
         """
         self.__dict__.update(*args, **kwargs)
+        # Reset the state of device transfers.
+        self._reset_device_state()
+
+
+    def _reset_device_state(self):
+        """
+        Resets the state of device transfers: device, set of keys of streams already moved to it \
+        and number of transferred bytes.
+        """
+        self._device = None
+        self._on_device = set()
+        self._transferred_bytes = 0
 
 
     def __setitem__(self, key, value, addkey=False):
@@ -69,6 +83,8 @@ class DataStreams(collections.abc.MutableMapping):
             raise KeyError(msg)
         else:
             self.__dict__[key] = value
+            # New value might reside on a different device.
+            self._on_device.discard(key)
 
 
     def publish(self, dict_to_add):
@@ -103,6 +119,8 @@ class DataStreams(collections.abc.MutableMapping):
         # Remove.
         for key in rem_keys:
             self.__delitem__(key, delkey=True)
+        # Count the transfers of the reused streams anew (the left ones remain on device).
+        self._transferred_bytes = 0
 
 
     def __getitem__(self, key):
@@ -137,6 +155,7 @@ class DataStreams(collections.abc.MutableMapping):
             raise KeyError(msg)
         else:
             del self.__dict__[key]
+            self._on_device.discard(key)
 
     def __iter__(self):
         return iter(self.__dict__)
@@ -161,7 +180,7 @@ class DataStreams(collections.abc.MutableMapping):
 
     def to(self, device=None, keys_to_move=None, non_blocking=False):
         """
-        Moves object(s) to device
+        Moves object(s) to device.
 
         .. note::
 
@@ -170,18 +189,46 @@ class DataStreams(collections.abc.MutableMapping):
             If an element of `self` is not a ``torch.tensor``, it is returned as is, \
             i.e. We only move the ``torch.tensor`` (s) contained in `self`. \
 
+        Keys of streams that were already moved to the device are remembered, so subsequent calls skip them \
+        (until their values are modified).
 
         :param device: The destination GPU device. Defaults to the current CUDA device.
         :type device: torch.device
 
+        :param keys_to_move: List of keys of streams to be moved (DEFAULT: None, meaning all streams).
+
         :param non_blocking: If True and the source is in pinned memory, the copy will be asynchronous with respect to \
         the host. Otherwise, the argument has no effect. Default: ``False``.
         :type non_blocking: bool
 
+        :return: Number of bytes transferred by the call.
+        """
+        # Forget the moved streams when the device has changed.
+        if device != self._device:
+            self._device = device
+            self._on_device = set()
+
+        transferred_bytes = 0
+        for key in (list(self.keys()) if keys_to_move is None else keys_to_move):
+            if key in self._on_device or key not in self:
+                continue
+            value = self[key]
+            if isinstance(value, torch.Tensor):
+                moved_value = value.to(device=device, non_blocking=non_blocking)
+                # Count only tensors that were actually copied.
+                if moved_value is not value:
+                    transferred_bytes += value.element_size() * value.nelement()
+                    self[key] = moved_value
+            self._on_device.add(key)
+
+        self._transferred_bytes += transferred_bytes
+        return transferred_bytes
+
+
+    @property
+    def transferred_bytes(self):
+        """
+        Returns the number of bytes transferred to device(s) by all calls of :py:func:`to` \
+        (since creation or the last call of :py:func:`reinitialize`).
         """
-        for key in self:
-            if isinstance(self[key], torch.Tensor):# and (not self[key].is_cuda):
-                # Skip keys that are not in the keys_to_move list (if it was passed).
-                if keys_to_move is not None and key not in keys_to_move:
-                    continue
-                self[key] = self[key].to(device=device)#, non_blocking=non_blocking)
\ No newline at end of file
+        return self._transferred_bytes
@@ -2,11 +2,14 @@ from .app_state import AppState
 from .data_streams_parallel import DataStreamsParallel
 from .globals_facade import GlobalsFacade
 from .key_mappings_facade import KeyMappingsFacade
+from .pipeline_profiler import PipelineProfiler
 from .samplers import kFoldRandomSampler
 from .samplers import kFoldWeightedRandomSampler
+from .samplers import BucketBatchSampler
 from .singleton import SingletonMetaClass
 from .statistics_aggregator import StatisticsAggregator
 from .statistics_collector import StatisticsCollector
+from .statistics_writer import StatisticsWriter
 from .termination_condition import TerminationCondition
 
 
@@ -15,10 +18,13 @@ __all__ = [
     'DataStreamsParallel',
     'GlobalsFacade',
     'KeyMappingsFacade',
+    'PipelineProfiler',
     'kFoldRandomSampler',
     'kFoldWeightedRandomSampler',
+    'BucketBatchSampler',
     'SingletonMetaClass',
     'StatisticsAggregator',
     'StatisticsCollector',    
+    'StatisticsWriter',
     'TerminationCondition',
     ]
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import time
+import torch
+
+from ptp.utils.app_state import AppState
+
+
+class PipelineProfiler(object):
+    """
+    Class responsible for measuring the execution of the components of a pipeline.
+
+    For every (phase, priority, component) triplet it records:
+        - number of calls,
+        - wall time (in seconds),
+        - CPU time of the process (in seconds),
+        - tensor memory (in bytes).
+
+    When computations are performed on GPU the memory is the peak CUDA allocation during the call ("peak_memory"), \
+    otherwise it is the size of tensors published by the component in DataStreams ("published_memory").
+
+    Measurements are accumulated separately for the current episode (exported as rows to csv file) \
+    and for the whole run (used to create the final summary).
+    """
+
+    # Columns of the csv file (followed by the label of the measured memory).
+    csv_header = ["episode", "epoch", "phase", "priority", "component", "type", "calls", "wall_time", "cpu_time"]
+
+    def __init__(self):
+        """
+        Initializes the profiler - creates empty dictionaries with measurements.
+        """
+        # Get access to AppState: episode, epoch and device.
+        self.app_state = AppState()
+
+        # Output csv file.
+        self.csv_file = None
+
+        # Measurements collected during the current episode.
+        self.episode_measurements = {}
+        # Episode and epoch of the stored measurements.
+        self.episode = None
+        self.epoch = None
+
+        # Measurements accumulated during the whole run.
+        self.total_measurements = {}
+
+
+    def measure(self, phase, priority, component, data_streams=None):
+        """
+        Returns context manager measuring a single call of a given component.
+
+            >>> with profiler.measure("forward", prio, comp, data_streams):
+            >>>     comp(data_streams)
+
+        :param phase: Name of the measured phase (e.g. "forward", "backward", "statistics").
+        :type phase: str
+
+        :param priority: Priority of the component in the pipeline.
+
+        :param component: Measured component.
+
+        :param data_streams: DataStreams processed by the component (used for estimation of memory on CPU, optional)
+
+        :return: :py:class:`ComponentMeasurement` object.
+        """
+        return ComponentMeasurement(self, phase, priority, component, data_streams)
+
+
+    def measures_cuda_memory(self):
+        """
+        Checks whether the peak CUDA allocation is measured (otherwise the size of the published tensors is).
+        """
+        return self.app_state.use_gpu and torch.cuda.is_available()
+
+
+    def memory_label(self):
+        """
+        Returns name of the measured memory, used in the csv header.
+        """
+        return "peak_memory" if self.measures_cuda_memory() else "published_memory"
+
+
+    def add_measurement(self, phase, priority, component, wall_time, cpu_time, memory):
+        """
+        Adds a single measurement to the episode and total measurements.
+
+        :param phase: Name of the measured phase.
+
+        :param priority: Priority of the component.
+
+        :param component: Measured component.
+
+        :param wall_time: Measured wall time (in seconds).
+
+        :param cpu_time: Measured CPU time (in seconds).
+
+        :param memory: Measured tensor memory (in bytes).
+        """
+        # Export measurements from the previous episode when a new one has started.
+        if self.episode != self.app_state.episode or self.epoch != self.app_state.epoch:
+            self.export_to_csv()
+            self.episode = self.app_state.episode
+            self.epoch = self.app_state.epoch
+
+        # Get the name of the (possibly wrapped) component.
+        module = component.module if type(component).__name__ == "DataStreamsParallel" else component
+        key = (phase, priority, module.name, type(module).__name__)
+
+        for measurements in [self.episode_measurements, self.total_measurements]:
+            # Measurements: calls, wall time, cpu time, (maximal) memory.
+            values = measurements.setdefault(key, [0, 0.0, 0.0, 0])
+            values[0] += 1
+            values[1] += wall_time
+            values[2] += cpu_time
+            values[3] = max(values[3], memory)
+
+
+    def initialize_csv_file(self, log_dir, filename):
+        """
+        Creates a new `csv` file and initializes it with a header.
+
+        :param log_dir: Path to file.
+        :type log_dir: str
+
+        :param filename: Filename to be created.
+        :type filename: str
+
+        :return: File stream opened for writing.
+        """
+        self.csv_file = open(log_dir + filename, 'w', 1)
+        self.csv_file.write(",".join(self.csv_header + [self.memory_label()]) + '\n')
+        return self.csv_file
+
+
+    def export_to_csv(self):
+        """
+        Writes measurements collected during the current episode to csv file (one row per component and phase) \
+        and empties them.
+        """
+        if self.csv_file is not None:
+            for (phase, priority, name, type_name), (calls, wall_time, cpu_time, memory) in self.episode_measurements.items():
+                self.csv_file.write("{},{},{},{},{},{},{},{:.6f},{:.6f},{}\n".format(
+                    self.episode, self.epoch if self.epoch is not None else '',
+                    phase, priority, name, type_name, calls, wall_time, cpu_time, memory))
+        self.episode_measurements = {}
+
+
+    def export_to_string(self):
+        """
+        Creates the summary table, with phases of components ranked by the total wall time.
+
+        :return: Summary as a str.
+        """
+        total_wall_time = sum(values[1] for values in self.total_measurements.values())
+        # Rank by wall time.
+        ranking = sorted(self.total_measurements.items(), key=lambda item: item[1][1], reverse=True)
+
+        summary_str  = 'Summary of the pipeline profiling (Mem: {}):\n'.format(
+            "peak CUDA allocation" if self.measures_cuda_memory() else "size of tensors published in DataStreams")
+        summary_str += '='*110 + '\n'
+        summary_str += '{:>4}  {:<30} {:>8} {:<10} {:>8} {:>12} {:>12} {:>12} {:>10} {:>7}\n'.format(
+            "Rank", "Component (Type)", "Priority", "Phase", "Calls", "Wall [s]", "Mean [ms]", "CPU [s]", "Mem [MB]", "Share")
+        summary_str += '='*110 + '\n'
+        for rank, ((phase, priority, name, type_name), (calls, wall_time, cpu_time, memory)) in enumerate(ranking):
+            summary_str += '{:>4}  {:<30} {:>8} {:<10} {:>8} {:>12.4f} {:>12.4f} {:>12.4f} {:>10.2f} {:>6.1f}%\n'.format(
+                rank+1, "{} ({})".format(name, type_name)[:30], priority, phase, calls, wall_time,
+                1000.0 * wall_time / calls, cpu_time, memory / 2**20,
+                100.0 * wall_time / total_wall_time if total_wall_time > 0 else 0.0)
+        summary_str += '='*110 + '\n'
+        return summary_str
+
+
+    def finalize(self):
+        """
+        Exports the remaining measurements and closes the csv file.
+        """
+        self.export_to_csv()
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.csv_file = None
+
+
+class ComponentMeasurement(object):
+    """
+    Context manager measuring a single call of a component.
+    """
+
+    def __init__(self, profiler, phase, priority, component, data_streams):
+        """
+        Stores the measurement settings.
+
+        :param profiler: :py:class:`PipelineProfiler` that will store the results.
+        """
+        self.profiler = profiler
+        self.phase = phase
+        self.priority = priority
+        self.component = component
+        self.data_streams = data_streams
+        # Measure peak allocation on GPU.
+        self.use_cuda = profiler.measures_cuda_memory()
+
+
+    def __enter__(self):
+        """
+        Starts the measurement.
+        """
+        if self.use_cuda:
+            torch.cuda.synchronize()
+            torch.cuda.reset_peak_memory_stats()
+            self.start_memory = torch.cuda.memory_allocated()
+        elif self.data_streams is not None:
+            self.start_keys = set(self.data_streams.keys())
+        self.start_wall_time = time.perf_counter()
+        self.start_cpu_time = time.process_time()
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Finishes the measurement and passes the results to the profiler.
+        """
+        # Do not store measurements of failed calls.
+        if exc_type is not None:
+            return False
+
+        if self.use_cuda:
+            torch.cuda.synchronize()
+        wall_time = time.perf_counter() - self.start_wall_time
+        cpu_time = time.process_time() - self.start_cpu_time
+
+        if self.use_cuda:
+            memory = torch.cuda.max_memory_allocated() - self.start_memory
+        elif self.data_streams is not None:
+            # Size of the tensors published by the component.
+            memory = sum(self.data_streams[key].element_size() * self.data_streams[key].nelement()
+                for key in self.data_streams.keys() if key not in self.start_keys and isinstance(self.data_streams[key], torch.Tensor))
+        else:
+            memory = 0
+
+        self.profiler.add_measurement(self.phase, self.priority, self.component, wall_time, cpu_time, memory)
+        return False
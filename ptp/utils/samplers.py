@@ -19,9 +19,9 @@ __author__ = "Tomasz Kornuta"
 
 from math import ceil
 
+import numpy as np
 import torch
-from torch._six import int_classes as _int_classes
-from torch.utils.data.sampler import Sampler
+from torch.utils.data.sampler import Sampler, BatchSampler
 
 class kFoldRandomSampler(Sampler):
     """
@@ -48,20 +48,20 @@ class kFoldRandomSampler(Sampler):
             When False, generates indices for only one fold (for validation)
         """
         # Get number of samples (size of "whole dataset").
-        if not isinstance(num_samples, _int_classes) or isinstance(num_samples, bool) or \
+        if not isinstance(num_samples, int) or isinstance(num_samples, bool) or \
                 num_samples <= 0:
             raise ValueError("num_samples should be a positive integeral "
                              "value, but got num_samples={}".format(num_samples))
         self.num_samples = num_samples
 
         # Get number of folds.
-        if not isinstance(num_folds, _int_classes) or isinstance(num_samples, bool) or \
+        if not isinstance(num_folds, int) or isinstance(num_samples, bool) or \
                 num_folds <= 0:
             raise ValueError("num_folds should be a positive integeral "
                              "value, but got num_folds={}".format(num_folds))
 
         # Get number epochs per fold.
-        if not isinstance(epochs_per_fold, _int_classes) or isinstance(epochs_per_fold, bool) or \
+        if not isinstance(epochs_per_fold, int) or isinstance(epochs_per_fold, bool) or \
                 epochs_per_fold <= 0:
             raise ValueError("epochs_per_fold should be a positive integeral "
                              "value, but got num_folds={}".format(epochs_per_fold))
@@ -202,3 +202,128 @@ class kFoldWeightedRandomSampler(kFoldRandomSampler):
         
         # Return indices sampled with multinomial distribution.
         return (self.indices[i] for i in torch.multinomial(weights, len(self.indices), self.replacement).tolist())
+
+
+class BucketBatchSampler(BatchSampler):
+    """
+    Generates batches of samples of similar lengths (e.g. numbers of words in sentences), \
+    what minimizes padding of sequences in batches.
+
+    Lengths are divided into buckets (containing similar numbers of samples) on the basis of their quantiles. \
+    In every epoch indices are drawn from the base sampler (e.g. random or k-fold), so samples are shuffled within buckets, \
+    then grouped by buckets and split into batches, which are finally returned in random order.
+
+    Batches contain either a fixed number of samples (batch size) or, when ``max_tokens`` is set, \
+    as many samples as fit into the budget of tokens, i.e. the length of the longest sample times number of samples.
+    """
+
+    def __init__(self, sampler, lengths, batch_size, num_buckets = 10, drop_last = False, max_tokens = None):
+        """
+        Initializes the sampler by assigning samples to buckets.
+
+        :param sampler: Base sampler (e.g. ``RandomSampler`` or :py:class:`kFoldRandomSampler`).
+
+        :param lengths: Lengths of all samples of the dataset.
+
+        :param batch_size: Size of batch (ignored when ``max_tokens`` is set).
+
+        :param num_buckets: Number of buckets (DEFAULT: 10)
+
+        :param drop_last: If ``True``, the last incomplete batch will be dropped (DEFAULT: False)
+
+        :param max_tokens: Budget of tokens (padded) in a single batch (DEFAULT: None, meaning batches of a fixed size)
+        """
+        if max_tokens is None:
+            super().__init__(sampler, batch_size, drop_last)
+        else:
+            if not isinstance(max_tokens, int) or isinstance(max_tokens, bool) or \
+                    max_tokens <= 0:
+                raise ValueError("max_tokens should be a positive integeral "
+                                 "value, but got max_tokens={}".format(max_tokens))
+            if drop_last:
+                raise ValueError("drop_last cannot be used along with max_tokens")
+            self.sampler = sampler
+            self.batch_size = None
+            self.drop_last = False
+        self.max_tokens = max_tokens
+
+        if not isinstance(num_buckets, int) or isinstance(num_buckets, bool) or \
+                num_buckets <= 0:
+            raise ValueError("num_buckets should be a positive integeral "
+                             "value, but got num_buckets={}".format(num_buckets))
+        self.num_buckets = num_buckets
+
+        # Boundaries of buckets - quantiles of lengths.
+        self.lengths = np.asarray(lengths)
+        boundaries = np.unique(np.quantile(self.lengths, np.linspace(0, 1, num_buckets + 1)[1:-1]))
+        # Precompute bucket of every sample.
+        self.buckets = np.searchsorted(boundaries, self.lengths, side='right')
+
+        # Batches of the current epoch, i.e. the plan returned by the last call of __iter__.
+        self.batches = None
+        # Batches of the next epoch, generated in advance only in the budget mode - as the number of batches \
+        # depends on the samples drawn, it must be known before the first epoch starts.
+        self.next_batches = self.generate_batches() if max_tokens is not None else None
+
+
+    def generate_batches(self):
+        """
+        Generates batches of the next epoch.
+
+        :return: List of batches (lists of indices) in random order.
+        """
+        # Get (shuffled) indices from the base sampler.
+        indices = np.fromiter(iter(self.sampler), dtype=np.int64)
+        # Group indices by buckets, keeping their order within every bucket.
+        indices = indices[np.argsort(self.buckets[indices], kind='stable')]
+
+        # Split indices into batches.
+        if self.max_tokens is None:
+            batches = [indices[i:i+self.batch_size].tolist() for i in range(0, len(indices), self.batch_size)]
+            if self.drop_last and len(batches) > 0 and len(batches[-1]) < self.batch_size:
+                batches.pop()
+        else:
+            batches = []
+            first = 0
+            longest = 0
+            for i, length in enumerate(self.lengths[indices].tolist()):
+                longest = max(longest, length)
+                # Close the batch if the sample does not fit into the budget (batch contains at least one sample).
+                if i > first and longest * (i - first + 1) > self.max_tokens:
+                    batches.append(indices[first:i].tolist())
+                    first = i
+                    longest = length
+            if first < len(indices):
+                batches.append(indices[first:].tolist())
+
+        # Return batches in random order.
+        return [batches[i] for i in torch.randperm(len(batches)).tolist()]
+
+
+    def __iter__(self):
+        """
+        Returns batches (lists of indices) in random order.
+        """
+        if self.next_batches is not None:
+            self.batches = self.next_batches
+            self.next_batches = None
+        else:
+            self.batches = self.generate_batches()
+        return iter(self.batches)
+
+
+    def __len__(self):
+        """
+        Returns number of batches.
+
+        .. note::
+
+            In the budget mode (``max_tokens``) it is the number of batches of the current epoch \
+            (or of the first epoch, if it has not started yet). The number of batches of the next epoch \
+            will be known when it starts, as drawing samples from the base sampler (e.g. k-fold) changes its state.
+        """
+        if self.max_tokens is not None:
+            return len(self.batches if self.batches is not None else self.next_batches)
+        if self.drop_last:
+            return len(self.sampler) // self.batch_size
+        return ceil(len(self.sampler) / self.batch_size)
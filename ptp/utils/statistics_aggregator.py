@@ -145,39 +145,15 @@ class StatisticsAggregator(StatisticsCollector):
         return super().base_initialize_csv_file(log_dir, filename, self.aggregators.keys())
 
 
-    def export_to_csv(self, csv_file=None):
+    def last_value(self, key):
         """
-        This method writes the current statistical aggregators values to the `csv_file` using the associated formatting.
+        Returns the current value of a given statistical aggregator.
 
-        :param csv_file: File stream opened for writing, optional.
+        :param key: Name of the statistical aggregator.
 
+        :return: Value of the aggregator.
         """
-        # Try to use the remembered one.    
-        if csv_file is None:
-            csv_file = self.csv_file
-        # If it is still None - well, we cannot do anything more.
-        if csv_file is None:
-            return
-
-        values_str = ''
-
-        # Iterate through values and concatenate them.
-        for key, value in self.aggregators.items():
-            # If formatting is set to None - ignore this key.
-            if self.formatting.get(key) is not None:
-                # Get formatting - using '{}' as default.
-                format_str = self.formatting.get(key, '{}')
-
-                # Add value to string using formatting.
-                values_str += format_str.format(value) + ","
-
-        # Remove last coma.
-        if len(values_str) > 1:
-            values_str = values_str[:-1]
-        # Add last \n.
-        values_str = values_str + '\n'
-
-        csv_file.write(values_str)
+        return self.aggregators[key]
 
     def export_to_checkpoint(self):
         """
@@ -230,29 +206,3 @@ class StatisticsAggregator(StatisticsCollector):
         stat_str = stat_str + " " + additional_tag
 
         return stat_str
-
-    def export_to_tensorboard(self, tb_writer = None):
-        """
-        Method exports current statistical aggregators values to TensorBoard.
-
-        :param tb_writer: TensorBoard writer, optional
-        :type tb_writer: :py:class:`tensorboardX.SummaryWriter`
-
-        """
-        # Get episode number.
-        episode = self.aggregators['episode']
-
-        if tb_writer is None:
-            tb_writer = self.tb_writer
-        # If it is still None - well, we cannot do anything more.
-        if tb_writer is None:
-            return
-
-        # Iterate through keys and values and concatenate them.
-        for key, value in self.aggregators.items():
-            # Skip episode.
-            if key == 'episode':
-                continue
-            # If formatting is set to None - ignore this key.
-            if self.formatting.get(key) is not None:
-                tb_writer.add_scalar(key, value, episode)
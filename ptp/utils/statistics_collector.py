@@ -17,8 +17,12 @@
 
 __author__ = "Tomasz Kornuta & Vincent Marois"
 
+import math
+import numpy as np
 from collections.abc import Mapping
 
+from ptp.utils.statistics_column import StatisticsColumn
+
 
 class StatisticsCollector(Mapping):
     """
@@ -27,6 +31,14 @@ class StatisticsCollector(Mapping):
 
     Inherits :py:class:`collections.Mapping`, therefore it offers functionality close to a ``dict``.
 
+    Values of every statistics are stored in a :py:class:`ptp.utils.statistics_column.StatisticsColumn`, \
+    i.e. a NumPy array keeping also running aggregates (sum, sum of squares, min, max). \
+    Statistics can be additionally associated with weights (e.g. sizes of batches), \
+    in which case the collector keeps running weighted aggregates, so mean and standard deviation can be computed in O(1).
+
+    Components can also keep running sums of arbitrary arrays in the collector (e.g. confusion matrices), \
+    which are reset along with the statistics when the collector is emptied.
+
     """
 
     def __init__(self):
@@ -38,25 +50,76 @@ class StatisticsCollector(Mapping):
         # Set default "output streams" for none.
         self.tb_writer = None
         self.csv_file = None
+        # Asynchronous statistics writer - none by default.
+        self.writer = None
 
         self.statistics = dict()
         self.formatting = dict()
 
-    def add_statistics(self, key, formatting):
+        # Keys of weights associated with the statistics.
+        self.weights = dict()
+        # Running weighted aggregates: [number of rows, sum of weights, weighted mean, weighted sum of squared deviations].
+        self.weighted_sums = dict()
+        # Keys of the weighted statistics that must be updated when a given key is set.
+        self.weighted_dependents = dict()
+        # Running sums of arrays (None if nothing was added since emptying the collector).
+        self.running_sums = dict()
+
+    def add_statistics(self, key, formatting, weights=None):
         """
         Add a statistics to collector.
-        The value of associated to the key is of type ``list``.
+        The value of associated to the key is of type ``numpy.ndarray``.
 
         :param key: Key of the statistics.
         :type key: str
 
         :param formatting: Formatting that will be used when logging and exporting to CSV.
 
+        :param weights: Key of the statistics containing weights of values, used by :py:func:`mean` and :py:func:`std` (DEFAULT: None)
+        :type weights: str
+
         """
         self.formatting[key] = formatting
 
-        # instantiate associated value as a list.
-        self.statistics[key] = list()
+        # instantiate associated column.
+        self.statistics[key] = StatisticsColumn()
+
+        if weights is not None:
+            self.weights[key] = weights
+            self.weighted_sums[key] = [0, 0.0, 0.0, 0.0]
+            for dependency in [key, weights]:
+                self.weighted_dependents.setdefault(dependency, []).append(key)
+
+    def add_running_sum(self, key):
+        """
+        Add a running sum to collector (not exported, used by aggregators).
+
+        :param key: Key of the running sum.
+        :type key: str
+
+        """
+        self.running_sums[key] = None
+
+    def add_to_running_sum(self, key, value):
+        """
+        Adds value to the running sum associated with a given key.
+
+        :param key: Key of the running sum.
+        :param value: Value (e.g. NumPy array or tensor) to add.
+
+        """
+        current = self.running_sums[key]
+        self.running_sums[key] = value if current is None else current + value
+
+    def running_sum(self, key):
+        """
+        Returns the running sum associated with a given key.
+
+        :param key: Key of the running sum.
+
+        :return: Sum of values added since emptying the collector or None if nothing was added.
+        """
+        return self.running_sums[key]
 
     def __getitem__(self, key):
         """
@@ -65,21 +128,48 @@ class StatisticsCollector(Mapping):
         :param key: Key to value in parameters.
         :type key: str
 
-        :return: Statistics value list associated with given key.
+        :return: Array with statistics values associated with given key.
 
         """
-        return self.statistics[key]
+        return self.statistics[key].view()
 
     def __setitem__(self, key, value):
         """
-        Add value to the list of the statistic associated with a given key.
+        Add value to the column of the statistic associated with a given key.
 
         :param key: Key to value in parameters.
-        :param value: Statistics value to append to the list associated with given key.
+        :param value: Statistics value to append to the column associated with given key.
 
         """
         self.statistics[key].append(value)
 
+        # Update running weighted aggregates.
+        for weighted_key in self.weighted_dependents.get(key, ()):
+            self.update_weighted_sums(weighted_key)
+
+    def update_weighted_sums(self, key):
+        """
+        Updates the running weighted aggregates of a given statistics with rows having both value and weight \
+        (using the weighted version of Welford's method).
+
+        :param key: Key of the weighted statistics.
+        """
+        weights = self.statistics.get(self.weights[key])
+        if weights is None:
+            return
+        values = self.statistics[key]
+        sums = self.weighted_sums[key]
+        while sums[0] < min(values.length, weights.length):
+            value = float(values.values[sums[0]])
+            weight = float(weights.values[sums[0]])
+            sums[0] += 1
+            if weight == 0:
+                continue
+            sums[1] += weight
+            delta = value - sums[2]
+            sums[2] += delta * (weight / sums[1])
+            sums[3] += weight * delta * (value - sums[2])
+
     def __delitem__(self, key):
         """
         Delete the specified key.
@@ -107,17 +197,84 @@ class StatisticsCollector(Mapping):
         """
         if isinstance(other, self.__class__):
             # Check statistics and formatting.
-            return self.statistics == other.statistics and self.formatting == other.formatting
+            return self.statistics.keys() == other.statistics.keys() and \
+                all(np.array_equal(self[key], other[key]) for key in self.statistics.keys()) and \
+                self.formatting == other.formatting
         else:
             return False
 
     def empty(self):
         """
-        Empty the list associated to the keys of the current statistics collector.
+        Empty the columns associated to the keys of the current statistics collector.
 
         """
-        for key in self.statistics.keys():
-            del self.statistics[key][:]
+        for column in self.statistics.values():
+            column.clear()
+        for sums in self.weighted_sums.values():
+            sums[:] = [0, 0.0, 0.0, 0.0]
+        for key in self.running_sums:
+            self.running_sums[key] = None
+
+
+    def sum(self, key):
+        """
+        Returns sum of the values of a given statistics.
+
+        :param key: Key of the statistics.
+        """
+        return self.statistics[key].sum
+
+
+    def min(self, key):
+        """
+        Returns the minimal value of a given statistics (None if there are no values).
+
+        :param key: Key of the statistics.
+        """
+        return self.statistics[key].min
+
+
+    def max(self, key):
+        """
+        Returns the maximal value of a given statistics (None if there are no values).
+
+        :param key: Key of the statistics.
+        """
+        return self.statistics[key].max
+
+
+    def mean(self, key):
+        """
+        Returns mean of the values of a given statistics - weighted, if weights were associated with it.
+
+        :param key: Key of the statistics.
+        """
+        if key not in self.weights or self.weights[key] not in self.statistics:
+            return self.statistics[key].mean()
+        (_, weights, weighted_mean, _) = self.weighted_sums[key]
+        return weighted_mean if weights != 0 else 0.0
+
+
+    def std(self, key, unbiased=False, center=None):
+        """
+        Returns standard deviation of the values of a given statistics - weighted, if weights were associated with it.
+
+        :param key: Key of the statistics.
+
+        :param unbiased: If True, computes the unbiased estimate (used only for statistics without weights, DEFAULT: False)
+
+        :param center: Value around which the deviation is computed (DEFAULT: None, meaning the (weighted) mean). \
+        When set, the (biased) root of the mean squared deviation from that value is returned.
+        """
+        if center is not None:
+            # Mean squared deviation from the center = variance + squared distance between the mean and the center.
+            return math.sqrt(self.std(key) ** 2 + (self.mean(key) - center) ** 2)
+        if key not in self.weights or self.weights[key] not in self.statistics:
+            return self.statistics[key].std(unbiased)
+        (_, weights, _, weighted_m2) = self.weighted_sums[key]
+        if weights == 0:
+            return 0.0
+        return math.sqrt(max(weighted_m2 / weights, 0.0))
 
 
     def base_initialize_csv_file(self, log_dir, filename, keys):
@@ -174,10 +331,35 @@ class StatisticsCollector(Mapping):
         return self.base_initialize_csv_file(log_dir, filename, self.statistics.keys())
 
 
+    def last_value(self, key):
+        """
+        Returns the last collected value of a given statistics.
+
+        :param key: Key of the statistics.
+
+        :return: Last value or None if no value was collected yet.
+        """
+        column = self.statistics[key]
+        return column.values[column.length-1] if column.length > 0 else None
+
+
+    def snapshot(self):
+        """
+        Creates an immutable snapshot of the current (i.e. last) values of the exported statistics.
+
+        :return: Tuple of (key, formatting, value) triplets, for all statistics with formatting set.
+        """
+        return tuple((key, self.formatting.get(key, '{}'), self.last_value(key))
+            for key in self if self.formatting.get(key) is not None)
+
+
     def export_to_csv(self, csv_file=None):
         """
         Method writes current statistics to csv using the possessed formatting.
 
+        When the statistics writer is set, only the snapshot is created, whereas formatting and writing \
+        are performed by the writer thread.
+
         :param csv_file: File stream opened for writing, optional
 
         """
@@ -188,26 +370,10 @@ class StatisticsCollector(Mapping):
         if csv_file is None:
             return
 
-        # Iterate through values and concatenate them.
-        values_str = ''
-        for key, value in self.statistics.items():
-            # If formatting is set to None - ignore this key.
-            if self.formatting.get(key) is not None:
-                # Get formatting - using '{}' as default.
-                format_str = self.formatting.get(key, '{}')
-
-                # Add value to string using formatting.
-                if len(value) > 0:
-                    values_str += format_str.format(value[-1])
-                values_str += ","
-
-        # Remove last coma.
-        if len(values_str) > 1:
-            values_str = values_str[:-1]
-        # Add last \n.
-        values_str = values_str + '\n'
-
-        csv_file.write(values_str)
+        if self.writer is None:
+            write_csv_row(csv_file, self.snapshot())
+        else:
+            self.writer.submit(write_csv_row, csv_file, self.snapshot())
 
     def export_to_checkpoint(self):
         """
@@ -217,15 +383,15 @@ class StatisticsCollector(Mapping):
         chkpt = {}
 
         # Iterate through key, values and format them.
-        for key, value in self.statistics.items():
+        for key in self.statistics.keys():
             # If formatting is set to None - ignore this key.
             if self.formatting.get(key) is not None:
                 # Get formatting - using '{}' as default.
                 format_str = self.formatting.get(key, '{}')
 
                 # Add to dict.
-                if len(value) > 0:
-                    chkpt[key]  = format_str.format(value[-1])
+                if self.statistics[key].length > 0:
+                    chkpt[key]  = format_str.format(self.last_value(key))
 
         return chkpt
 
@@ -243,15 +409,15 @@ class StatisticsCollector(Mapping):
         """
         # Iterate through keys and values and concatenate them.
         stat_str = ''
-        for key, value in self.statistics.items():
+        for key in self.statistics.keys():
             # If formatting is set to None - ignore this key.
             if self.formatting.get(key) is not None:
                 stat_str += key + ' '
                 # Get formatting - using '{}' as default.
                 format_str = self.formatting.get(key, '{}')
                 # Add value to string using formatting.
-                if len(value) > 0:
-                    stat_str += format_str.format(value[-1])
+                if self.statistics[key].length > 0:
+                    stat_str += format_str.format(self.last_value(key))
                 stat_str += "; "
 
         # Remove last two elements.
@@ -269,6 +435,14 @@ class StatisticsCollector(Mapping):
         """ 
         self.tb_writer = tb_writer
 
+    def initialize_writer(self, writer):
+        """
+        Memorizes the (asynchronous) statistics writer that will be used for exporting statistics to csv and TensorBoard.
+
+        :param writer: :py:class:`ptp.utils.StatisticsWriter` object.
+        """
+        self.writer = writer
+
     def export_to_tensorboard(self, tb_writer=None):
         """
         Method exports current statistics to tensorboard.
@@ -278,7 +452,7 @@ class StatisticsCollector(Mapping):
 
         """
         # Get episode number.
-        episode = self.statistics['episode'][-1]
+        episode = self.last_value('episode')
 
         if tb_writer is None:
             tb_writer = self.tb_writer
@@ -286,11 +460,38 @@ class StatisticsCollector(Mapping):
         if tb_writer is None:
             return
 
-        # Iterate through keys and values and concatenate them.
-        for key, value in self.statistics.items():
-            # Skip episode.
-            if key == 'episode':
-                continue
-            # If formatting is set to None - ignore this key.
-            if self.formatting.get(key) is not None:
-                tb_writer.add_scalar(key, value[-1], episode)
+        if self.writer is None:
+            write_scalars(tb_writer, self.snapshot(), episode)
+        else:
+            self.writer.submit(write_scalars, tb_writer, self.snapshot(), episode)
+
+
+def write_csv_row(csv_file, snapshot):
+    """
+    Formats the snapshot of statistics and writes it as a row to csv file.
+
+    :param csv_file: File stream opened for writing.
+
+    :param snapshot: Tuple of (key, formatting, value) triplets.
+    """
+    # Format values - empty string if there is no value.
+    values_str = ",".join(format_str.format(value) if value is not None else '' for (_, format_str, value) in snapshot)
+    csv_file.write(values_str + '\n')
+
+
+def write_scalars(tb_writer, snapshot, episode):
+    """
+    Exports the snapshot of statistics to TensorBoard.
+
+    :param tb_writer: TensorBoard writer.
+    :type tb_writer: :py:class:`tensorboardX.SummaryWriter`
+
+    :param snapshot: Tuple of (key, formatting, value) triplets.
+
+    :param episode: Episode number.
+    """
+    for (key, _, value) in snapshot:
+        # Skip episode and empty statistics.
+        if key == 'episode' or value is None:
+            continue
+        tb_writer.add_scalar(key, value, episode)
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import numbers
+import numpy as np
+
+
+class StatisticsColumn(object):
+    """
+    Column storing values of a single statistics collected during an epoch.
+
+    Values are stored in a NumPy array that grows geometrically. Type of the array depends on the values:
+    integers are stored as int64, other real numbers as float64 and everything else as objects.
+
+    For numerical values the column keeps running sum, min, max and sum of squared deviations from the mean \
+    (updated with Welford's method, which is numerically stable), so basic aggregates are available in O(1). \
+    When the array is promoted to objects (e.g. by appending a non-numerical value), the aggregates are computed \
+    from the collected values instead.
+    """
+
+    # Initial capacity of the array.
+    initial_capacity = 64
+
+    def __init__(self):
+        """
+        Initializes an empty column.
+        """
+        self.clear()
+
+
+    def clear(self):
+        """
+        Removes all values and resets the running aggregates.
+        """
+        # Array will be allocated on the first append (with the type adequate to the value).
+        self.values = None
+        self.length = 0
+        self._sum = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._min = None
+        self._max = None
+
+
+    @staticmethod
+    def get_dtype(value):
+        """
+        Returns type of the array able to store a given value.
+        """
+        if isinstance(value, (bool, np.bool_)):
+            return np.dtype(object)
+        if isinstance(value, numbers.Integral):
+            return np.dtype(np.int64)
+        if isinstance(value, numbers.Real):
+            return np.dtype(np.float64)
+        return np.dtype(object)
+
+
+    def append(self, value):
+        """
+        Appends value to the column, updating the running aggregates.
+
+        :param value: Value to be appended.
+        """
+        dtype = self.get_dtype(value)
+        if self.values is None:
+            self.values = np.empty(self.initial_capacity, dtype=dtype)
+        else:
+            # Promote the type of the array if required (e.g. int -> float).
+            if dtype != self.values.dtype:
+                promoted = np.dtype(object) if object in (dtype, self.values.dtype) else np.promote_types(dtype, self.values.dtype)
+                if promoted != self.values.dtype:
+                    self.values = self.values.astype(promoted)
+            # Grow the array.
+            if self.length == len(self.values):
+                values = np.empty(2 * len(self.values), dtype=self.values.dtype)
+                values[:self.length] = self.values[:self.length]
+                self.values = values
+
+        self.values[self.length] = value
+        self.length += 1
+
+        # Update running aggregates of numerical values (using Python numbers to avoid overflows).
+        if self.values.dtype != object:
+            value = int(value) if self.values.dtype == np.int64 else float(value)
+            self._sum += value
+            # Welford's method: update the mean and the sum of squared deviations from it.
+            delta = value - self._mean
+            self._mean += delta / self.length
+            self._m2 += delta * (value - self._mean)
+            self._min = value if self._min is None or value < self._min else self._min
+            self._max = value if self._max is None or value > self._max else self._max
+
+
+    def has_running_aggregates(self):
+        """
+        Checks whether the running aggregates are valid (i.e. values were not promoted to objects).
+        """
+        return self.values is None or self.values.dtype != object
+
+
+    @property
+    def sum(self):
+        """
+        Returns sum of the collected values.
+        """
+        if self.has_running_aggregates():
+            return self._sum
+        return self.view().sum()
+
+
+    @property
+    def min(self):
+        """
+        Returns the minimal value (None if the column is empty).
+        """
+        if self.has_running_aggregates():
+            return self._min
+        return min(self.view()) if self.length > 0 else None
+
+
+    @property
+    def max(self):
+        """
+        Returns the maximal value (None if the column is empty).
+        """
+        if self.has_running_aggregates():
+            return self._max
+        return max(self.view()) if self.length > 0 else None
+
+
+    def view(self):
+        """
+        Returns the collected values.
+
+        :return: NumPy array (view of the underlying storage).
+        """
+        if self.values is None:
+            return np.empty(0)
+        return self.values[:self.length]
+
+
+    def mean(self):
+        """
+        Returns mean of the collected values (0 if the column is empty).
+        """
+        if self.length == 0:
+            return 0.0
+        if self.has_running_aggregates():
+            return self._sum / self.length
+        return float(np.mean(self.view().astype(np.float64)))
+
+
+    def std(self, unbiased=False):
+        """
+        Returns standard deviation of the collected values.
+
+        :param unbiased: If True, computes the unbiased estimate (DEFAULT: False)
+        """
+        count = self.length - 1 if unbiased else self.length
+        if count <= 0:
+            return 0.0
+        if self.has_running_aggregates():
+            return (self._m2 / count) ** 0.5
+        return float(np.std(self.view().astype(np.float64), ddof=self.length - count))
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import queue
+import threading
+
+
+class StatisticsWriter(object):
+    """
+    Background thread responsible for exporting the statistics (formatting, writing to csv files, \
+    exporting scalars and histograms to TensorBoard) outside of the main training/processing loop.
+
+    Records (i.e. functions with their arguments operating on immutable snapshots of statistics) \
+    are passed through a bounded queue. When the queue is full the record is dropped and counted.
+    Records submitted with a key (e.g. large snapshots of parameters) are exclusive - at most one record \
+    with a given key can wait in the queue or be processed at once.
+    """
+
+    def __init__(self, logger, max_queue_size = 1000):
+        """
+        Initializes the writer and starts the thread.
+
+        :param logger: Logger used for reporting errors and dropped records.
+
+        :param max_queue_size: Maximum number of records waiting in the queue (DEFAULT: 1000).
+        :type max_queue_size: int
+        """
+        self.logger = logger
+        self.max_queue_size = max_queue_size
+        self.queue = queue.Queue(maxsize=max_queue_size)
+
+        # Counters.
+        self.processed_records = 0
+        self.dropped_records = 0
+        self.skipped_records = 0
+        self.max_queue_depth = 0
+
+        # Keys of the exclusive records that are queued or being processed.
+        self.pending_keys = set()
+        self.pending_lock = threading.Lock()
+
+        # Start the thread.
+        self.thread = threading.Thread(target=self.__run, name="StatisticsWriter", daemon=True)
+        self.thread.start()
+
+
+    def submit(self, function, *args):
+        """
+        Adds record to the queue, without blocking the caller.
+
+        :param function: Function that will be called in the writer thread.
+
+        :param args: Arguments of the function (snapshots of data, must not be modified afterwards).
+
+        :return: True if the record was queued, False if it was dropped.
+        """
+        return self.put((function, args, None))
+
+
+    def submit_exclusive(self, key, function, create_args):
+        """
+        Adds record to the queue, unless a record with the same key is still pending (then it is skipped and counted).
+
+        :param key: Key of the record.
+
+        :param function: Function that will be called in the writer thread.
+
+        :param create_args: Function returning tuple of arguments of the function, called only when the record \
+        is submitted (so snapshots of data are not created for the skipped records).
+
+        :return: True if the record was queued, False if it was skipped or dropped.
+        """
+        with self.pending_lock:
+            if key in self.pending_keys:
+                self.skipped_records += 1
+                return False
+            self.pending_keys.add(key)
+        if not self.put((function, create_args(), key)):
+            self.release(key)
+            return False
+        return True
+
+
+    def release(self, key):
+        """
+        Marks the exclusive record with a given key as processed.
+
+        :param key: Key of the record (None for regular records).
+        """
+        if key is not None:
+            with self.pending_lock:
+                self.pending_keys.discard(key)
+
+
+    def put(self, record):
+        """
+        Puts record (function, args, key) to the queue, without blocking the caller.
+
+        :return: True if the record was queued, False if it was dropped.
+        """
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if self.dropped_records == 0:
+                self.logger.warning("Queue of the statistics writer is full, dropping records")
+            self.dropped_records += 1
+            return False
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+        return True
+
+
+    @property
+    def queue_depth(self):
+        """
+        Returns the current number of records waiting in the queue.
+        """
+        return self.queue.qsize()
+
+
+    def __run(self):
+        """
+        Main loop of the thread: processes records until it receives the termination marker (None).
+        """
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            (function, args, key) = record
+            try:
+                function(*args)
+            except Exception as e:
+                self.logger.error("Statistics writer failed to process a record: {}".format(e))
+            self.release(key)
+            self.processed_records += 1
+
+
+    def finalize(self):
+        """
+        Processes all remaining records and stops the thread.
+        """
+        if self.thread.is_alive():
+            # Wait until there is place for the termination marker.
+            self.queue.put(None)
+            self.thread.join()
+
+
+    def export_to_string(self):
+        """
+        Returns summary of the operation of the writer.
+
+        :return: Summary as a str.
+        """
+        return "Statistics writer processed {} records (maximal queue depth: {}/{}, dropped records: {}, skipped records: {})".format(
+            self.processed_records, self.max_queue_depth, self.max_queue_size, self.dropped_records, self.skipped_records)
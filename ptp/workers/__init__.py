@@ -3,11 +3,13 @@ from .trainer import Trainer
 #from .offline_trainer import OfflineTrainer
 from .online_trainer import OnlineTrainer
 from .processor import Processor
+from .feature_extractor import FeatureExtractor
 
 __all__ = [
     'Worker',
     'Trainer',
     #'OfflineTrainer',
     'OnlineTrainer',
-    'Processor'
+    'Processor',
+    'FeatureExtractor'
     ]
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import torch
+
+from ptp.workers.processor import Processor
+from ptp.components.mixins.feature_store import FeatureStoreWriter, calculate_config_hash
+
+
+class FeatureExtractor(Processor):
+    """
+    Worker running a (frozen) image encoder once over all samples of a task and writing the resulting features \
+    to a feature store, indexed by image ids.
+
+    The features can be next streamed in place of images by the :py:class:`ptp.components.tasks.FeatureStoreTask` \
+    wrapper, so training pipelines can skip the encoder.
+    """
+
+    def __init__(self):
+        """
+        Calls the ``Processor`` constructor.
+        """
+        # Call base constructor to set up app state, registry and add default params.
+        super(FeatureExtractor, self).__init__("FeatureExtractor", FeatureExtractor)
+
+
+    def run_experiment(self):
+        """
+        Main function of the ``FeatureExtractor``: runs the pipeline over the whole set and writes the features.
+        """
+        config_store = self.config['feature_store']
+
+        # Get the configuration of the encoder.
+        encoder_name = config_store['encoder']
+        if encoder_name not in self.config_pipeline:
+            self.logger.error("Pipeline does not contain the encoder '{}'".format(encoder_name))
+            exit(-1)
+        config_hash = calculate_config_hash(self.config_pipeline[encoder_name])
+
+        # Get name of the store.
+        store_name = config_store['name']
+        if store_name == '':
+            store_name = "{}_{}".format(self.config_pipeline['name'], self.tsn)
+        pooled = config_store['pooled']
+
+        # Create the store.
+        writer = FeatureStoreWriter(config_store['folder'], store_name, config_hash, config_store['type'])
+        self.logger.info("Extracting features from stream '{}' to store '{}'".format(config_store['features'], writer.data_file))
+
+        # Encode every image only once - iterate over the first samples of all images.
+        image_ids = self.pm.task.get_image_ids()
+        if image_ids is not None:
+            first_samples = {}
+            for index, image_id in enumerate(image_ids):
+                first_samples.setdefault(image_id, index)
+            self.pm.set_sampler(sorted(first_samples.values()))
+            self.logger.info("Encoding {} unique images of {} samples".format(len(first_samples), len(image_ids)))
+        else:
+            self.logger.warning("Task does not return ids of images of all samples, images shared by samples might be encoded several times")
+
+        try:
+            # Run in no_grad mode.
+            with torch.no_grad():
+                self.app_state.episode = -1
+                self.pm.initialize_epoch()
+
+                complete = True
+                for batch in self.pm.iterate():
+                    self.app_state.episode += 1
+                    # Terminal condition 0: max episodes reached.
+                    if self.app_state.episode == self.config_test["terminal_conditions"]["episode_limit"]:
+                        complete = False
+                        break
+
+                    # Skip the batch if features of all its images are already stored.
+                    if all(image_id in writer for image_id in batch[config_store['image_ids']]):
+                        continue
+
+                    # Forward pass.
+                    self.pipeline.forward(batch)
+
+                    # Get features - optionally pooled.
+                    features = batch[config_store['features']]
+                    if pooled and features.dim() > 2:
+                        features = features.view(features.size(0), features.size(1), -1).mean(dim=2)
+                    writer.append(batch[config_store['image_ids']], features)
+
+                    # Log progress - at logging frequency.
+                    if self.app_state.episode % self.app_state.args.logging_interval == 0:
+                        self.logger.info("Episode {:06d}: stored features of {} images".format(self.app_state.episode, len(writer)))
+
+                self.pm.finalize_epoch()
+
+            # Write the metadata - only when the whole set was processed.
+            if complete:
+                writer.close()
+                self.logger.info("Stored features of {} images (shape: {}) in '{}'".format(len(writer), writer.shape, writer.data_file))
+            else:
+                writer.discard()
+                self.logger.warning("Episode limit reached before processing the whole set, the incomplete store was discarded")
+
+        except SystemExit as e:
+            self.logger.error('Experiment interrupted because {}'.format(e))
+        except KeyboardInterrupt:
+            self.logger.error('Experiment interrupted!')
+        finally:
+            self.logger.info("Experiment logged to: {}".format(self.app_state.log_dir))
+
+
+def main():
+    """
+    Entry point function for the ``FeatureExtractor``.
+
+    """
+    extractor = FeatureExtractor()
+    # parse args, load configuration and create all required objects.
+    extractor.setup_global_experiment()
+    # finalize the experiment setup
+    extractor.setup_individual_experiment()
+    # run the experiment
+    extractor.run_experiment()
+
+if __name__ == '__main__':
+    main()
@@ -179,7 +179,7 @@ class OfflineTrainer(Trainer):
                 ############################################################################################
                 # Beginning of internal "episodic loop".
                 ############################################################################################
-                for training_batch in self.training.dataloader:
+                for training_batch in self.training.iterate():
                     # Next episode.
                     self.app_state.episode += 1
 
@@ -219,25 +219,8 @@ class OfflineTrainer(Trainer):
                             (self.app_state.episode % self.app_state.args.logging_interval == 0):
                         self.training_stat_col.export_to_tensorboard()
 
-                        # Export histograms.
-                        if self.app_state.args.tensorboard >= 1:
-                            for name, param in self.pipeline.named_parameters():
-                                try:
-                                    self.training_batch_writer.add_histogram(name, 
-                                        param.data.cpu().numpy(), self.app_state.episode, bins='doane')
-
-                                except Exception as e:
-                                    self.logger.error("  {} :: data :: {}".format(name, e))
-
-                        # Export gradients.
-                        if self.app_state.args.tensorboard >= 2:
-                            for name, param in self.pipeline.named_parameters():
-                                try:
-                                    self.training_batch_writer.add_histogram(name + '/grad', 
-                                        param.grad.data.cpu().numpy(), self.app_state.episode, bins='doane')
-
-                                except Exception as e:
-                                    self.logger.error("  {} :: grad :: {}".format(name, e))
+                        # Export histograms of parameters and gradients.
+                        self.export_histograms()
 
                     # 5.3. Log to logger - at logging frequency.
                     if self.app_state.episode % self.app_state.args.logging_interval == 0:
@@ -245,8 +228,8 @@ class OfflineTrainer(Trainer):
 
                     #  6. Validate and (optionally) save the model.
                     if self.partial_validation_interval > 0 and (self.app_state.episode % self.partial_validation_interval) == 0:
-                        # Clear the validation batch from all items aside of the ones originally returned by the task.
-                        self.validation.batch.reinitialize(self.validation.task.output_data_definitions())
+                        # Clear the validation batch from all items aside of the ones returned by the task (and loader-side components).
+                        self.validation.batch.reinitialize(self.validation.output_data_definitions())
                         # Perform validation.
                         self.validate_on_batch(self.validation.batch)
                         # Do not save the model: OfflineTrainer uses the full set to determine whether to save or not.
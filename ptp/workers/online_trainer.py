@@ -181,7 +181,7 @@ class OnlineTrainer(Trainer):
                 ############################################################################################
                 # Beginning of internal "episodic loop".
                 ############################################################################################
-                for training_batch in self.training.dataloader:
+                for training_batch in self.training.iterate():
                     # Next episode.
                     self.app_state.episode += 1
 
@@ -221,25 +221,8 @@ class OnlineTrainer(Trainer):
                             (self.app_state.episode % self.app_state.args.logging_interval == 0):
                         self.training_stat_col.export_to_tensorboard()
 
-                        # Export histograms.
-                        if self.app_state.args.tensorboard >= 1:
-                            for name, param in self.pipeline.named_parameters():
-                                try:
-                                    self.training_batch_writer.add_histogram(name, 
-                                        param.data.cpu().numpy(), self.app_state.episode, bins='doane')
-
-                                except Exception as e:
-                                    self.logger.error("  {} :: data :: {}".format(name, e))
-
-                        # Export gradients.
-                        if self.app_state.args.tensorboard >= 2:
-                            for name, param in self.pipeline.named_parameters():
-                                try:
-                                    self.training_batch_writer.add_histogram(name + '/grad', 
-                                        param.grad.data.cpu().numpy(), self.app_state.episode, bins='doane')
-
-                                except Exception as e:
-                                    self.logger.error("  {} :: grad :: {}".format(name, e))
+                        # Export histograms of parameters and gradients.
+                        self.export_histograms()
 
                     # 5.3. Log to logger - at logging frequency.
                     if self.app_state.episode % self.app_state.args.logging_interval == 0:
@@ -248,8 +231,8 @@ class OnlineTrainer(Trainer):
                     #  6. Validate and (optionally) save the model.
                     if (self.app_state.episode % self.partial_validation_interval) == 0:
 
-                        # Clear the validation batch from all items aside of the ones originally returned by the task.
-                        self.validation.batch.reinitialize(self.validation.task.output_data_definitions())
+                        # Clear the validation batch from all items aside of the ones returned by the task (and loader-side components).
+                        self.validation.batch.reinitialize(self.validation.output_data_definitions())
                         # Perform validation.
                         self.validate_on_batch(self.validation.batch)
                         # Get loss.
@@ -317,8 +300,8 @@ class OnlineTrainer(Trainer):
             if self.validation_stat_col["episode"][-1] != self.app_state.episode:
                 # We still must validate and try to save the model as it may performed better during this episode.
 
-                # Clear the validation batch from all items aside of the ones originally returned by the task.
-                self.validation.batch.reinitialize(self.validation.task.output_data_definitions())
+                # Clear the validation batch from all items aside of the ones returned by the task (and loader-side components).
+                self.validation.batch.reinitialize(self.validation.output_data_definitions())
                 # Perform validation.
                 self.validate_on_batch(self.validation.batch)
                 # Get loss.
@@ -32,6 +32,7 @@ from ptp.application.pipeline_manager import PipelineManager
 
 from ptp.utils.statistics_collector import StatisticsCollector
 from ptp.utils.statistics_aggregator import StatisticsAggregator
+from ptp.utils.statistics_writer import StatisticsWriter
 
 
 class Processor(Worker):
@@ -42,12 +43,17 @@ class Processor(Worker):
 
     """
 
-    def __init__(self):
+    def __init__(self, name="Processor", class_type=None):
         """
         Calls the ``Worker`` constructor, adds some additional arguments to parser.
+
+        :param name: Name of the worker (DEFAULT: Processor)
+        :type name: str
+
+        :param class_type: Class type of the worker (DEFAULT: None, meaning ``Processor``)
         """ 
         # Call base constructor to set up app state, registry and add default params.
-        super(Processor, self).__init__("Processor", Processor)
+        super(Processor, self).__init__(name, class_type if class_type is not None else Processor)
 
         self.parser.add_argument(
             '--section',
@@ -269,6 +275,9 @@ class Processor(Worker):
             self.logger.error('Found {} errors, terminating execution'.format(errors))
             exit(-2)
 
+        # Move the loader-side components to the data loader.
+        self.pm.set_loader_side_components(self.pipeline.loader_side_components())
+
         # Check if there are any models in the pipeline.
         if len(self.pipeline.models) == 0:
             self.logger.error('Cannot proceed with training, as there are no trainable models in the pipeline')
@@ -315,6 +324,8 @@ class Processor(Worker):
         # Move the models in the pipeline to GPU.
         if self.app_state.args.use_gpu:
             self.pipeline.cuda()
+            # Copy pinned batches asynchronously.
+            self.pipeline.non_blocking_transfer = self.config_test['dataloader']['pin_memory']
 
         # Turn on evaluation mode.
         self.pipeline.eval()
@@ -346,14 +357,34 @@ class Processor(Worker):
         # Will contain a single row with aggregated statistics.
         self.pm_set_stats_file = self.stat_agg.initialize_csv_file(self.app_state.log_dir, self.tsn+'_set_agg_statistics.csv')
 
+        # Export statistics in the background thread.
+        if self.config['statistics_writer']['asynchronous']:
+            self.statistics_writer = StatisticsWriter(self.logger, self.config['statistics_writer']['max_queue_size'])
+            self.stat_col.initialize_writer(self.statistics_writer)
+            self.stat_agg.initialize_writer(self.statistics_writer)
+        else:
+            self.statistics_writer = None
+
+        # Activate profiling.
+        if self.app_state.args.profile or self.config['profiling']['enabled']:
+            self.pipeline.initialize_profiling(self.app_state.log_dir, self.config['profiling']['filename'])
+
     def finalize_statistics_collection(self):
         """
         Finalizes statistics collection, closes all files etc.
         """
+        # Wait until all statistics are exported.
+        if self.statistics_writer is not None:
+            self.statistics_writer.finalize()
+            self.logger.info(self.statistics_writer.export_to_string())
+
         # Close all files.
         self.pm_batch_stats_file.close()
         self.pm_set_stats_file.close()
 
+        # Export the remaining profiling measurements and log the summary.
+        self.pipeline.finalize_profiling()
+
     def run_experiment(self):
         """
         Main function of the ``Processor``: Test the loaded model over the set.
@@ -384,7 +415,7 @@ class Processor(Worker):
                 # Inform the task manager that epoch has started.
                 self.pm.initialize_epoch()
 
-                for batch in self.pm.dataloader:
+                for batch in self.pm.iterate():
                     # Increment counter.
                     self.app_state.episode += 1
                     # Terminal condition 0: max test episodes reached.
@@ -33,6 +33,7 @@ from ptp.application.pipeline_manager import PipelineManager
 
 from ptp.utils.statistics_collector import StatisticsCollector
 from ptp.utils.statistics_aggregator import StatisticsAggregator
+from ptp.utils.statistics_writer import StatisticsWriter
 
 
 class Trainer(Worker):
@@ -315,6 +316,10 @@ class Trainer(Worker):
             self.logger.error('Found {} errors, terminating execution'.format(errors))
             exit(-2)
 
+        # Move the loader-side components to the data loaders.
+        self.training.set_loader_side_components(self.pipeline.loader_side_components())
+        self.validation.set_loader_side_components(self.pipeline.loader_side_components())
+
         ################## MODEL LOAD/FREEZE #################
 
         # Load the pretrained models params from checkpoint.
@@ -359,6 +364,9 @@ class Trainer(Worker):
         # Move the models in the pipeline to GPU.
         if self.app_state.args.use_gpu:
             self.pipeline.cuda()        
+            # Copy pinned batches asynchronously.
+            self.pipeline.non_blocking_transfer = self.config_training['dataloader']['pin_memory'] or \
+                self.config_validation['dataloader']['pin_memory']
 
         ################# OPTIMIZER ################# 
 
@@ -454,18 +462,38 @@ class Trainer(Worker):
         # Create the csv file to store the validation statistic aggregations.
         self.validation_set_stats_file = self.validation_stat_agg.initialize_csv_file(self.app_state.log_dir, 'validation_set_agg_statistics.csv')
 
+        # Export statistics in the background thread.
+        if self.config['statistics_writer']['asynchronous']:
+            self.statistics_writer = StatisticsWriter(self.logger, self.config['statistics_writer']['max_queue_size'])
+            for stat_obj in [self.training_stat_col, self.training_stat_agg, self.validation_stat_col, self.validation_stat_agg]:
+                stat_obj.initialize_writer(self.statistics_writer)
+        else:
+            self.statistics_writer = None
+
+        # PROFILING.
+        if self.app_state.args.profile or self.config['profiling']['enabled']:
+            self.pipeline.initialize_profiling(self.app_state.log_dir, self.config['profiling']['filename'])
+
 
     def finalize_statistics_collection(self):
         """
         Finalizes the statistics collection by closing the csv files.
 
         """
+        # Wait until all statistics are exported.
+        if self.statistics_writer is not None:
+            self.statistics_writer.finalize()
+            self.logger.info(self.statistics_writer.export_to_string())
+
         # Close all files.
         self.training_batch_stats_file.close()
         self.training_set_stats_file.close()
         self.validation_batch_stats_file.close()
         self.validation_set_stats_file.close()
 
+        # Export the remaining profiling measurements and log the summary.
+        self.pipeline.finalize_profiling()
+
 
     def initialize_tensorboard(self):
         """
@@ -492,6 +520,49 @@ class Trainer(Worker):
             self.validation_batch_writer = None
             self.validation_set_writer = None
 
+    def export_histograms(self):
+        """
+        Exports histograms of parameters (and gradients) of the models in the pipeline to TensorBoard, \
+        depending on the TensorBoard verbosity level.
+
+        When the statistics writer is used, only copies of the parameters are created, \
+        whereas histograms are computed by the writer thread. At most one snapshot is pending at once \
+        (while the writer is still processing the previous one, histograms of the current episode are skipped).
+        """
+        # Create snapshot of parameters and gradients.
+        snapshot = []
+        for name, param in self.pipeline.named_parameters():
+            if self.app_state.args.tensorboard >= 1:
+                snapshot.append((name, "data", param.data))
+            if self.app_state.args.tensorboard >= 2:
+                snapshot.append((name + '/grad', "grad", param.grad.data if param.grad is not None else None))
+
+        if self.statistics_writer is None:
+            self.write_histograms(snapshot, self.app_state.episode)
+        else:
+            episode = self.app_state.episode
+            def copy_snapshot():
+                # Copy the tensors, as they will be modified by the next optimization step.
+                return ([(name, kind, tensor.detach().clone() if tensor is not None else None) for (name, kind, tensor) in snapshot], episode)
+            self.statistics_writer.submit_exclusive("histograms", self.write_histograms, copy_snapshot)
+
+
+    def write_histograms(self, snapshot, episode):
+        """
+        Computes histograms and writes them to TensorBoard.
+
+        :param snapshot: List of (name, kind, tensor) triplets.
+
+        :param episode: Episode number.
+        """
+        for (name, kind, tensor) in snapshot:
+            try:
+                self.training_batch_writer.add_histogram(name, tensor.cpu().numpy(), episode, bins='doane')
+
+            except Exception as e:
+                self.logger.error("  {} :: {} :: {}".format(name, kind, e))
+
+
     def finalize_tensorboard(self):
         """ 
         Finalizes the operation of TensorBoard writers by closing them.
@@ -557,7 +628,7 @@ class Trainer(Worker):
         old_episode = self.app_state.episode
 
         with torch.no_grad():
-            for ep, valid_batch in enumerate(self.validation.dataloader):
+            for ep, valid_batch in enumerate(self.validation.iterate()):
 
                 self.app_state.episode = ep
                 # Forward pass.
@@ -147,6 +147,13 @@ class Worker(object):
                 help='Request user confirmation just after loading the settings, '
                     'before starting the experiment. (DEFAULT: False)')
 
+            self.parser.add_argument(
+                '--profile',
+                dest='profile',
+                action='store_true',
+                help='Activates profiling of the pipeline components (wall/CPU time, memory and number of calls). '
+                    'Measurements are exported to csv file and summarized at the end of the experiment. (DEFAULT: False)')
+
             self.parser.add_argument(
                 '--pipeline',
                 dest='pipeline_section_name',
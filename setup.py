@@ -127,7 +127,7 @@ setup(
 
         # Specify the Python versions you support here. In particular, ensure
         # that you indicate whether you support Python 2, Python 3 or both.
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.8',
 
         'Operating System :: Linux',
         'Topic :: Scientific/Engineering :: Artificial Intelligence'
@@ -154,7 +154,7 @@ setup(
     # Any package you put here will be installed by pip when your project is
     # installed, so they must be valid existing projects.
     #
-    python_requires='~=3.6',
+    python_requires='~=3.8',
     # For an analysis of "install_requires" vs pip's requirements files see:
     # https://packaging.python.org/en/latest/requirements.html
     # Should not pin down version
@@ -168,8 +168,9 @@ setup(
         'pandas',
         'pillow',
         'torchtext==0.3.1',
-        'torchvision==0.2.1',
-        'torch>=1.0.1',
+        'torchvision>=0.15',
+        # DataLoader calling __getitems__ (batch-level access of tasks) requires PyTorch 2.0.
+        'torch>=2.0',
         'PyYAML',
         'matplotlib',
         'requests'
@@ -216,6 +217,7 @@ setup(
              'ptp-online-trainer=ptp.workers.online_trainer:main',
              'ptp-offline-trainer=ptp.workers.offline_trainer:main',
              'ptp-processor=ptp.workers.processor:main',
+             'ptp-feature-extractor=ptp.workers.feature_extractor:main',
          ]
      },
 
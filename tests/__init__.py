@@ -1,11 +1,28 @@
 from .application.pipeline_tests import TestPipeline
 from .application.sampler_factory_tests import TestSamplerFactory
-from .application.samplers_tests import TestkFoldRandomSampler, TestkFoldWeightedRandomSampler
+from .application.samplers_tests import TestkFoldRandomSampler, TestkFoldWeightedRandomSampler, TestBucketBatchSampler
+from .application.task_manager_tests import TestTaskManager
 
 from .components.component_tests import TestComponent
+from .components.language.tokenize_index_tests import TestTokenizeIndex
+from .components.masking.join_masked_predictions_tests import TestJoinMaskedPredictions
+from .components.mixins.columnar_dataset_tests import TestColumnarDataset
+from .components.mixins.embeddings_tests import TestEmbeddings
+from .components.mixins.feature_store_tests import TestFeatureStore
+from .components.mixins.image_cache_tests import TestImageCache
+from .components.mixins.shared_samples_tests import TestSharedSamples
+from .components.mixins.token_store_tests import TestTokenStore
+from .components.models.attention_decoder_tests import TestAttentionDecoder
+from .components.models.compact_bilinear_pooling_tests import TestCompactBilinearPooling
+from .components.models.relational_network_tests import TestRelationalNetwork
+from .components.models.seq2seq_tests import TestSeq2Seq
+from .components.statistics.bleu_statistics_tests import TestBLEUStatistics
+from .components.statistics.precision_recall_statistics_tests import TestPrecisionRecallStatistics
+from .components.tasks.batch_access_tests import TestBatchAccess
 from .components.tasks.clevr_tests import TestCLEVR
 from .components.tasks.gqa_tests import TestGQA
 from .components.tasks.task_tests import TestTask
+from .components.tasks.vqa_med_2019_tests import TestVQAMED2019
 
 from .configuration.config_interface_tests import TestConfigInterface
 from .configuration.config_registry_tests import TestConfigRegistry
@@ -15,6 +32,7 @@ from .data_types.data_streams_tests import TestDataStreams
 from .data_types.data_definition_tests import TestDataDefinition
 
 from .utils.app_state_tests import TestAppState
+from .utils.pipeline_profiler_tests import TestPipelineProfiler
 from .utils.statistics_tests import TestStatistics
 
 __all__ = [
@@ -23,10 +41,28 @@ __all__ = [
     'TestSamplerFactory',
     'TestkFoldRandomSampler',
     'TestkFoldWeightedRandomSampler',
+    'TestBucketBatchSampler',
+    'TestTaskManager',
     # Components
     'TestComponent',
+    'TestTokenizeIndex',
+    'TestJoinMaskedPredictions',
+    'TestColumnarDataset',
+    'TestEmbeddings',
+    'TestFeatureStore',
+    'TestImageCache',
+    'TestSharedSamples',
+    'TestTokenStore',
+    'TestAttentionDecoder',
+    'TestCompactBilinearPooling',
+    'TestRelationalNetwork',
+    'TestSeq2Seq',
+    'TestBLEUStatistics',
+    'TestPrecisionRecallStatistics',
+    'TestBatchAccess',
     'TestGQA',
     'TestTask',
+    'TestVQAMED2019',
     # Configuration
     'TestConfigRegistry',
     'TestConfigInterface',
@@ -36,5 +72,6 @@ __all__ = [
     'TestDataDefinition',
     # Utils
     'TestAppState',
+    'TestPipelineProfiler',
     'TestStatistics',
     ]
@@ -18,11 +18,15 @@ __author__ = "Tomasz Kornuta"
 
 import unittest
 import os
+import torch
 
 from ptp.utils.app_state import AppState
 from ptp.configuration.config_interface import ConfigInterface
 from ptp.configuration.config_registry import ConfigRegistry
 from ptp.application.pipeline_manager import PipelineManager
+from ptp.application.task_manager import LoaderSideCollate
+from ptp.data_types.data_definition import DataDefinition
+from ptp.data_types.data_streams import DataStreams
 
 class TestPipeline(unittest.TestCase):
 
@@ -119,5 +123,97 @@ class TestPipeline(unittest.TestCase):
         self.assertEqual(pipe[1].name, 'bow_encoder2')
 
 
+    def test_forward_execution_plan(self):
+        """ Tests whether the execution plan compiled during handshake processes the data streams. """
+        # Instantiate.
+        ConfigRegistry()._clear_registry()
+        config = ConfigInterface()
+        config.add_config_params({
+            'bow_encoder' : 
+                {
+                    'type': 'BOWEncoder',
+                    'priority': 1.1,
+                    'streams': {'inputs': 'tokens', 'outputs': 'bow'}
+                }
+            })
+        pipe = PipelineManager('testpm', config)
+        pipe.build(False)
+
+        # Handshake - compiles the plan.
+        definitions = {'tokens': DataDefinition([-1, -1, 10], [list, list, torch.Tensor], "tokens")}
+        self.assertEqual(pipe.handshake(definitions, False), 0)
+
+        # Forward.
+        data_streams = DataStreams({'tokens': [[torch.ones(10), torch.ones(10)] for _ in range(3)]})
+        pipe.forward(data_streams)
+        self.assertEqual(data_streams['bow'].shape, torch.Size([3, 10]))
+        self.assertEqual(data_streams['bow'][0][0], 2)
+
+
+    def test_loader_side_components(self):
+        """ Tests whether loader-side components are skipped in forward and executed by the collate function. """
+        # Instantiate.
+        ConfigRegistry()._clear_registry()
+        config = ConfigInterface()
+        config.add_config_params({
+            'tokenizer' : 
+                {
+                    'type': 'SentenceTokenizer',
+                    'priority': 1.1,
+                    'loader_side': True,
+                    'streams': {'inputs': 'sentences', 'outputs': 'tokens'}
+                },
+            'detokenizer' : 
+                {
+                    'type': 'SentenceTokenizer',
+                    'priority': 1.2,
+                    'detokenize': True,
+                    'streams': {'inputs': 'tokens', 'outputs': 'joined'}
+                }
+            })
+        pipe = PipelineManager('testpm', config)
+        self.assertEqual(pipe.build(False), 0)
+        self.assertEqual([comp.name for comp in pipe.loader_side_components()], ['tokenizer'])
+
+        definitions = {'sentences': DataDefinition([-1, 1], [list, str], "sentences")}
+        self.assertEqual(pipe.handshake(definitions, False), 0)
+
+        # Tokenizer is executed by the collate function, not in forward.
+        collate_fn = LoaderSideCollate(lambda batch: DataStreams({'sentences': batch}), pipe.loader_side_components())
+        data_streams = collate_fn(["ala  ma kota", "a kot"])
+        self.assertEqual(data_streams['tokens'], [["ala", "ma", "kota"], ["a", "kot"]])
+        data_streams['tokens'] = [["x"], ["y", "z"]]
+        pipe.forward(data_streams)
+        self.assertEqual(data_streams['joined'], ["x", "y z"])
+
+
+    def test_loader_side_inputs(self):
+        """ Tests whether handshake detects loader-side components depending on outputs of the main process components. """
+        # Instantiate.
+        ConfigRegistry()._clear_registry()
+        config = ConfigInterface()
+        config.add_config_params({
+            'tokenizer' : 
+                {
+                    'type': 'SentenceTokenizer',
+                    'priority': 1.1,
+                    'streams': {'inputs': 'sentences', 'outputs': 'tokens'}
+                },
+            'detokenizer' : 
+                {
+                    'type': 'SentenceTokenizer',
+                    'priority': 1.2,
+                    'detokenize': True,
+                    'loader_side': True,
+                    'streams': {'inputs': 'tokens', 'outputs': 'joined'}
+                }
+            })
+        pipe = PipelineManager('testpm', config)
+        self.assertEqual(pipe.build(False), 0)
+
+        definitions = {'sentences': DataDefinition([-1, 1], [list, str], "sentences")}
+        self.assertEqual(pipe.handshake(definitions, False), 1)
+
+
 #if __name__ == "__main__":
 #    unittest.main()
\ No newline at end of file
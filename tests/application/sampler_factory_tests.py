@@ -29,6 +29,9 @@ class TestTaskMockup(object):
     def __len__(self):
         return 50
 
+    def get_sample_lengths(self):
+        return [i % 7 for i in range(50)]
+
 class TestSamplerFactory(unittest.TestCase):
 
     def __init__(self, *args, **kwargs):
@@ -93,5 +96,33 @@ class TestSamplerFactory(unittest.TestCase):
         # Check number of samples.
         self.assertEqual(len(sampler), 5)
 
+
+    def test_create_bucket_batch_sampler(self):
+        """ Tests whether BucketBatchSampler is created with a k-fold base sampler. """
+
+        config = ConfigInterface()
+        config.add_default_params({'type': 'BucketBatchSampler',
+                                'buckets': 3,
+                                'folds': 5})
+        # Create the sampler.
+        sampler = SamplerFactory.build(TestTaskMockup(), config, "validation", 4)
+
+        # Check number of batches and samples.
+        self.assertEqual(len(sampler), 3)
+        self.assertEqual(len(sampler.sampler), 10)
+        self.assertEqual(sampler.batch_size, 4)
+
+    def test_create_bucket_batch_sampler_max_tokens(self):
+        """ Tests whether BucketBatchSampler forms batches by the budget of tokens. """
+
+        config = ConfigInterface()
+        config.add_default_params({'type': 'BucketBatchSampler'})
+        # Create the sampler.
+        sampler = SamplerFactory.build(TestTaskMockup(), config, "training", 4, max_tokens=12)
+
+        for batch in sampler:
+            self.assertLessEqual(max(i % 7 for i in batch) * len(batch), 12)
+        self.assertEqual(sum(len(batch) for batch in sampler), len(sampler.sampler))
+
 #if __name__ == "__main__":
 #    unittest.main()
\ No newline at end of file
@@ -20,9 +20,10 @@ __author__ = "Tomasz Kornuta"
 import unittest
 import yaml
 import numpy as np
+from torch.utils.data.sampler import RandomSampler
 
 from ptp.configuration.config_interface import ConfigInterface
-from ptp.utils.samplers import kFoldRandomSampler, kFoldWeightedRandomSampler
+from ptp.utils.samplers import kFoldRandomSampler, kFoldWeightedRandomSampler, BucketBatchSampler
 
 class TestkFoldRandomSampler(unittest.TestCase):
 
@@ -166,5 +167,92 @@ class TestkFoldWeightedRandomSampler(unittest.TestCase):
             self.assertIn(ix, [4,7])
 
 
+class TestBucketBatchSampler(unittest.TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(TestBucketBatchSampler, self).__init__(*args, **kwargs)
+
+    def test_bucket_batch_sampler(self):
+        """ Tests whether batches contain samples of similar lengths and cover all samples. """
+        lengths = np.random.randint(1, 100, size=103)
+        sampler = BucketBatchSampler(RandomSampler(range(103)), lengths, 10, num_buckets=5)
+
+        batches = list(iter(sampler))
+        self.assertEqual(len(batches), len(sampler))
+        self.assertEqual(len(batches), 11)
+        # Check presence of all indices.
+        self.assertEqual(sorted(ix for batch in batches for ix in batch), list(range(103)))
+        # Batches are grouped by buckets, so the maximal padding is much smaller than for random batches.
+        padding = sum(max(lengths[batch]) * len(batch) - sum(lengths[batch]) for batch in batches)
+        random_padding = sum(max(lengths[batch]) * len(batch) - sum(lengths[batch]) for batch in np.array_split(np.random.permutation(103), 11))
+        self.assertLess(padding, random_padding)
+
+        # Drop last.
+        sampler = BucketBatchSampler(RandomSampler(range(103)), lengths, 10, num_buckets=5, drop_last=True)
+        batches = list(iter(sampler))
+        self.assertEqual(len(batches), 10)
+        for batch in batches:
+            self.assertEqual(len(batch), 10)
+
+
+    def test_bucket_batch_sampler_kfold(self):
+        """ Tests whether batches contain samples of the fold returned by the base k-fold sampler. """
+        lengths = np.arange(20)
+        sampler = BucketBatchSampler(kFoldRandomSampler(20, 3, all_but_current_fold=False), lengths, 3, num_buckets=2)
+
+        # Test zero-th fold.
+        batches = list(iter(sampler))
+        self.assertEqual(len(batches), 3)
+        self.assertEqual(sorted(ix for batch in batches for ix in batch), list(range(0,7)))
+
+        # Test first fold.
+        batches = list(iter(sampler))
+        self.assertEqual(sorted(ix for batch in batches for ix in batch), list(range(7,14)))
+
+        # Lengths equal to indices, with buckets [0,9] and [10,19] - batches never contain samples from both.
+        for batch in batches:
+            self.assertEqual(len(set(lengths[batch] >= 10)), 1)
+
+    def test_bucket_batch_sampler_max_tokens(self):
+        """ Tests whether batches are formed by the budget of tokens. """
+        lengths = np.random.randint(1, 30, size=200)
+        sampler = BucketBatchSampler(RandomSampler(range(200)), lengths, None, num_buckets=4, max_tokens=60)
+
+        # Number of batches is known before iterating.
+        num_batches = len(sampler)
+        batches = list(iter(sampler))
+        self.assertEqual(len(batches), num_batches)
+        # Check presence of all indices.
+        self.assertEqual(sorted(ix for batch in batches for ix in batch), list(range(200)))
+        # Check budget (padded tokens).
+        for batch in batches:
+            self.assertLessEqual(max(lengths[batch]) * len(batch), 60)
+        # Batches of short samples are bigger.
+        sizes = [len(batch) for batch in batches]
+        self.assertGreater(max(sizes), min(sizes))
+
+        # Sample longer than the budget forms a batch on its own.
+        sampler = BucketBatchSampler(RandomSampler(range(3)), [100, 1, 1], None, max_tokens=50)
+        self.assertEqual(sorted(len(batch) for batch in sampler), [1, 2])
+
+
+    def test_bucket_batch_sampler_max_tokens_length(self):
+        """ Tests whether number of batches refers to the current epoch and does not change the state of the base sampler. """
+        lengths = np.random.randint(1, 30, size=40)
+        sampler = BucketBatchSampler(kFoldRandomSampler(40, 2, all_but_current_fold=False), lengths, None, num_buckets=4, max_tokens=60)
+
+        for epoch in range(4):
+            iterator = iter(sampler)
+            num_batches = len(sampler)
+            batches = []
+            for batch in iterator:
+                # Number of batches does not change during the epoch.
+                self.assertEqual(len(sampler), num_batches)
+                batches.append(batch)
+            self.assertEqual(len(batches), num_batches)
+            # Asking for the number of batches does not move the base sampler to the next fold.
+            first = 20 * (epoch % 2)
+            self.assertEqual(sorted(ix for batch in batches for ix in batch), list(range(first, first + 20)))
+
 #if __name__ == "__main__":
 #    unittest.main()
\ No newline at end of file
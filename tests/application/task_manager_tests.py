@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import unittest
+
+import torch
+from torch.utils.data import Dataset
+from torch.utils.data.dataloader import default_collate
+
+from ptp.application.task_manager import TaskManager
+from ptp.configuration.config_interface import ConfigInterface
+
+
+# Task.
+class TestTaskMockup(Dataset):
+    def __len__(self):
+        return 10
+
+    def __getitem__(self, index):
+        return index
+
+
+class TestTaskManager(unittest.TestCase):
+
+    def create_manager(self, name, **dataloader_params):
+        """ Creates the manager (with the mockup task) and its data loader. """
+        params = {'shuffle': False, 'num_workers': 0, 'pin_memory': False, 'drop_last': False, 'timeout': 0}
+        params.update(dataloader_params)
+        config = ConfigInterface()
+        config.add_config_params({name: {'task': {'batch_size': 4}, 'dataloader': params}})
+        manager = TaskManager(name, config[name])
+        manager.task = TestTaskMockup()
+        manager.sampler = None
+        manager.create_dataloader(default_collate)
+        return manager
+
+
+    def test_iterate(self):
+        """ Tests whether iterate() returns all batches, also in consecutive iterations. """
+        manager = self.create_manager("tm_iterate")
+        for _ in range(2):
+            batches = [batch.tolist() for batch in manager.iterate()]
+            self.assertEqual(batches, [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
+
+
+    def test_dataloader_options(self):
+        """ Tests whether options of worker processes are passed to the data loader (only when workers are used). """
+        manager = self.create_manager("tm_options", num_workers=1, persistent_workers=True, prefetch_factor=3)
+        self.assertTrue(manager.dataloader.persistent_workers)
+        self.assertEqual(manager.dataloader.prefetch_factor, 3)
+
+        manager = self.create_manager("tm_options_no_workers", persistent_workers=True, prefetch_factor=3)
+        self.assertFalse(manager.dataloader.persistent_workers)
+        self.assertNotEqual(manager.dataloader.prefetch_factor, 3)
+
+
+    def test_next_batch(self):
+        """ Tests whether batches for partial validation are returned by a single iterator (restarted when exhausted). """
+        manager = self.create_manager("tm_next_batch", num_workers=1)
+        batches = [manager.next_batch().tolist()]
+        iterator = manager.batch_iterator
+        batches += [manager.next_batch().tolist() for _ in range(3)]
+        self.assertEqual(batches, [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9], [0, 1, 2, 3]])
+        # The iterator (and its worker) is kept between calls, a new one is created after exhausting it.
+        self.assertIsNot(manager.batch_iterator, iterator)
+        iterator = manager.batch_iterator
+        manager.next_batch()
+        self.assertIs(manager.batch_iterator, iterator)
+
+        # Persistent workers: consecutive batches are returned as well.
+        manager = self.create_manager("tm_next_batch_persistent", num_workers=1, persistent_workers=True)
+        self.assertEqual([manager.next_batch().tolist() for _ in range(2)], [[0, 1, 2, 3], [4, 5, 6, 7]])
+        # Iteration over the whole set resets the (single) persistent iterator, so a new pass is started.
+        self.assertEqual(len(list(manager.iterate())), 3)
+        self.assertEqual([manager.next_batch().tolist() for _ in range(2)], [[0, 1, 2, 3], [4, 5, 6, 7]])
+
+
+#if __name__ == "__main__":
+#    unittest.main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import logging
+import tempfile
+import unittest
+
+import torch
+
+from ptp.components.language.sentence_indexer import SentenceIndexer
+from ptp.components.language.sentence_tokenizer import SentenceTokenizer
+from ptp.components.language.tokenize_index import TokenizeIndex
+from ptp.components.mixins.word_mappings import save_word_mappings_to_csv_file
+from ptp.configuration.config_interface import ConfigInterface
+from ptp.data_types.data_streams import DataStreams
+
+
+class TestTokenizeIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        words = ["<PAD>", "what", "is", "the", "color", "of", "cube", "?", "What", "Is", "cube?", "-", "sphere", "big", "the-big", "thebig", "<EOS>"]
+        save_word_mappings_to_csv_file(logging.getLogger("test"), self.folder.name, "word_mappings.csv", {word: i for i, word in enumerate(words)})
+        self.sentences = ["What is the color of the cube?", "  what\tis the-big sphere  ", "", "What is the color of the cube?"]
+
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+
+    def encode(self, preprocessing, remove_characters, fixed_padding, eos_token):
+        """ Encodes sentences with the fused component and with the chain of tokenizer and indexer. """
+        params = {"data_folder": self.folder.name, "word_mappings_file": "word_mappings.csv", "fixed_padding": fixed_padding, "eos_token": eos_token}
+        config = ConfigInterface()
+        config.add_config_params({
+            "fused": dict(params, preprocessing=preprocessing, remove_characters=remove_characters, streams={"inputs": "sentences", "outputs": "fused"}),
+            "tokenizer": {"preprocessing": preprocessing, "remove_characters": remove_characters, "streams": {"inputs": "sentences", "outputs": "tokens"}},
+            "indexer": dict(params, streams={"inputs": "tokens", "outputs": "indices"}),
+            })
+        data_streams = DataStreams({"sentences": self.sentences})
+        TokenizeIndex("fused", config["fused"])(data_streams)
+        SentenceTokenizer("tokenizer", config["tokenizer"])(data_streams)
+        SentenceIndexer("indexer", config["indexer"])(data_streams)
+        return data_streams["fused"], data_streams["indices"]
+
+
+    def test_equivalence(self):
+        """ Tests whether outputs are equal to outputs of SentenceTokenizer followed by SentenceIndexer. """
+        for (preprocessing, remove_characters, fixed_padding, eos_token) in [
+                ("none", "", -1, False),
+                ("all", "", -1, False),
+                ("lowercase", "?", -1, False),
+                ("remove_punctuation", "-", 4, True),
+                ("lowercase", "?,-", 10, True),
+                ("none", "cube?,?", 3, False)
+            ]:
+            fused, indices = self.encode(preprocessing, remove_characters, fixed_padding, eos_token)
+            self.assertEqual(fused.dtype, torch.int64)
+            self.assertTrue(torch.equal(fused, indices))
+
+
+#if __name__ == "__main__":
+#    unittest.main()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import unittest
+
+import torch
+
+from ptp.components.masking.join_masked_predictions import JoinMaskedPredictions
+from ptp.configuration.config_interface import ConfigInterface
+from ptp.data_types.data_streams import DataStreams
+from ptp.utils.app_state import AppState
+
+
+class TestJoinMaskedPredictions(unittest.TestCase):
+
+    def setUp(self):
+        # Word mappings of two "categories" and output word mappings (in different order).
+        self.word_mappings = [{"yes": 0, "no": 1}, {"ct": 0, "mri": 1, "xr": 2, "us": 3}]
+        self.output_word_mappings = {"<PAD>": 0, "mri": 1, "no": 2, "yes": 3, "xr": 4, "ct": 5, "us": 6}
+        app_state = AppState()
+        app_state.__setitem__("jmp_yn_word_mappings", self.word_mappings[0], override=True)
+        app_state.__setitem__("jmp_c1_word_mappings", self.word_mappings[1], override=True)
+        self.join = self.create_component(self.output_word_mappings)
+
+
+    def create_component(self, output_word_mappings):
+        """ Creates the component with given output word mappings. """
+        AppState().__setitem__("jmp_output_word_mappings", output_word_mappings, override=True)
+        config = ConfigInterface()
+        config.add_config_params({"join": {
+            "input_prediction_streams": "yn_predictions, c1_predictions",
+            "input_mask_streams": "yn_masks, c1_masks",
+            "input_word_mappings": "jmp_yn_word_mappings, jmp_c1_word_mappings",
+            "globals": {"output_word_mappings": "jmp_output_word_mappings"}
+            }})
+        return JoinMaskedPredictions("join", config["join"])
+
+
+    def test_join(self):
+        """ Tests whether predictions are joined using masks, in the same way as by processing samples one by one. """
+        torch.manual_seed(0)
+        batch_size = 20
+        yn_masks = torch.randint(0, 2, (batch_size,))
+        data_streams = DataStreams({
+            "yn_predictions": torch.randn(batch_size, 2),
+            "c1_predictions": torch.randn(batch_size, 4),
+            "yn_masks": yn_masks,
+            "c1_masks": 1 - yn_masks
+            })
+        self.join(data_streams)
+        # Strings are not retrieved until accessed.
+        self.assertIsNone(data_streams["output_strings"].strings)
+        self.assertEqual(len(data_streams["output_strings"]), batch_size)
+
+        # Process samples one by one.
+        expected_strings = []
+        for sample in range(batch_size):
+            stream = 0 if yn_masks[sample] == 1 else 1
+            prediction = data_streams[["yn_predictions", "c1_predictions"][stream]][sample]
+            ix_to_word = {value: key for (key, value) in self.word_mappings[stream].items()}
+            expected_strings.append(ix_to_word[prediction.max(0)[1].item()])
+
+        self.assertEqual(data_streams["output_strings"], expected_strings)
+        self.assertEqual(data_streams["output_indices"].tolist(), [self.output_word_mappings[word] for word in expected_strings])
+
+
+    def test_missing_word(self):
+        """ Tests whether missing word in output word mappings is detected. """
+        join = self.create_component({word: ix for (word, ix) in self.output_word_mappings.items() if word != "us"})
+        data_streams = DataStreams({
+            "yn_predictions": torch.zeros(2, 2),
+            "c1_predictions": torch.tensor([[0.0, 0.0, 0.0, 1.0], [0.0, 1.0, 0.0, 0.0]]),
+            "yn_masks": torch.tensor([0, 0]),
+            "c1_masks": torch.tensor([1, 1])
+            })
+        with self.assertRaises(KeyError):
+            join(data_streams)
+
+
+#if __name__ == "__main__":
+#    unittest.main()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import io
+import os
+import json
+import pickle
+import tempfile
+import unittest
+
+from ptp.components.mixins.columnar_dataset import ColumnarDataset, ColumnarDatasetWriter, get_cache_folder
+from ptp.components.mixins.json_stream import iterate_json_array, iterate_json_object
+
+
+class TestColumnarDataset(unittest.TestCase):
+
+    def setUp(self):
+        self.questions = [
+            {"question_index": 0, "image_filename": "img_0.png", "question": "Is there a żółty cube?", "answer": "yes", "program": [{"inputs": []}]},
+            {"question_index": 1, "image_filename": "img_1.png", "question": "How many \"spheres\"?", "answer": "3", "question_family_index": 12},
+            {"question_index": 12345678901, "image_filename": "img_0.png", "question": "", "answer": "yes", "question_family_index": 0}
+            ]
+        self.columns = {"question_index": "int", "image_filename": "category", "question": "text", "answer": "category", "question_family_index": "int"}
+
+
+    def test_json_stream(self):
+        """ Tests incremental parsing of JSON documents, with chunks smaller than values. """
+        document = json.dumps({"info": {"split": "train", "values": [1, 2.5, None]}, "questions": self.questions, "last": 123}, indent=1)
+        for chunk_size in [1, 3, 7, 1024]:
+            self.assertEqual(list(iterate_json_array(io.StringIO(document), "questions", chunk_size)), self.questions)
+
+        document = json.dumps({str(i): question for i, question in enumerate(self.questions)})
+        for chunk_size in [1, 5, 1024]:
+            self.assertEqual(dict(iterate_json_object(io.StringIO(document), chunk_size)), json.loads(document))
+
+        # Empty containers.
+        self.assertEqual(list(iterate_json_array(io.StringIO('{"questions": []}'), "questions")), [])
+        self.assertEqual(list(iterate_json_object(io.StringIO(' { } '))), [])
+
+
+    def test_columnar_dataset(self):
+        """ Tests writing and reading records, with missing values and fields that are not stored. """
+        with tempfile.TemporaryDirectory() as folder:
+            self.assertFalse(ColumnarDataset.exists(folder))
+            writer = ColumnarDatasetWriter(folder, self.columns)
+            for question in self.questions:
+                writer.append(question)
+            writer.close()
+            self.assertTrue(ColumnarDataset.exists(folder))
+
+            dataset = ColumnarDataset(folder)
+            self.assertEqual(len(dataset), 3)
+            expected = [{key: value for key, value in question.items() if key in self.columns} for question in self.questions]
+            self.assertEqual(list(dataset), expected)
+            self.assertEqual(dataset[-1], expected[-1])
+            # Image ids are stored in a table of unique values.
+            self.assertEqual(dataset.column("image_filename").table, ["img_0.png", "img_1.png"])
+
+            # Dataset can be pickled (e.g. passed to DataLoader workers).
+            self.assertEqual(pickle.loads(pickle.dumps(dataset))[1], expected[1])
+
+
+    def test_cache_folder(self):
+        """ Tests whether the cache folder depends on the source files and columns. """
+        with tempfile.TemporaryDirectory() as folder:
+            source_file = os.path.join(folder, "questions.json")
+            with open(source_file, 'w') as f:
+                json.dump({"questions": self.questions}, f)
+            cache_folder = get_cache_folder(folder, "clevr", [source_file], self.columns)
+            self.assertEqual(cache_folder, get_cache_folder(folder, "clevr", [source_file], self.columns))
+            self.assertNotEqual(cache_folder, get_cache_folder(folder, "clevr", [source_file], {"question": "text"}))
+
+            # Modification of the file changes the folder.
+            with open(source_file, 'w') as f:
+                json.dump({"questions": self.questions[:1]}, f)
+            self.assertNotEqual(cache_folder, get_cache_folder(folder, "clevr", [source_file], self.columns))
+
+
+#if __name__ == "__main__":
+#    unittest.main()
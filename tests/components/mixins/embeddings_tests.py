@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import os
+import logging
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+import ptp.components.mixins.embeddings as emb
+
+
+class TestEmbeddings(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.logger = logging.getLogger("test")
+        self.size = 50
+        # Vectors (one per line), including duplicated and multi-word entries.
+        self.entries = [("the", 0.1), ("cat", 0.2), ("new york", 0.3), ("the", 0.4), ("żółw", 0.5)]
+        self.write_file(self.entries)
+
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+
+    def write_file(self, entries):
+        """ Writes embeddings in the GloVe text format. """
+        with open(os.path.join(self.folder.name, "glove.6B.50d.txt"), 'w', encoding='utf-8') as f:
+            for word, value in entries:
+                f.write("{} {}\n".format(word, ' '.join(str(value + i * 0.001) for i in range(self.size))))
+
+
+    def load(self, word_to_ix):
+        """ Loads embeddings for a given vocabulary. """
+        return emb.load_pretrained_embeddings(self.logger, self.folder.name, "glove.6B.50d.txt", word_to_ix, self.size).numpy()
+
+
+    def test_load_pretrained_embeddings(self):
+        """ Tests whether vectors of words from vocabulary are loaded. """
+        word_to_ix = {"cat": 0, "<PAD>": 1, "the": 2, "new york": 3, "żółw": 4}
+        embeddings = self.load(word_to_ix)
+        self.assertEqual(embeddings.shape, (5, self.size))
+        expected = np.arange(self.size, dtype=np.float32) * 0.001
+        self.assertTrue(np.allclose(embeddings[0], expected + 0.2))
+        # Last occurrence of the word is used.
+        self.assertTrue(np.allclose(embeddings[2], expected + 0.4))
+        self.assertTrue(np.allclose(embeddings[3], expected + 0.3))
+        self.assertTrue(np.allclose(embeddings[4], expected + 0.5))
+        # Words out of vocabulary get random vectors.
+        self.assertFalse(np.allclose(embeddings[1], expected + 0.1))
+
+
+    def test_binary_cache(self):
+        """ Tests whether the text file is converted only once, and converted again when it changes. """
+        self.load({"cat": 0})
+        with patch.object(emb, "TextColumnWriter") as writer:
+            embeddings = self.load({"cat": 0, "the": 1})
+            writer.assert_not_called()
+        self.assertAlmostEqual(float(embeddings[1][0]), 0.4, places=5)
+
+        # Modification of the file invalidates the binary format.
+        self.write_file([("cat", 0.7), ("dog", 0.8)])
+        embeddings = self.load({"dog": 0, "cat": 1})
+        self.assertAlmostEqual(float(embeddings[0][0]), 0.8, places=5)
+        self.assertAlmostEqual(float(embeddings[1][0]), 0.7, places=5)
+
+
+#if __name__ == "__main__":
+#    unittest.main()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import torch
+
+from ptp.components.mixins.feature_store import FeatureStore, FeatureStoreWriter, calculate_config_hash
+from ptp.components.tasks.feature_store_task import FeatureStoreTask
+from ptp.configuration.config_interface import ConfigInterface
+from ptp.configuration.configuration_error import ConfigurationError
+
+
+class TestFeatureStore(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.encoder_config = {"type": "GenericImageEncoder", "model_type": "resnet50", "return_feature_maps": True}
+        # Create store with features of two images (the second one appears twice).
+        writer = FeatureStoreWriter(self.folder.name, "test", calculate_config_hash(self.encoder_config), 'float32')
+        self.features = torch.randn(3, 4, 2, 2)
+        writer.append(["img_0.png", "img_1.png", "img_1.png"], self.features)
+        writer.close()
+
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+
+    def test_store(self):
+        """ Tests writing and reading features. """
+        store = FeatureStore(self.folder.name, "test")
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.shape, [4, 2, 2])
+        self.assertTrue(torch.equal(store.get_features("img_0.png"), self.features[0]))
+        self.assertTrue(torch.equal(store.get_features("img_1.png"), self.features[1]))
+
+
+    def test_discard(self):
+        """ Tests whether discarded (incomplete) stores cannot be opened. """
+        writer = FeatureStoreWriter(self.folder.name, "incomplete", calculate_config_hash(self.encoder_config))
+        writer.append(["img_0.png"], self.features[:1])
+        self.assertIn("img_0.png", writer)
+        self.assertNotIn("img_1.png", writer)
+        writer.discard()
+        with self.assertRaises(ConfigurationError):
+            FeatureStore(self.folder.name, "incomplete")
+
+
+    def test_config_hash(self):
+        """ Tests whether hash skips the default values and parameters not influencing the features. """
+        config_hash = calculate_config_hash(self.encoder_config)
+        self.assertEqual(config_hash, calculate_config_hash({**self.encoder_config, "pretrained": True, "priority": 1.1, "freeze": True}))
+        self.assertNotEqual(config_hash, calculate_config_hash({**self.encoder_config, "model_type": "resnet152"}))
+
+
+    def test_task_wrapper(self):
+        """ Tests whether the wrapper streams features in place of images and detects stale stores. """
+        config = ConfigInterface()
+        config.add_config_params({"features": {
+            "store_folder": self.folder.name,
+            "store_name": "test",
+            "encoder": self.encoder_config,
+            "wrapped_task": {"type": "CLEVR", "split": "training"}
+            }})
+        dataset_content = [
+            {'image_filename': 'img_1.png', 'question_index': 0, 'question_family_index': 2, 'answer': 'yes', 'question': 'Q1?'},
+            {'image_filename': 'img_0.png', 'question_index': 1, 'question_family_index': 2, 'answer': 'no', 'question': 'Q2?'}
+            ]
+
+        # Mock up the load_dataset method.
+        with patch( "ptp.components.tasks.image_text_to_class.clevr.CLEVR.load_dataset", MagicMock( side_effect = [ dataset_content ] )):
+            task = FeatureStoreTask("features", config["features"])
+        self.assertEqual(len(task), 2)
+        self.assertNotIn("images", task.output_data_definitions())
+        self.assertEqual(task.output_data_definitions()["features"].dimensions, [-1, 4, 2, 2])
+
+        batch = task.collate_fn([task[0], task[1]])
+        self.assertEqual(batch["image_ids"], ['img_1.png', 'img_0.png'])
+        self.assertTrue(torch.equal(batch["features"], self.features[[1, 0]]))
+
+        # Change the encoder.
+        config["features"]["encoder"].add_config_params({"model_type": "resnet152"})
+        with self.assertRaises(ConfigurationError):
+            FeatureStoreTask("features", config["features"])
+
+
+#if __name__ == "__main__":
+#    unittest.main()
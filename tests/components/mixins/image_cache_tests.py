@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import os
+import logging
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+from PIL import Image
+
+import torch
+from torchvision import transforms
+
+from ptp.components.mixins.image_cache import ImageCache, IMAGENET_MEAN, IMAGENET_STD
+
+
+class TestImageCache(unittest.TestCase):
+
+    def setUp(self):
+        # Create a few images of different sizes.
+        self.folder = tempfile.TemporaryDirectory()
+        self.image_paths = {}
+        for i, (height, width) in enumerate([(30, 40), (50, 20), (16, 16)]):
+            path = os.path.join(self.folder.name, "img_{}.png".format(i))
+            Image.fromarray(np.random.randint(0, 256, (height, width, 3), dtype=np.uint8)).save(path)
+            self.image_paths["img_{}".format(i)] = path
+        self.logger = logging.getLogger("TestImageCache")
+
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+
+    def test_uint8_cache(self):
+        """ Tests whether images returned by uint8 cache are identical to the ones processed by TorchVision. """
+        cache = ImageCache(self.logger, self.folder.name, self.image_paths, 8, 12, 'uint8', True)
+
+        transformations = transforms.Compose([
+            transforms.Resize([8, 12]),
+            transforms.ToTensor(),
+            transforms.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD)
+            ])
+        for img_id, path in self.image_paths.items():
+            img = Image.open(path).convert('RGB')
+            self.assertTrue(torch.allclose(cache.get_image(img_id), transformations(img), atol=1e-6))
+            self.assertEqual(cache.get_image_size(img_id), (img.size[1], img.size[0]))
+
+        # Cache with the same parameters should be reused.
+        with patch.object(ImageCache, "build") as build:
+            ImageCache(self.logger, self.folder.name, self.image_paths, 8, 12, 'uint8', True)
+            build.assert_not_called()
+            # Changing parameters results in a new cache.
+            ImageCache(self.logger, self.folder.name, self.image_paths, 8, 10, 'uint8', True)
+            build.assert_called_once()
+
+        # Modifying an image results in a new cache as well.
+        Image.fromarray(np.zeros((10, 10, 3), dtype=np.uint8)).save(self.image_paths["img_0"])
+        with patch.object(ImageCache, "build") as build:
+            ImageCache(self.logger, self.folder.name, self.image_paths, 8, 12, 'uint8', True)
+            build.assert_called_once()
+
+
+    def test_float16_cache(self):
+        """ Tests whether float16 cache stores normalized images. """
+        cache = ImageCache(self.logger, self.folder.name, self.image_paths, 8, 12, 'float16', False)
+
+        transformations = transforms.Compose([transforms.Resize([8, 12]), transforms.ToTensor()])
+        for img_id, path in self.image_paths.items():
+            img = cache.get_image(img_id)
+            self.assertEqual(img.dtype, torch.float32)
+            self.assertTrue(torch.allclose(img, transformations(Image.open(path).convert('RGB')), atol=1e-3))
+
+
+#if __name__ == "__main__":
+#    unittest.main()
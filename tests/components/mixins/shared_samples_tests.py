@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import pickle
+import unittest
+
+import torch
+
+from ptp.components.mixins.shared_samples import SharedSamples
+
+
+class TestSharedSamples(unittest.TestCase):
+
+    def setUp(self):
+        self.samples = [
+            {"image_ids": "synpic1", "questions": ["is", "there", "a", "żółty", "cube"], "answers": "yes", "category_ids": 0, "scores": 0.5, "images": torch.rand(3, 4, 5)},
+            {"image_ids": "synpic2", "questions": [], "answers": "", "category_ids": 12345678901, "scores": -1.0, "images": torch.rand(3, 4, 5)},
+            {"image_ids": "synpic1", "questions": ["which", "plane", "is", "it"], "answers": "axial", "category_ids": 3, "scores": 2.0, "images": torch.rand(3, 4, 5)}
+            ]
+
+
+    def assertSampleEqual(self, sample, expected):
+        self.assertEqual(sample.keys(), expected.keys())
+        for key, value in expected.items():
+            if isinstance(value, torch.Tensor):
+                self.assertTrue(torch.equal(sample[key], value))
+            else:
+                self.assertEqual(sample[key], value)
+
+
+    def test_shared_samples(self):
+        """ Tests storing and reading samples with values of all supported types. """
+        samples = SharedSamples(self.samples)
+        self.assertEqual(len(samples), 3)
+        self.assertEqual(samples.columns, [("image_ids", "text"), ("questions", "tokens"), ("answers", "text"),
+            ("category_ids", "int"), ("scores", "float"), ("images", "tensor")])
+        for sample, expected in zip(samples, self.samples):
+            self.assertSampleEqual(sample, expected)
+        self.assertSampleEqual(samples[-1], self.samples[-1])
+        with self.assertRaises(IndexError):
+            samples[3]
+
+        # All values are stored in shared memory.
+        self.assertTrue(all(tensor.is_shared() for value in samples.tensors.values() for tensor in (value if isinstance(value, tuple) else (value,))))
+        self.assertEqual(samples.nbytes, samples.tensors["images"].numel() * 4 + 2 * 3 * 8 + 3 * 4 * 8 + len("synpic1" * 3) + len("yesaxial") + 9 * 4)
+
+        # Samples can be pickled (e.g. passed to spawned DataLoader workers).
+        self.assertSampleEqual(pickle.loads(pickle.dumps(samples))[0], self.samples[0])
+
+
+    def test_unsupported_samples(self):
+        """ Tests whether samples with values that cannot be stored are rejected. """
+        with self.assertRaises(TypeError):
+            SharedSamples([{"program": {"inputs": []}}])
+        with self.assertRaises(KeyError):
+            SharedSamples([{"answers": "yes"}, {"questions": "is there a cube"}])
+        self.assertEqual(len(SharedSamples([])), 0)
+
+
+#if __name__ == "__main__":
+#    unittest.main()
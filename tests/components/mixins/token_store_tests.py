@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+
+from ptp.components.mixins.token_store import TokenStore
+
+
+class TestTokenStore(unittest.TestCase):
+
+    def setUp(self):
+        self.sentences = [["the", "cat", "sat"], [], ["the", "dog", "<eos>", "sat", "down"]]
+
+
+    def test_from_sequences(self):
+        """ Tests encoding of sequences and decoding of words. """
+        store = TokenStore.from_sequences(iter(self.sentences))
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.vocabulary, ["the", "cat", "sat", "dog", "<eos>", "down"])
+        self.assertEqual(store.ids.dtype, np.int32)
+        self.assertEqual(store.ids.tolist(), [0, 1, 2, 0, 3, 4, 2, 5])
+        self.assertEqual([store[i] for i in range(len(store))], self.sentences)
+        self.assertEqual(store[-1], self.sentences[-1])
+        self.assertEqual([store.sequence_length(i) for i in range(len(store))], [3, 0, 5])
+        # Ids of sequences are views of the array.
+        self.assertTrue(np.shares_memory(store.get_ids(2), store.ids))
+
+
+    def test_save_load(self):
+        """ Tests saving and memory-mapping the store. """
+        with tempfile.TemporaryDirectory() as folder:
+            self.assertFalse(TokenStore.exists(folder, "test"))
+            TokenStore.from_sequences(self.sentences).save(folder, "test")
+            self.assertTrue(TokenStore.exists(folder, "test"))
+
+            for mmap in [True, False]:
+                store = TokenStore.load(folder, "test", mmap)
+                self.assertEqual(isinstance(store.ids, np.memmap), mmap)
+                self.assertEqual([store[i] for i in range(len(store))], self.sentences)
+                self.assertEqual(store.decode(store.get_ids(0)[1:]), ["cat", "sat"])
+
+                # Memory-mapped arrays are not pickled.
+                state = pickle.dumps(store)
+                self.assertLess(len(state), 200)
+                self.assertEqual(pickle.loads(state)[2], self.sentences[2])
+
+
+#if __name__ == "__main__":
+#    unittest.main()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import unittest
+
+import torch
+
+from ptp.components.models.general_usage.attention_decoder import AttentionDecoder
+from ptp.configuration.config_interface import ConfigInterface
+from ptp.data_types.data_streams import DataStreams
+from ptp.utils.app_state import AppState
+
+
+class TestAttentionDecoder(unittest.TestCase):
+
+    def setUp(self):
+        AppState().__setitem__("ad_size", 6, override=True)
+        torch.manual_seed(0)
+        self.encoder_outputs = torch.randn(3, 5, 6)
+        self.encoder_state = torch.randn(3, 1, 6)
+
+
+    def create_model(self, eos_index):
+        """ Creates the model with a given index of <EOS>. """
+        config = ConfigInterface()
+        config.add_config_params({"decoder": {
+            "hidden_size": 6,
+            "autoregression_length": 5,
+            "eos_index": eos_index,
+            "globals": {"input_size": "ad_size", "prediction_size": "ad_size"}
+            }})
+        return AttentionDecoder("decoder", config["decoder"])
+
+
+    def reference_outputs(self, model):
+        """ Computes predictions by stacking outputs of all steps, as returned by decoder with the same parameters. """
+        hidden = self.encoder_state.transpose(0, 1)
+        activations_partial = model.sos_token.expand(3, -1).unsqueeze(1)
+        activations = []
+        for _ in range(5):
+            attn_weights = torch.nn.functional.softmax(model.attn(torch.cat((activations_partial.transpose(0, 1), hidden), 2)), dim=2)
+            attn_applied = torch.bmm(attn_weights.transpose(0, 1), self.encoder_outputs)
+            activations_partial = torch.nn.functional.relu(model.attn_combine(torch.cat((activations_partial, attn_applied), 2)))
+            activations_partial, hidden = model.rnn_cell(activations_partial, hidden)
+            activations_partial = model.activation2output(activations_partial)
+            activations.append(activations_partial)
+        return torch.nn.functional.log_softmax(torch.cat(activations, 1), dim=2)
+
+
+    def decode(self, model):
+        """ Passes encoder outputs through the model and returns predictions. """
+        data_streams = DataStreams({"inputs": self.encoder_outputs, "input_state": self.encoder_state})
+        model(data_streams)
+        return data_streams["predictions"]
+
+
+    def test_predictions(self):
+        """ Tests whether predictions of all steps are returned. """
+        model = self.create_model(-1)
+        predictions = self.decode(model)
+        self.assertEqual(predictions.shape, (3, 5, 6))
+        self.assertTrue(torch.allclose(predictions, self.reference_outputs(model), atol=1e-6))
+
+
+    def test_stop_at_eos(self):
+        """ Tests whether decoding stops when every sequence has emitted <EOS> (only in evaluation mode). """
+        model = self.create_model(2)
+        # Force the model to emit <EOS> in every step.
+        with torch.no_grad():
+            model.activation2output_layer.bias[2] = 100
+        reference = self.reference_outputs(model)
+
+        # Training - all steps are decoded.
+        self.assertTrue(torch.allclose(self.decode(model), reference, atol=1e-6))
+
+        # Evaluation - only the first step is decoded, remaining ones contain one-hot <EOS> predictions.
+        model.eval()
+        predictions = self.decode(model)
+        self.assertTrue(torch.allclose(predictions[:, 0], reference[:, 0], atol=1e-6))
+        self.assertTrue(torch.isfinite(predictions).all())
+        self.assertTrue((predictions[:, 1:].argmax(dim=2) == 2).all())
+        self.assertTrue((predictions[:, 1:, 2] == 0).all())
+        self.assertTrue(torch.allclose(predictions[:, 1:].exp().sum(dim=2), torch.ones(3, 4)))
+
+
+#if __name__ == "__main__":
+#    unittest.main()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import unittest
+
+import numpy as np
+import torch
+
+from ptp.components.models.multi_modal_reasoning.compact_bilinear_pooling import CompactBilinearPooling
+from ptp.configuration.config_interface import ConfigInterface
+from ptp.data_types.data_streams import DataStreams
+from ptp.utils.app_state import AppState
+
+
+class TestCompactBilinearPooling(unittest.TestCase):
+
+    def setUp(self):
+        app_state = AppState()
+        app_state.__setitem__("cbp_image_encoding_size", 12, override=True)
+        app_state.__setitem__("cbp_question_encoding_size", 7, override=True)
+        app_state.__setitem__("cbp_output_size", 15, override=True)
+
+
+    def create_model(self, trainable_projections, seed = 0):
+        """ Creates the model with given seed of the count sketches. """
+        np.random.seed(seed)
+        config = ConfigInterface()
+        config.add_config_params({"cbp": {
+            "trainable_projections": trainable_projections,
+            "globals": {
+                "image_encoding_size": "cbp_image_encoding_size",
+                "question_encoding_size": "cbp_question_encoding_size",
+                "output_size": "cbp_output_size"
+                }
+            }})
+        return CompactBilinearPooling("cbp", config["cbp"])
+
+
+    def reference_outputs(self, image_matrix, question_matrix, enc_img, enc_q):
+        """ Computes outputs with dense projection matrices and full complex FFTs. """
+        fft_img = torch.fft.fft(enc_img.mm(image_matrix).to(torch.complex64), dim=1)
+        fft_q = torch.fft.fft(enc_q.mm(question_matrix).to(torch.complex64), dim=1)
+        return torch.fft.ifft(fft_img * fft_q, dim=1).real
+
+
+    def test_outputs(self):
+        """ Tests whether count sketches give the same outputs as dense projection matrices (also trainable ones). """
+        torch.manual_seed(0)
+        enc_img = torch.randn(4, 12)
+        enc_q = torch.randn(4, 7)
+
+        model = self.create_model(False)
+        image_matrix = model.generate_count_sketch_projection_matrix(model.image_sketch_indices, model.image_sketch_signs, 15)
+        question_matrix = model.generate_count_sketch_projection_matrix(model.question_sketch_indices, model.question_sketch_signs, 15)
+        # Every row of the matrix contains a single 1 or -1.
+        self.assertTrue(torch.equal(image_matrix.abs().sum(dim=1), torch.ones(12)))
+        reference = self.reference_outputs(image_matrix, question_matrix, enc_img, enc_q)
+
+        for trainable_projections in [False, True]:
+            model = self.create_model(trainable_projections)
+            data_streams = DataStreams({"image_encodings": enc_img, "question_encodings": enc_q})
+            model(data_streams)
+            self.assertEqual(data_streams["outputs"].shape, (4, 15))
+            self.assertTrue(torch.allclose(data_streams["outputs"], reference, atol=1e-5))
+
+
+    def test_load_dense_projections(self):
+        """ Tests loading of checkpoints storing count sketches as dense projection matrices. """
+        model = self.create_model(False, seed = 1)
+        state_dict = {
+            "image_sketch_projection_matrix": model.generate_count_sketch_projection_matrix(model.image_sketch_indices, model.image_sketch_signs, 15),
+            "question_sketch_projection_matrix": model.generate_count_sketch_projection_matrix(model.question_sketch_indices, model.question_sketch_signs, 15)
+            }
+        loaded_model = self.create_model(False, seed = 2)
+        loaded_model.load_state_dict(state_dict)
+        for (key, value) in model.state_dict().items():
+            self.assertTrue(torch.equal(loaded_model.state_dict()[key], value))
+
+
+#if __name__ == "__main__":
+#    unittest.main()
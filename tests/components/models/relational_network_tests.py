@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import unittest
+
+import torch
+
+from ptp.components.models.multi_modal_reasoning.relational_network import RelationalNetwork
+from ptp.configuration.config_interface import ConfigInterface
+from ptp.data_types.data_streams import DataStreams
+from ptp.utils.app_state import AppState
+
+
+class TestRelationalNetwork(unittest.TestCase):
+
+    def setUp(self):
+        app_state = AppState()
+        app_state.__setitem__("rn_feature_maps_height", 3, override=True)
+        app_state.__setitem__("rn_feature_maps_width", 4, override=True)
+        app_state.__setitem__("rn_feature_maps_depth", 5, override=True)
+        app_state.__setitem__("rn_question_encoding_size", 6, override=True)
+
+
+    def create_model(self, pairwise_projections):
+        """ Creates the model with given mode of computing relations. """
+        config = ConfigInterface()
+        config.add_config_params({"rn": {
+            "g_theta_sizes": [8, 7],
+            "pairwise_projections": pairwise_projections,
+            "globals": {
+                "feature_maps_height": "rn_feature_maps_height",
+                "feature_maps_width": "rn_feature_maps_width",
+                "feature_maps_depth": "rn_feature_maps_depth",
+                "question_encoding_size": "rn_question_encoding_size",
+                "output_size": "rn_output_size"
+                }
+            }})
+        return RelationalNetwork("rn", config["rn"])
+
+
+    def reference_outputs(self, model, feat_m, enc_q):
+        """ Computes outputs by passing every pair of "objects" through g_theta separately. """
+        relations = []
+        for h1 in range(feat_m.size(2)):
+            for w1 in range(feat_m.size(3)):
+                for h2 in range(feat_m.size(2)):
+                    for w2 in range(feat_m.size(3)):
+                        relations.append(model.g_theta(torch.cat([feat_m[:, :, h1, w1], feat_m[:, :, h2, w2], enc_q], dim=1)))
+        return torch.stack(relations, dim=1).sum(dim=1)
+
+
+    def test_relations(self):
+        """ Tests whether both modes compute the same outputs as processing pairs of objects one by one. """
+        torch.manual_seed(0)
+        feat_m = torch.randn(2, 5, 3, 4)
+        enc_q = torch.randn(2, 6)
+        for pairwise_projections in [False, True]:
+            model = self.create_model(pairwise_projections)
+            model.eval()
+            data_streams = DataStreams({"feature_maps": feat_m, "question_encodings": enc_q})
+            model(data_streams)
+            self.assertEqual(data_streams["outputs"].shape, (2, 7))
+            self.assertTrue(torch.allclose(data_streams["outputs"], self.reference_outputs(model, feat_m, enc_q), atol=1e-5))
+
+
+    def test_gradients(self):
+        """ Tests whether both modes compute the same gradients of the parameters of g_theta. """
+        torch.manual_seed(0)
+        feat_m = torch.randn(2, 5, 3, 4)
+        enc_q = torch.randn(2, 6)
+        models = [self.create_model(False), self.create_model(True)]
+        models[1].load_state_dict(models[0].state_dict())
+        for model in models:
+            data_streams = DataStreams({"feature_maps": feat_m, "question_encodings": enc_q})
+            model(data_streams)
+            data_streams["outputs"].sum().backward()
+        for (p0, p1) in zip(models[0].parameters(), models[1].parameters()):
+            self.assertTrue(torch.allclose(p0.grad, p1.grad, atol=1e-4))
+
+
+#if __name__ == "__main__":
+#    unittest.main()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import unittest
+
+import torch
+
+from ptp.components.models.general_usage.seq2seq import Seq2Seq
+from ptp.configuration.config_interface import ConfigInterface
+from ptp.data_types.data_streams import DataStreams
+from ptp.utils.app_state import AppState
+
+
+class TestSeq2Seq(unittest.TestCase):
+
+    def setUp(self):
+        AppState().__setitem__("s2s_size", 4, override=True)
+        torch.manual_seed(0)
+        self.inputs = torch.randn(3, 7, 4)
+
+
+    def create_model(self, eos_index):
+        """ Creates the model with a given index of <EOS>. """
+        config = ConfigInterface()
+        config.add_config_params({"s2s": {
+            "hidden_size": 5,
+            "cell_type": "LSTM",
+            "initial_state": "Trainable",
+            "autoregression_length": 6,
+            "eos_index": eos_index,
+            "globals": {"input_size": "s2s_size", "prediction_size": "s2s_size"}
+            }})
+        return Seq2Seq("s2s", config["s2s"])
+
+
+    def reference_outputs(self, model):
+        """ Computes predictions by stacking outputs of all steps, as returned by model with the same parameters. """
+        activations, hidden = model.rnn_cell_enc(self.inputs, model.initialize_hiddens_state(3))
+        activations_partial = model.activation2output(activations[:, -1, :])
+        activations = []
+        for _ in range(6):
+            activations_partial, hidden = model.rnn_cell_dec(activations_partial.unsqueeze(1), hidden)
+            activations_partial = model.activation2output(activations_partial.squeeze(1))
+            activations.append(activations_partial)
+        return torch.nn.functional.log_softmax(torch.stack(activations, 1), dim=2)
+
+
+    def decode(self, model):
+        """ Passes inputs through the model and returns predictions. """
+        data_streams = DataStreams({"inputs": self.inputs})
+        model(data_streams)
+        return data_streams["predictions"]
+
+
+    def test_predictions(self):
+        """ Tests whether predictions of all steps are returned and gradients are propagated. """
+        model = self.create_model(-1)
+        predictions = self.decode(model)
+        self.assertEqual(predictions.shape, (3, 6, 4))
+        self.assertTrue(torch.allclose(predictions, self.reference_outputs(model), atol=1e-6))
+        predictions.sum().backward()
+        self.assertIsNotNone(model.rnn_cell_enc.weight_ih_l0.grad)
+
+
+    def test_stop_at_eos(self):
+        """ Tests whether decoding stops when every sequence has emitted <EOS> (only in evaluation mode). """
+        model = self.create_model(1)
+        # Force the model to emit <EOS> in every step.
+        with torch.no_grad():
+            model.activation2output.bias[1] = 100
+        reference = self.reference_outputs(model)
+
+        # Training - all steps are decoded.
+        self.assertTrue(torch.allclose(self.decode(model), reference, atol=1e-6))
+
+        # Evaluation - only the first step is decoded, remaining ones contain one-hot <EOS> predictions.
+        model.eval()
+        predictions = self.decode(model)
+        self.assertTrue(torch.allclose(predictions[:, 0], reference[:, 0], atol=1e-6))
+        self.assertTrue(torch.isfinite(predictions).all())
+        self.assertTrue((predictions[:, 1:].argmax(dim=2) == 1).all())
+        self.assertTrue((predictions[:, 1:, 1] == 0).all())
+        self.assertTrue(torch.allclose(predictions[:, 1:].exp().sum(dim=2), torch.ones(3, 5)))
+
+
+#if __name__ == "__main__":
+#    unittest.main()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import unittest
+import warnings
+import torch
+from nltk.translate.bleu_score import sentence_bleu, corpus_bleu
+
+from ptp.configuration.config_interface import ConfigInterface
+from ptp.configuration.config_registry import ConfigRegistry
+from ptp.application.pipeline_manager import PipelineManager
+from ptp.data_types.data_streams import DataStreams
+from ptp.utils.app_state import AppState
+from ptp.utils.statistics_collector import StatisticsCollector
+from ptp.utils.statistics_aggregator import StatisticsAggregator
+
+
+class TestBLEUStatistics(unittest.TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(TestBLEUStatistics, self).__init__(*args, **kwargs)
+        # Set required globals: small vocabulary, so there are many matching n-grams.
+        self.words = ["<PAD>", "<EOS>", "a", "b", "c", "d"]
+        app_state = AppState()
+        app_state.__setitem__("word_mappings", {word: ix for ix, word in enumerate(self.words)}, override=True)
+
+        # Build a pipeline with a single component.
+        ConfigRegistry()._clear_registry()
+        config = ConfigInterface()
+        config.add_config_params({
+            'bleu' :
+                {
+                    'type': 'BLEUStatistics',
+                    'priority': 1.1,
+                    'use_prediction_distributions': False
+                }
+            })
+        pipe = PipelineManager('testpm', config)
+        pipe.build(False)
+        self.component = pipe[0]
+
+
+    def create_batch(self, batch_size, seq_length):
+        """ Creates batch with random targets and predictions, with sequences of different lengths padded with <PAD>. """
+        targets = torch.randint(2, len(self.words), (batch_size, seq_length))
+        preds = torch.where(torch.rand(batch_size, seq_length) < 0.7, targets, torch.randint(2, len(self.words), (batch_size, seq_length)))
+        for i in range(batch_size):
+            targets[i, torch.randint(0, seq_length, (1,)).item():] = 0
+            preds[i, torch.randint(0, seq_length, (1,)).item():] = 0
+        return DataStreams({'targets': targets, 'predictions': preds})
+
+
+    def to_words(self, indices):
+        """ Changes indices to words, skipping the ignored ones. """
+        return [self.words[ix] for ix in indices.tolist() if self.words[ix] not in ["<PAD>", "<EOS>"]]
+
+
+    def test_sentence_bleu(self):
+        """ Tests whether sentence-level BLEU scores match the ones computed by NLTK. """
+        data_streams = self.create_batch(50, 12)
+        scores = self.component.calculate_score(*self.component.calculate_ngram_statistics(data_streams))
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            for i, score in enumerate(scores.tolist()):
+                reference = sentence_bleu([self.to_words(data_streams['targets'][i])],
+                    self.to_words(data_streams['predictions'][i]), self.component.weights)
+                self.assertAlmostEqual(score, reference)
+
+
+    def test_corpus_bleu(self):
+        """ Tests whether the corpus-level BLEU aggregator matches the one computed by NLTK. """
+        stat_col = StatisticsCollector()
+        stat_agg = StatisticsAggregator()
+        self.component.add_statistics(stat_col)
+        self.component.add_aggregators(stat_agg)
+
+        batches = [self.create_batch(10, 12) for _ in range(4)]
+        for data_streams in batches:
+            self.component.collect_statistics(stat_col, data_streams)
+        self.component.aggregate_statistics(stat_col, stat_agg)
+
+        references = [[self.to_words(target)] for data_streams in batches for target in data_streams['targets']]
+        hypotheses = [self.to_words(pred) for data_streams in batches for pred in data_streams['predictions']]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            self.assertAlmostEqual(stat_agg['bleu_corpus'], corpus_bleu(references, hypotheses, self.component.weights))
+
+        # After emptying the collector, only the newly collected batches are aggregated.
+        stat_col.empty()
+        self.component.aggregate_statistics(stat_col, stat_agg)
+        self.assertEqual(stat_agg['bleu_corpus'], 0)
+        self.component.collect_statistics(stat_col, batches[0])
+        self.component.aggregate_statistics(stat_col, stat_agg)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            self.assertAlmostEqual(stat_agg['bleu_corpus'], corpus_bleu(references[:10], hypotheses[:10], self.component.weights))
+
+
+#if __name__ == "__main__":
+#    unittest.main()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import unittest
+import numpy as np
+import torch
+
+from ptp.configuration.config_interface import ConfigInterface
+from ptp.configuration.config_registry import ConfigRegistry
+from ptp.application.pipeline_manager import PipelineManager
+from ptp.data_types.data_streams import DataStreams
+from ptp.utils.app_state import AppState
+from ptp.utils.statistics_collector import StatisticsCollector
+from ptp.utils.statistics_aggregator import StatisticsAggregator
+
+
+class TestPrecisionRecallStatistics(unittest.TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(TestPrecisionRecallStatistics, self).__init__(*args, **kwargs)
+        # Set required globals.
+        app_state = AppState()
+        app_state.__setitem__("num_classes", 7, override=True)
+
+        # Build a pipeline with a single component.
+        ConfigRegistry()._clear_registry()
+        config = ConfigInterface()
+        config.add_config_params({
+            'precision_recall' :
+                {
+                    'type': 'PrecisionRecallStatistics',
+                    'priority': 1.1,
+                    'use_prediction_distributions': False,
+                    'use_masking': True
+                }
+            })
+        pipe = PipelineManager('testpm', config)
+        pipe.build(False)
+        self.component = pipe[0]
+
+
+    def create_batch(self, batch_size):
+        """ Creates batch with random targets, predictions (including indices outside of the mappings) and masks. """
+        return DataStreams({
+            'targets': torch.randint(0, 7, (batch_size,)),
+            'predictions': torch.randint(0, 8, (batch_size,)),
+            'masks': torch.randint(0, 2, (batch_size,))
+            })
+
+
+    def test_confusion_matrix(self):
+        """ Tests whether the confusion matrix and scores are equal to the ones computed sample by sample. """
+        data_streams = self.create_batch(100)
+        confusion_matrix, precisions, recalls, f1scores, supports = self.component.calculate_statistics(data_streams)
+
+        # Compute the reference confusion matrix.
+        reference = np.zeros([7, 7], dtype=int)
+        for target, pred, mask in zip(data_streams['targets'], data_streams['predictions'], data_streams['masks']):
+            if pred < 7:
+                reference[target][pred] += mask
+        self.assertTrue(np.array_equal(confusion_matrix, reference))
+        self.assertTrue(np.array_equal(supports, reference.sum(axis=1)))
+
+        for i in range(7):
+            tp = reference[i][i]
+            precision = tp / reference[:, i].sum() if reference[:, i].sum() > 0 else 0.0
+            recall = tp / reference[i].sum() if reference[i].sum() > 0 else 0.0
+            self.assertAlmostEqual(precisions[i], precision)
+            self.assertAlmostEqual(recalls[i], recall)
+            self.assertAlmostEqual(f1scores[i], 2 * precision * recall / (precision + recall) if precision + recall > 0 else 0.0)
+
+
+    def test_running_confusion_matrix(self):
+        """ Tests whether aggregated scores are computed on the basis of the confusion matrix from all batches. """
+        stat_col = StatisticsCollector()
+        stat_agg = StatisticsAggregator()
+        self.component.add_statistics(stat_col)
+        self.component.add_aggregators(stat_agg)
+
+        batches = [self.create_batch(20) for _ in range(5)]
+        total = np.zeros([7, 7], dtype=int)
+        for data_streams in batches:
+            self.component.collect_statistics(stat_col, data_streams)
+            total += self.component.calculate_statistics(data_streams)[0]
+        self.component.aggregate_statistics(stat_col, stat_agg)
+
+        precisions, recalls, f1scores, supports = self.component.calculate_scores(total)
+        self.assertAlmostEqual(stat_agg['precision'], np.dot(precisions, supports) / supports.sum())
+        self.assertAlmostEqual(stat_agg['f1score'], np.dot(f1scores, supports) / supports.sum())
+
+        # Standard deviations of batch scores are computed around the aggregated scores.
+        batch_supports = np.array(stat_col['f1score_support'], dtype=float)
+        for key in ['precision', 'recall', 'f1score']:
+            deviations = np.array(stat_col[key], dtype=float) - stat_agg[key]
+            self.assertAlmostEqual(stat_agg[key+'_std'], np.sqrt(np.average(deviations**2, weights=batch_supports)))
+
+        # Emptying the collector resets the running matrix.
+        stat_col.empty()
+        self.component.collect_statistics(stat_col, batches[0])
+        self.component.aggregate_statistics(stat_col, stat_agg)
+        self.assertAlmostEqual(stat_agg['recall'], stat_col['recall'][0])
+
+
+#if __name__ == "__main__":
+#    unittest.main()
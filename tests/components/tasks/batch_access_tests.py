@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
+from torchvision import datasets
+
+from ptp.components.mixins.token_store import TokenStore
+from ptp.components.tasks.image_to_class.cifar_100 import CIFAR100
+from ptp.components.tasks.image_to_class.mnist import MNIST
+from ptp.components.tasks.text_to_text.wikitext_language_modeling import WikiTextLanguageModeling
+from ptp.configuration.config_interface import ConfigInterface
+
+
+class MockupMNIST(datasets.MNIST):
+    """ MNIST dataset with random images (using __getitem__ of the original class). """
+    def __init__(self, root, train, download, transform):
+        self.data = torch.randint(0, 256, (20, 28, 28), dtype=torch.uint8)
+        self.targets = torch.randint(0, 10, (20,))
+        self.transform = transform
+        self.target_transform = None
+
+
+class MockupCIFAR100(datasets.CIFAR100):
+    """ CIFAR-100 dataset with random images (using __getitem__ of the original class). """
+    def __init__(self, root, train, download, transform):
+        self.data = np.random.randint(0, 256, (20, 32, 32, 3), dtype=np.uint8)
+        self.targets = np.random.randint(0, 100, 20).tolist()
+        self.transform = transform
+        self.target_transform = None
+
+
+class TestBatchAccess(unittest.TestCase):
+
+    def create_task(self, task_class, name, params):
+        """ Creates the task with given parameters (and global variables with unique names). """
+        params["globals"] = {key: name + "_" + key for key in [
+            "image_height", "image_width", "image_depth", "num_classes", "label_word_mappings"]}
+        config = ConfigInterface()
+        config.add_config_params({name: params})
+        return task_class(name, config[name])
+
+
+    def assertBatchesEqual(self, batch, expected):
+        """ Checks whether batch returned by __getitems__ is the same as the one collated from samples. """
+        self.assertEqual(list(batch.keys()), list(expected.keys()))
+        for key, value in expected.items():
+            if isinstance(value, torch.Tensor):
+                self.assertEqual(batch[key].dtype, value.dtype)
+                self.assertTrue(torch.equal(batch[key], value))
+            else:
+                self.assertEqual(batch[key], value)
+
+
+    def check_task(self, task, indices):
+        """ Compares batches returned by the batch-level access path with the collated samples. """
+        self.assertTrue(task.has_batch_access())
+        self.assertBatchesEqual(task.__getitems__(indices), task.collate_fn([task[index] for index in indices]))
+
+        # Data loader uses the batch-level access path.
+        loader = DataLoader(task, batch_size=4, collate_fn=task.get_collate_fn())
+        self.assertBatchesEqual(next(iter(loader)), task.collate_fn([task[index] for index in range(4)]))
+
+
+    def test_mnist(self):
+        """ Tests the batch-level access path of MNIST. """
+        with patch.object(datasets, "MNIST", MockupMNIST):
+            task = self.create_task(MNIST, "mnist_batch", {"data_folder": "~/data/mnist"})
+        self.check_task(task, [3, 0, 17, 3])
+
+
+    def test_cifar100(self):
+        """ Tests the batch-level access path of CIFAR-100. """
+        with patch.object(datasets, "CIFAR100", MockupCIFAR100):
+            task = self.create_task(CIFAR100, "cifar100_batch", {"data_folder": "~/data/cifar-100"})
+        self.check_task(task, [3, 0, 17, 3])
+
+
+    def test_wikitext(self):
+        """ Tests the batch-level access path of WikiText language modeling. """
+        with tempfile.TemporaryDirectory() as folder:
+            tokens = "the cat sat on the mat <eos> a dog sat on a log <eos> the end".split()
+            TokenStore.from_sequences([tokens]).save(folder, "wiki.train.token_store")
+            task = self.create_task(WikiTextLanguageModeling, "wikitext_batch", {"data_folder": folder, "subset": "train", "sentence_length": 5})
+            self.check_task(task, [0, 9, 2])
+            self.assertEqual(task.__getitems__([1])["sources"], [tokens[1:6]])
+            self.assertEqual(task.__getitems__([1])["targets"], [tokens[2:7]])
+
+
+#if __name__ == "__main__":
+#    unittest.main()
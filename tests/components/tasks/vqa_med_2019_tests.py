@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from ptp.components.tasks.image_text_to_class.vqa_med_2019 import VQAMED2019
+from ptp.configuration.config_interface import ConfigInterface
+
+
+class TestVQAMED2019(unittest.TestCase):
+
+    def setUp(self):
+        # Create source files of the training split.
+        self.folder = tempfile.TemporaryDirectory()
+        qa_folder = os.path.join(self.folder.name, "ImageClef-2019-VQA-Med-Training", "QAPairsByCategory")
+        os.makedirs(qa_folder)
+        for category in ["C1_Modality", "C2_Plane", "C3_Organ", "C4_Abnormality"]:
+            with open(os.path.join(qa_folder, category + "_train.txt"), 'w') as f:
+                f.write("synpic1|What is the Organ, shown here?|CT Abdomen\n")
+                f.write("synpic2|Which plane?|Axial\n")
+
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+
+    def create_task(self, answer_preprocessing):
+        """ Creates the task with given answer preprocessing. """
+        config = ConfigInterface()
+        config.add_config_params({"vqa_med": {
+            "data_folder": self.folder.name,
+            "stream_images": False,
+            "resize_image": [224, 224],
+            "question_preprocessing": "lowercase, remove_punctuation",
+            "answer_preprocessing": answer_preprocessing,
+            "globals": {"image_height": "vqa_med_image_height", "image_width": "vqa_med_image_width"}
+            }})
+        return VQAMED2019("vqa_med", config["vqa_med"])
+
+
+    def test_dataset_cache(self):
+        """ Tests whether preprocessed samples are cached and cache is invalidated when preprocessing changes. """
+        task = self.create_task("none")
+        self.assertEqual(len(task), 8)
+        self.assertEqual(task.dataset[0]["questions"], "what is the organ shown here")
+        self.assertEqual(task.dataset[0]["answers"], "CT Abdomen")
+        self.assertEqual(task.get_image_ids(), ["synpic1", "synpic2"] * 4)
+
+        # Samples should be loaded from the cache.
+        with patch.object(pd, "read_csv") as read_csv:
+            task = self.create_task("none")
+            read_csv.assert_not_called()
+        self.assertEqual(task.dataset[1]["questions"], "which plane")
+
+        # Change of preprocessing invalidates the cache.
+        task = self.create_task("lowercase")
+        self.assertEqual(task.dataset[0]["answers"], "ct abdomen")
+
+
+#if __name__ == "__main__":
+#    unittest.main()
@@ -17,6 +17,7 @@
 __author__ = "Tomasz Kornuta"
 
 import unittest
+import torch
 
 from ptp.data_types.data_streams import DataStreams
 
@@ -61,3 +62,23 @@ class TestDataStreams(unittest.TestCase):
         self.data_streams.publish( {"predictions": 12 } )
         self.assertEqual(self.data_streams['predictions'], 12)
 
+
+    def test_to_device(self):
+        """ Tests whether only streams not moved yet are transferred to device. """
+        data_streams = DataStreams({'inputs': torch.ones(4, 10), 'targets': [1, 2, 3, 4]})
+        # Use the "meta" device, as tensors are always copied to it.
+        device = torch.device('meta')
+        self.assertEqual(data_streams.to(device=device), 4 * 10 * 4)
+        self.assertEqual(data_streams['inputs'].device, device)
+        # Nothing new to move.
+        self.assertEqual(data_streams.to(device=device), 0)
+        # Move only the newly published stream.
+        data_streams.publish({'predictions': torch.ones(4, 2)})
+        self.assertEqual(data_streams.to(device=device, keys_to_move=['inputs', 'predictions']), 4 * 2 * 4)
+        self.assertEqual(data_streams.transferred_bytes, 4 * 12 * 4)
+        # Reinitialization removes predictions and resets the counter, the left streams stay on device.
+        data_streams.reinitialize({'inputs': None, 'targets': None})
+        self.assertEqual(data_streams.transferred_bytes, 0)
+        data_streams.publish({'predictions': torch.ones(4, 2)})
+        self.assertEqual(data_streams.to(device=device), 4 * 2 * 4)
+        self.assertEqual(data_streams.transferred_bytes, 4 * 2 * 4)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) tkornuta, IBM Corporation 2019
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__author__ = "Tomasz Kornuta"
+
+import unittest
+import torch
+
+from ptp.utils.app_state import AppState
+from ptp.configuration.config_interface import ConfigInterface
+from ptp.configuration.config_registry import ConfigRegistry
+from ptp.application.pipeline_manager import PipelineManager
+from ptp.data_types.data_streams import DataStreams
+from ptp.utils.pipeline_profiler import PipelineProfiler
+
+
+class TestPipelineProfiler(unittest.TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(TestPipelineProfiler, self).__init__(*args, **kwargs)
+        # Set required globals.
+        app_state = AppState()
+        app_state.__setitem__("bow_size", 10, override=True)
+
+        # Build a pipeline with a single component.
+        ConfigRegistry()._clear_registry()
+        config = ConfigInterface()
+        config.add_default_params({
+            'bow_encoder' :
+                {
+                    'type': 'BOWEncoder',
+                    'priority': 1.1
+                }
+            })
+        pipe = PipelineManager('testpm', config)
+        pipe.build(False)
+        self.component = pipe[0]
+
+
+    def test_measurements(self):
+        """ Tests whether the profiler counts calls and memory of published tensors. """
+        profiler = PipelineProfiler()
+        for _ in range(3):
+            data_streams = DataStreams({'inputs': [[torch.ones(10), torch.ones(10)]] * 4})
+            with profiler.measure("forward", 1.1, self.component, data_streams):
+                self.component(data_streams)
+
+        (calls, wall_time, cpu_time, memory) = profiler.total_measurements[("forward", 1.1, "bow_encoder", "BOWEncoder")]
+        self.assertEqual(calls, 3)
+        self.assertGreaterEqual(wall_time, 0.0)
+        self.assertGreaterEqual(cpu_time, 0.0)
+        # Size of the published outputs: 4 x 10 float32.
+        self.assertEqual(memory, 4 * 10 * 4)
+        # On CPU the memory is labelled as the size of published tensors.
+        self.assertEqual(profiler.memory_label(), "published_memory")
+
+
+    def test_summary(self):
+        """ Tests whether the summary ranks the measured components. """
+        profiler = PipelineProfiler()
+        profiler.add_measurement("forward", 1.1, self.component, 0.5, 0.4, 0)
+        profiler.add_measurement("statistics", 1.1, self.component, 1.5, 1.2, 0)
+
+        lines = profiler.export_to_string().split('\n')
+        # Rows start after the title, separator, header and separator.
+        self.assertIn("statistics", lines[4])
+        self.assertIn("forward", lines[5])
+        self.assertIn("75.0%", lines[4])
+        self.assertIn("size of tensors published in DataStreams", lines[0])
+
+
+#if __name__ == "__main__":
+#    unittest.main()
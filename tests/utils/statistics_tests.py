@@ -18,10 +18,14 @@ __author__ = "Tomasz Kornuta"
 
 import unittest
 import random
+import threading
 import numpy as np
+import io
+import logging
 
 from ptp.utils.statistics_collector import StatisticsCollector
 from ptp.utils.statistics_aggregator import StatisticsAggregator
+from ptp.utils.statistics_writer import StatisticsWriter
 
 class TestStatistics(unittest.TestCase):
 
@@ -97,5 +101,124 @@ class TestStatistics(unittest.TestCase):
         self.assertEqual(stat_agg.export_to_string('[Epoch 1]'), "acc_mean 0.49500 [Epoch 1]")
 
 
+    def test_collector_running_aggregates(self):
+        """ Tests whether the running (weighted) aggregates are equal to the ones computed on the collected values. """
+        stat_col = StatisticsCollector()
+        stat_col.add_statistics('loss', '{:12.10f}')
+        stat_col.add_statistics('acc', '{:2.3f}', weights='acc_support')
+        stat_col.add_statistics('acc_support', None)
+        stat_col.add_running_sum('acc_histogram')
+
+        # Collect more values than the initial capacity of columns.
+        accuracies = [random.random() for _ in range(1000)]
+        supports = [random.randint(1, 64) for _ in range(1000)]
+        for acc, support in zip(accuracies, supports):
+            stat_col['loss'] = acc
+            stat_col['acc'] = acc
+            stat_col['acc_support'] = support
+            stat_col.add_to_running_sum('acc_histogram', np.histogram(acc, bins=4, range=(0, 1))[0])
+
+        self.assertEqual(len(stat_col['acc']), 1000)
+        self.assertEqual(stat_col.sum('acc_support'), sum(supports))
+        self.assertEqual(stat_col.min('loss'), min(accuracies))
+        self.assertAlmostEqual(stat_col.mean('loss'), np.mean(accuracies))
+        self.assertAlmostEqual(stat_col.std('loss', unbiased=True), np.std(accuracies, ddof=1))
+        # Weighted aggregates.
+        acc_avg = np.average(accuracies, weights=supports)
+        self.assertAlmostEqual(stat_col.mean('acc'), acc_avg)
+        self.assertAlmostEqual(stat_col.std('acc'), np.sqrt(np.average((np.array(accuracies)-acc_avg)**2, weights=supports)))
+        self.assertAlmostEqual(stat_col.std('acc', center=0.5), np.sqrt(np.average((np.array(accuracies)-0.5)**2, weights=supports)))
+        self.assertAlmostEqual(stat_col.std('loss', center=0.5), np.sqrt(np.mean((np.array(accuracies)-0.5)**2)))
+        # Running sums.
+        self.assertTrue(np.array_equal(stat_col.running_sum('acc_histogram'), np.histogram(accuracies, bins=4, range=(0, 1))[0]))
+
+        # Empty.
+        stat_col.empty()
+        self.assertEqual(len(stat_col['acc']), 0)
+        self.assertEqual(stat_col.mean('acc'), 0)
+        self.assertIsNone(stat_col.running_sum('acc_histogram'))
+
+
+    def test_collector_aggregates_stability(self):
+        """ Tests whether standard deviations are accurate for values with a large offset and after promotion to objects. """
+        stat_col = StatisticsCollector()
+        stat_col.add_statistics('loss', '{:12.10f}')
+        stat_col.add_statistics('acc', '{:2.3f}', weights='acc_support')
+        stat_col.add_statistics('acc_support', None)
+
+        values = [1e9 + random.random() for _ in range(1000)]
+        supports = [random.randint(1, 64) for _ in range(1000)]
+        for value, support in zip(values, supports):
+            stat_col['loss'] = value
+            stat_col['acc'] = value
+            stat_col['acc_support'] = support
+        self.assertAlmostEqual(stat_col.std('loss'), np.std(values), places=6)
+        acc_avg = np.average(values, weights=supports)
+        self.assertAlmostEqual(stat_col.std('acc'), np.sqrt(np.average((np.array(values)-acc_avg)**2, weights=supports)), places=6)
+
+        # Values promoted to objects.
+        stat_col.empty()
+        for value in [1, 2, True, 5]:
+            stat_col['loss'] = value
+        self.assertEqual(stat_col.sum('loss'), 9)
+        self.assertEqual(stat_col.max('loss'), 5)
+        self.assertAlmostEqual(stat_col.mean('loss'), 2.25)
+        self.assertAlmostEqual(stat_col.std('loss'), np.std([1, 2, 1, 5]))
+
+
+    def test_writer_csv(self):
+        """ Tests whether the statistics writer exports the snapshots of statistics to csv. """
+        stat_col = StatisticsCollector()
+        stat_col.add_statistics('episode', '{:06d}')
+        stat_col.add_statistics('loss', '{:2.2f}')
+        stat_col.add_statistics('acc_help', None)
+
+        writer = StatisticsWriter(logging.getLogger('StatisticsWriter'))
+        stat_col.initialize_writer(writer)
+        csv_file = io.StringIO()
+
+        for episode in range(3):
+            stat_col['episode'] = episode
+            stat_col['loss'] = 0.5
+            stat_col['acc_help'] = 1
+            stat_col.export_to_csv(csv_file)
+        # Modifying statistics cannot affect the already submitted records.
+        stat_col.empty()
+        writer.finalize()
+
+        self.assertEqual(csv_file.getvalue(), "000000,0.50\n000001,0.50\n000002,0.50\n")
+        self.assertEqual(writer.processed_records, 3)
+        self.assertEqual(writer.dropped_records, 0)
+
+
+    def test_writer_exclusive_records(self):
+        """ Tests whether a slow writer does not accumulate exclusive records (e.g. snapshots of parameters). """
+        writer = StatisticsWriter(logging.getLogger('StatisticsWriter'))
+        release = threading.Event()
+        processed = []
+        snapshots = []
+        def write(episode):
+            # Slow writer - waits until released.
+            release.wait()
+            processed.append(episode)
+        def create_snapshot(episode):
+            def create():
+                snapshots.append(episode)
+                return (episode,)
+            return create
+
+        for episode in range(10):
+            writer.submit_exclusive("histograms", write, create_snapshot(episode))
+        # Only the first snapshot was created, the remaining ones were skipped.
+        self.assertEqual(snapshots, [0])
+        self.assertEqual(writer.skipped_records, 9)
+
+        # Once processed, the key is released, so the next snapshot can be submitted.
+        release.set()
+        writer.finalize()
+        self.assertEqual(processed, [0])
+        self.assertEqual(writer.pending_keys, set())
+
+
 #if __name__ == "__main__":
 #    unittest.main()
\ No newline at end of file